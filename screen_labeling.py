@@ -3,17 +3,11 @@ import sys
 import json
 import logging
 from dotenv import load_dotenv
-import google.generativeai as genai
-from supabase import create_client
 from typing import Optional
 import argparse
 import traceback
 
-from src.services.web_analyzer import WebAnalyzer
-from src.services.gemini_analyzer import GeminiAnalyzer
-from src.services.openai_analyzer import OpenAIAnalyzer
-from src.services.supabase_processor import SupabaseImageProcessor
-from src.services.fusion_analyzer import FusionAnalyzer
+from src.services.clients import create_database_client, direct_db
 
 # Configure logging
 logging.basicConfig(
@@ -30,10 +24,6 @@ SUPABASE_URL = os.getenv('PUBLIC_SUPABASE_URL')
 SUPABASE_KEY = os.getenv('SUPABASE_SERVICE_ROLE_KEY')
 GEMINI_API_KEY = os.getenv('GEMINI_API_KEY')
 
-if not all([SUPABASE_URL, SUPABASE_KEY, GEMINI_API_KEY]):
-    logger.error("Missing required environment variables. Please check .env file")
-    sys.exit(1)
-
 def drop_analysis_table(supabase):
     """Drops the screen_analysis table if it exists"""
     try:
@@ -184,34 +174,50 @@ def create_fusion_table(supabase):
     except Exception as e:
         logger.error(f"Error creating fusion table: {str(e)}")
 
-def main(save_to_db: bool = True, max_sites: Optional[int] = 5, all_sites: bool = False):
+def create_pipeline(embed_inline: bool = False, **processor_options):
+    """Build the Supabase client, analyzers and processor
+
+    The Gemini SDK, BeautifulSoup and the analyzers are imported here rather than
+    at startup, so `--help` and argument errors return immediately.
+    """
+    import google.generativeai as genai
+    from src.services.web_analyzer import WebAnalyzer
+    from src.services.gemini_analyzer import GeminiAnalyzer
+    from src.services.supabase_processor import SupabaseImageProcessor
+    from src.services.embedding_processor import EmbeddingProcessor
+
+    supabase = create_database_client()
+    db = direct_db(supabase)
+    genai.configure(api_key=GEMINI_API_KEY)
+
+    # Initialize analyzers with clean_html=False
+    web_analyzer = WebAnalyzer(supabase, clean_html=False)
+    image_analyzer = GeminiAnalyzer()
+    # image_analyzer = OpenAIAnalyzer()  (from src.services.openai_analyzer)
+
+    processor = SupabaseImageProcessor(
+        supabase,
+        web_analyzer,
+        image_analyzer,
+        embedding_processor=EmbeddingProcessor(supabase) if embed_inline else None,
+        db=db,
+        **processor_options
+    )
+    return supabase, processor
+
+def main(save_to_db: bool = True, max_sites: Optional[int] = 5, all_sites: bool = False,
+         embed_inline: bool = False):
     """Main execution function
     
     Args:
         save_to_db: Whether to save analysis results to database. Defaults to True.
         max_sites: Maximum number of sites to analyze. If None or all_sites=True, analyze all sites. Defaults to 5.
         all_sites: If True, analyze all sites regardless of max_sites value. Defaults to False.
+        embed_inline: If True, embed each analysis before it is inserted. Defaults to False.
     """
     try:
-        # Initialize clients
-        supabase = create_client(SUPABASE_URL, SUPABASE_KEY)
-        genai.configure(api_key=GEMINI_API_KEY)
-        # print(SUPABASE_URL)
-        # print(SUPABASE_KEY)
-        # print(GEMINI_API_KEY)
-        
-        # Initialize analyzers with clean_html=False
-        web_analyzer = WebAnalyzer(supabase, clean_html=False)
-        image_analyzer = GeminiAnalyzer()
-        # image_analyzer = OpenAIAnalyzer()
-        
-        # Initialize processor with section_enabled=True
-        processor = SupabaseImageProcessor(
-            supabase, 
-            web_analyzer, 
-            image_analyzer,
-            section_enabled=True
-        )
+        # Initialize clients and processor with section_enabled=True
+        _, processor = create_pipeline(embed_inline, section_enabled=True)
         
         # Process sites - pass None as max_sites if all_sites is True
         results = processor.process_sites(max_sites=None if all_sites else max_sites)
@@ -234,33 +240,21 @@ def main(save_to_db: bool = True, max_sites: Optional[int] = 5, all_sites: bool
         logger.error(f"Error in main execution: {str(e)}")
         sys.exit(1)
 
-def main1(save_to_db: bool = True, max_sites: Optional[int] = 5):
+def main1(save_to_db: bool = True, max_sites: Optional[int] = 5, embed_inline: bool = False):
     """Main execution function for image analysis with fusion
     
     Args:
         save_to_db: Whether to save analysis results to database
         max_sites: Maximum number of sites to analyze. If None, analyze all sites
+        embed_inline: Whether to embed each analysis before it is inserted
     """
     try:
-        # Initialize clients
-        supabase = create_client(SUPABASE_URL, SUPABASE_KEY)
-        genai.configure(api_key=GEMINI_API_KEY)
+        # Initialize clients and processor with fusion enabled
+        supabase, processor = create_pipeline(embed_inline, enable_fusion=True)
         
         # Create fusion table if needed
         create_fusion_table(supabase)
         
-        # Initialize analyzers
-        web_analyzer = WebAnalyzer(supabase, clean_html=False)
-        image_analyzer = GeminiAnalyzer()
-        
-        # Initialize processor with fusion enabled
-        processor = SupabaseImageProcessor(
-            supabase, 
-            web_analyzer, 
-            image_analyzer,
-            enable_fusion=True
-        )
-        
         # Process sites
         results = processor.process_sites(max_sites=max_sites)
         
@@ -275,28 +269,17 @@ def main1(save_to_db: bool = True, max_sites: Optional[int] = 5):
         logger.error(f"Error in main1 execution: {str(e)}")
         sys.exit(1)
 
-def main2(save_to_db: bool = True, max_sites: Optional[int] = 100):
+def main2(save_to_db: bool = True, max_sites: Optional[int] = 100, embed_inline: bool = False):
     """Main execution function for HTML analysis only
     
     Args:
         save_to_db: Whether to save analysis results to database
         max_sites: Maximum number of unique sites to analyze
+        embed_inline: Whether to embed each analysis before it is inserted
     """
     try:
-        # Initialize clients
-        supabase = create_client(SUPABASE_URL, SUPABASE_KEY)
-        genai.configure(api_key=GEMINI_API_KEY)
-        
-        # Initialize analyzers
-        web_analyzer = WebAnalyzer(supabase, clean_html=False)
-        image_analyzer = GeminiAnalyzer()  # Needed for processor initialization
-        
-        # Initialize processor
-        processor = SupabaseImageProcessor(
-            supabase, 
-            web_analyzer, 
-            image_analyzer
-        )
+        # Initialize clients and processor (the image analyzer is needed for initialization)
+        _, processor = create_pipeline(embed_inline)
         
         # Process sites
         results = processor.process_html_only(max_sites=max_sites)
@@ -320,6 +303,8 @@ def parse_args():
                        help='Save results to database (default: True)')
     parser.add_argument('--max-sites', type=str, default='5',
                        help='Maximum number of sites to analyze (default: 5, use "all" for all sites)')
+    parser.add_argument('--embed-inline', action='store_true', default=False,
+                       help='Embed analyses in batches and insert them with their vectors (default: False)')
     return parser.parse_args()
 
 def get_max_sites(max_sites_arg: str) -> Optional[int]:
@@ -334,11 +319,14 @@ def get_max_sites(max_sites_arg: str) -> Optional[int]:
 
 if __name__ == "__main__":
     args = parse_args()
+    if not all([SUPABASE_URL, SUPABASE_KEY, GEMINI_API_KEY]):
+        logger.error("Missing required environment variables. Please check .env file")
+        sys.exit(1)
     max_sites = get_max_sites(args.max_sites)
     
     if args.mode == 'main':
-        main(save_to_db=args.save_to_db, max_sites=max_sites)
+        main(save_to_db=args.save_to_db, max_sites=max_sites, embed_inline=args.embed_inline)
     elif args.mode == 'main1':
-        main1(save_to_db=args.save_to_db, max_sites=max_sites)
+        main1(save_to_db=args.save_to_db, max_sites=max_sites, embed_inline=args.embed_inline)
     else:  # main2
-        main2(save_to_db=args.save_to_db, max_sites=max_sites) 
\ No newline at end of file
+        main2(save_to_db=args.save_to_db, max_sites=max_sites, embed_inline=args.embed_inline) 
\ No newline at end of file
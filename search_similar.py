@@ -2,10 +2,21 @@ import os
 import sys
 import logging
 import argparse
-from typing import List, Dict
+from concurrent.futures import ThreadPoolExecutor
+from typing import TYPE_CHECKING, List, Dict, Optional
 from dotenv import load_dotenv
-from supabase import create_client
-from openai import OpenAI
+from src.config import EMBEDDING_BACKEND, EMBEDDING_DIMENSIONS, FULL_EMBEDDING_DIMENSIONS, ANALYSIS_TABLES
+from src.services.clients import create_database_client
+from src.services.embedding_backends import EmbeddingBackend, get_embedding_backend
+from src.services.embedding_versions import EmbeddingVersionRegistry
+
+# Optional stages pull in numpy (and asyncio for the service); they are imported
+# in main() only when enabled, so a plain search starts without them
+if TYPE_CHECKING:
+    from src.services.query_cache import QueryEmbeddingCache
+    from src.services.result_cache import SemanticResultCache
+    from src.services.local_index import LocalVectorIndex
+    from src.services.reranker import FieldReranker
 
 # Configure logging
 logging.basicConfig(
@@ -17,100 +28,584 @@ logger = logging.getLogger(__name__)
 # Load environment variables
 load_dotenv()
 
+# Promoted columns accepted by the `filters` argument of search_embeddings
+FILTER_FIELDS = ['section', 'site_domain', 'content_type', 'business_industry', 'design_color_scheme']
+
 class SimilaritySearcher:
-    def __init__(self, supabase_client):
+    def __init__(self, supabase_client, dimensions: int = EMBEDDING_DIMENSIONS,
+                 backend: Optional[EmbeddingBackend] = None,
+                 versions: Optional[EmbeddingVersionRegistry] = None,
+                 query_cache: Optional['QueryEmbeddingCache'] = None,
+                 local_indexes: Optional[Dict[str, 'LocalVectorIndex']] = None,
+                 result_cache: Optional['SemanticResultCache'] = None,
+                 reranker: Optional['FieldReranker'] = None):
         self.supabase = supabase_client
-        self.client = OpenAI(api_key=os.getenv('OPENAI_API_KEY'))
+        self.backend = backend or get_embedding_backend(dimensions=dimensions)
+        self.model = self.backend.model
+        self.dimensions = self.backend.dimensions
+        # Full-width queries follow each table's active embedding version, so an
+        # activated model or width is picked up without restarting callers
+        self.versions = versions or EmbeddingVersionRegistry(supabase_client)
+        # Active version last seen per table; a change prunes the retired model's cached query vectors
+        self._seen_versions: Dict[str, Optional[str]] = {}
+        self.query_cache = query_cache
+        # Modes served from in-process snapshots instead of the database
+        self.local_indexes = local_indexes or {}
+        # Reuses results of near-duplicate earlier queries
+        self.result_cache = result_cache
+        # Reorders over-fetched hits by structured field matches with the query
+        self.reranker = reranker
         
-    def _create_query_embedding(self, query: str) -> List[float]:
+    def _create_query_embedding(self, query: str, backend: Optional[EmbeddingBackend] = None) -> List[float]:
         """Create embedding for search query"""
+        backend = backend or self.backend
         try:
-            response = self.client.embeddings.create(
-                model="text-embedding-3-small",
-                input=query,
-                encoding_format="float"
-            )
-            return response.data[0].embedding
+            if self.query_cache:
+                return self.query_cache.get_or_create(query, backend)
+            return backend.embed_one(query)
         except Exception as e:
             logger.error(f"Error creating query embedding: {str(e)}")
             raise
 
-    def search(self, query: str, mode: str = 'regular', top_k: int = 5) -> List[Dict]:
+    def _create_query_embeddings(self, queries: List[str], backend: Optional[EmbeddingBackend] = None,
+                                 batch_size: int = 100) -> List[List[float]]:
+        """Create embeddings for many queries in batched requests"""
+        backend = backend or self.backend
+        try:
+            if self.query_cache:
+                return self.query_cache.get_or_create_many(queries, backend, batch_size)
+            embeddings = []
+            for start in range(0, len(queries), batch_size):
+                embeddings.extend(backend.embed(queries[start:start + batch_size]))
+            return embeddings
+        except Exception as e:
+            logger.error(f"Error creating query embeddings: {str(e)}")
+            raise
+
+    def _active_version(self, table: str) -> Optional[Dict]:
+        """Active embedding version of a table
+        
+        None for the unversioned halfvec columns searched at reduced widths, and for
+        tables without a registered version (the server then reads `embedding` too).
+        """
+        if self.dimensions != FULL_EMBEDDING_DIMENSIONS:
+            return None
+        version = self.versions.get_active(table)
+        name = version['version'] if version else None
+        if self.query_cache and table in self._seen_versions and self._seen_versions[table] != name:
+            logger.info(f"{table} switched to embedding version {name}")
+            self.prune_query_cache()
+        self._seen_versions[table] = name
+        return version
+
+    def prune_query_cache(self) -> int:
+        """Drop cached query embeddings of models that no table's active version uses"""
+        if not self.query_cache:
+            return 0
+        models = {f"{self.model}:{self.dimensions}"}
+        try:
+            for table in ANALYSIS_TABLES.values():
+                version = self.versions.get_active(table)
+                self._seen_versions[table] = version['version'] if version else None
+                if version:
+                    models.add(f"{version['model']}:{version['dimensions']}")
+        except Exception as e:
+            logger.warning(f"Could not read embedding versions; query cache not pruned: {str(e)}")
+            return 0
+        removed = self.query_cache.prune(models)
+        if removed:
+            logger.info(f"Pruned {removed} cached query embeddings of retired models")
+        return removed
+
+    def search(self, query: str, mode: str = 'regular', top_k: int = 5,
+               probes: Optional[int] = None, ef_search: Optional[int] = None,
+               filters: Optional[Dict] = None, fields: Optional[List[str]] = None,
+               oversample: Optional[int] = None) -> List[Dict]:
         """Search for similar analyses
         
         Args:
             query: Search query text
-            mode: Search mode ('regular', 'fusion', or 'html')
+            mode: Search mode ('regular', 'fusion', 'html', 'hybrid' for lexical + vector over regular,
+                or 'all' for per-site results across the three tables)
             top_k: Number of top results to return
+            probes: ivfflat lists probed for this query (server default when None)
+            ef_search: HNSW candidate list size for this query (server default when None)
+            filters: Column filters applied inside the ANN query, e.g.
+                {'content_type': 'e-commerce', 'section': ['hero', 'pricing']}
+            fields: Columns or dotted JSONB paths returned with each hit under 'fields', e.g.
+                ['section', 'web_analysis.content_main_headings']
+            oversample: Use the two-stage binary-quantized search, reranking top_k * oversample
+                Hamming candidates with the full vectors (single-stage search when None)
             
         Returns:
             List of top-k matching records with similarity scores
         """
+        if mode == 'hybrid':
+            return self.hybrid_search(query, top_k=top_k, probes=probes, ef_search=ef_search)
+        if mode == 'all':
+            return self.federated_search(query, top_k=top_k, probes=probes, ef_search=ef_search)
+
         try:
-            # Create embedding for query
-            query_embedding = self._create_query_embedding(query)
-            
-            if mode == 'html':
-                # Use separate function for HTML search
-                rpc_response = self.supabase.rpc(
-                    'match_html_embeddings',
-                    {
-                        'query_embedding': query_embedding,
-                        'top_k': top_k
-                    }
-                ).execute()
+            # Snapshots are searched with the configured model; everything else is
+            # embedded with, and pinned to, the table's active version
+            local = mode in self.local_indexes and not filters and not fields and not self.reranker
+            version = None if local else self._active_version(ANALYSIS_TABLES[mode])
+            backend = self.versions.backend_for(version) if version else self.backend
+            query_embedding = self._create_query_embedding(query, backend)
+
+            cache_key = None
+            if self.result_cache:
+                cache_key = self.result_cache.group_key(
+                    ANALYSIS_TABLES[mode], top_k, probes=probes, ef_search=ef_search, filters=filters,
+                    fields=fields, oversample=oversample, version=version['version'] if version else None,
+                    model=f"{backend.model}:{backend.dimensions}",
+                    rerank=self.reranker.query_terms(query) if self.reranker else None
+                )
+                cached = self.result_cache.get(cache_key, query_embedding)
+                if cached is not None:
+                    return cached
+
+            if self.reranker:
+                table = ANALYSIS_TABLES[mode]
+                fetch_fields = list(dict.fromkeys([*(fields or []), *self.reranker.fields_for(table)]))
+                candidates = self._search_embedding(query_embedding, mode, version,
+                                                    max(top_k, self.reranker.candidates), probes, ef_search,
+                                                    filters, fetch_fields, oversample)
+                results = self.reranker.rerank(query, candidates, table, top_k, keep_fields=fields)
             else:
-                # Use existing function for regular and fusion search
-                table = 'screen_analysis' if mode == 'regular' else 'screen_analysis_fusion'
-                rpc_response = self.supabase.rpc(
-                    'match_embeddings',
-                    {
-                        'query_embedding': query_embedding,
-                        'top_k': top_k,
-                        'table_name': table
-                    }
-                ).execute()
-            
-            if not rpc_response.data:
+                results = self._search_embedding(query_embedding, mode, version, top_k, probes, ef_search,
+                                                 filters, fields, oversample)
+            if cache_key:
+                self.result_cache.put(cache_key, query_embedding, results)
+            if not results:
                 logger.info("No similar records found")
-                return []
-                
-            # Format results
-            results = []
-            for record in rpc_response.data:
-                result = {
-                    'screen_id': record['screen_id'],
-                    'site_url': record['site_url'],
-                    'similarity': record['similarity']
+            return results
+            
+        except Exception as e:
+            logger.error(f"Error performing similarity search: {str(e)}")
+            return []
+
+    def _search_embedding(self, query_embedding: List[float], mode: str, version: Optional[Dict],
+                          top_k: int, probes: Optional[int] = None, ef_search: Optional[int] = None,
+                          filters: Optional[Dict] = None, fields: Optional[List[str]] = None,
+                          oversample: Optional[int] = None) -> List[Dict]:
+        """Nearest rows of one mode's table for an already computed query embedding"""
+        params = {
+            'query_embedding': query_embedding,
+            'top_k': top_k,
+            'table_name': ANALYSIS_TABLES[mode]
+        }
+        if probes is not None:
+            params['probes'] = probes
+        if ef_search is not None:
+            params['ef_search'] = ef_search
+        if filters:
+            params['filters'] = filters
+        if fields:
+            params['fields'] = fields
+
+        # Snapshots carry no filter or analysis columns, so those searches go to the database
+        if mode in self.local_indexes and not filters and not fields:
+            records = self.local_indexes[mode].search(
+                query_embedding, top_k, probes=probes, ef_search=ef_search, oversample=oversample
+            )
+        elif oversample and not filters and (version or self.dimensions == FULL_EMBEDDING_DIMENSIONS):
+            # Hamming pass over sign bits, exact rerank of top_k * oversample candidates
+            params.pop('probes', None)
+            params['oversample'] = oversample
+            if version:
+                params['embedding_version'] = version['version']
+            records = self.supabase.rpc('search_embeddings_quantized', params).execute().data
+        elif version:
+            # Pin the RPC to the version the query was embedded with,
+            # so a concurrent switch can't pair it with another model's vectors
+            params['embedding_version'] = version['version']
+            records = self.supabase.rpc('search_embeddings', params).execute().data
+        elif self.dimensions != FULL_EMBEDDING_DIMENSIONS:
+            # Reduced-dimension vectors are searched through the halfvec columns
+            records = self.supabase.rpc('match_half_embeddings', params).execute().data
+        else:
+            records = self.supabase.rpc('search_embeddings', params).execute().data
+
+        if oversample and 'oversample' not in params and mode not in self.local_indexes:
+            logger.warning("Quantized search does not support filters or unversioned halfvec columns; "
+                           "used single-stage search")
+        return [self._format_result(record, mode) for record in records or []]
+
+    def federated_search(self, query: str, top_k: int = 5, weights: Optional[Dict[str, float]] = None,
+                         candidates: Optional[int] = None, probes: Optional[int] = None,
+                         ef_search: Optional[int] = None) -> List[Dict]:
+        """Search regular, fusion and html analyses at once and merge the hits per site
+        
+        The query is embedded once per embedding model in use (once when versions
+        are not tracked) and the three tables are queried concurrently. Each
+        table's similarities are min-max normalized over its candidates, since
+        the analysis texts behind each table score on different scales. A site's
+        score is the weighted sum of its best normalized score in each table.
+        
+        Args:
+            query: Search query text
+            top_k: Number of sites to return
+            weights: Weight per mode (default 1.0 each); modes weighted 0 are skipped
+            candidates: Rows fetched per table before merging (default 3 * top_k)
+            probes: ivfflat lists probed per table (server default when None)
+            ef_search: HNSW candidate list size per table (server default when None)
+            
+        Returns:
+            List of top-k sites with the merged score and the best hit of each mode
+        """
+        weights = {mode: 1.0 for mode in ANALYSIS_TABLES} if weights is None else weights
+        modes = [mode for mode in ANALYSIS_TABLES if weights.get(mode, 0) > 0]
+        candidates = candidates or 3 * top_k
+        try:
+            versions = {
+                mode: None if mode in self.local_indexes else self._active_version(ANALYSIS_TABLES[mode])
+                for mode in modes
+            }
+            embeddings = {}
+            for mode, version in versions.items():
+                backend = self.versions.backend_for(version) if version else self.backend
+                key = (backend.model, backend.dimensions)
+                if key not in embeddings:
+                    embeddings[key] = self._create_query_embedding(query, backend)
+                versions[mode] = (version, embeddings[key])
+
+            with ThreadPoolExecutor(max_workers=len(modes) or 1) as executor:
+                futures = {
+                    mode: executor.submit(self._search_embedding, embedding, mode, version,
+                                          candidates, probes, ef_search)
+                    for mode, (version, embedding) in versions.items()
                 }
-                if mode == 'regular':
-                    result['webp_url'] = record['webp_url']
+                hits = {mode: future.result() for mode, future in futures.items()}
+
+            sites: Dict[str, Dict] = {}
+            for mode, results in hits.items():
+                if not results:
+                    continue
+                similarities = [result['similarity'] for result in results]
+                low, high = min(similarities), max(similarities)
+                for result in results:
+                    normalized = (result['similarity'] - low) / (high - low) if high > low else 1.0
+                    site = sites.setdefault(result['site_url'], {
+                        'site_url': result['site_url'], 'score': 0.0, 'modes': {}
+                    })
+                    # Only the best hit of a site in each mode counts
+                    if mode in site['modes']:
+                        continue
+                    site['modes'][mode] = {**result, 'normalized': normalized}
+                    site['score'] += weights[mode] * normalized
+                    if result.get('webp_url') and 'webp_url' not in site:
+                        site['webp_url'] = result['webp_url']
+
+            return sorted(sites.values(), key=lambda site: site['score'], reverse=True)[:top_k]
+
+        except Exception as e:
+            logger.error(f"Error performing federated search: {str(e)}")
+            return []
+
+    def hybrid_search(self, query: str, base_mode: str = 'regular', top_k: int = 5,
+                      candidates: int = 50, rrf_k: int = 60, probes: Optional[int] = None,
+                      ef_search: Optional[int] = None) -> List[Dict]:
+        """Lexical + vector search merged with reciprocal-rank fusion in one SQL call
+        
+        Args:
+            query: Search query text, used both as full-text query and for the embedding
+            base_mode: Table searched ('regular', 'fusion', or 'html')
+            top_k: Number of fused results to return
+            candidates: Rows taken from each of the ANN and full-text lists before fusion
+            rrf_k: Reciprocal-rank fusion constant; larger values flatten rank differences
+            probes: ivfflat lists probed for this query (server default when None)
+            ef_search: HNSW candidate list size for this query (server default when None)
+            
+        Returns:
+            List of top-k records with fused scores and their rank in each list
+        """
+        try:
+            table = ANALYSIS_TABLES[base_mode]
+            version = self._active_version(table)
+            backend = self.versions.backend_for(version) if version else None
+
+            params = {
+                'query_text': query,
+                'query_embedding': self._create_query_embedding(query, backend),
+                'top_k': top_k,
+                'table_name': table,
+                'candidates': max(candidates, top_k),
+                'rrf_k': rrf_k
+            }
+            if version:
+                params['embedding_version'] = version['version']
+            elif self.dimensions != FULL_EMBEDDING_DIMENSIONS:
+                params['use_half'] = True
+            if probes is not None:
+                params['probes'] = probes
+            if ef_search is not None:
+                params['ef_search'] = ef_search
+
+            response = self.supabase.rpc('hybrid_search', params).execute()
+            results = []
+            for record in response.data or []:
+                result = self._format_result(record, base_mode)
+                result.update({
+                    'score': record['score'],
+                    'vector_rank': record['vector_rank'],
+                    'lexical_rank': record['lexical_rank']
+                })
                 results.append(result)
-                
             return results
+
+        except Exception as e:
+            logger.error(f"Error performing hybrid search: {str(e)}")
+            return []
+
+    def search_sites(self, query: str, mode: str = 'regular', top_k: int = 5, candidates: Optional[int] = None,
+                     probes: Optional[int] = None, ef_search: Optional[int] = None,
+                     filters: Optional[Dict] = None) -> List[Dict]:
+        """Search returning the best screen of each of the top-k distinct sites, grouped in SQL
+        
+        Args:
+            query: Search query text
+            mode: Search mode ('regular', 'fusion', or 'html')
+            top_k: Number of distinct sites to return
+            candidates: Rows taken from the ANN index before grouping (server default 20 * top_k)
+            probes: ivfflat lists probed for this query (server default when None)
+            ef_search: HNSW candidate list size for this query (raised to cover the candidates)
+            filters: Column filters applied inside the ANN query
             
+        Returns:
+            List of top-k sites, each with its best screen and the number of matching screens
+        """
+        try:
+            table = ANALYSIS_TABLES[mode]
+            version = self._active_version(table)
+            backend = self.versions.backend_for(version) if version else None
+
+            params = {
+                'query_embedding': self._create_query_embedding(query, backend),
+                'top_k': top_k,
+                'table_name': table
+            }
+            optional = {'candidates': candidates, 'probes': probes, 'ef_search': ef_search, 'filters': filters,
+                        'embedding_version': version['version'] if version else None}
+            params.update({key: value for key, value in optional.items() if value is not None})
+
+            response = self.supabase.rpc('search_sites', params).execute()
+            results = []
+            for record in response.data or []:
+                result = self._format_result(record, mode)
+                result['site_hits'] = record['site_hits']
+                results.append(result)
+            return results
+
         except Exception as e:
-            logger.error(f"Error performing similarity search: {str(e)}")
+            logger.error(f"Error performing site-grouped search: {str(e)}")
             return []
 
-def main(query: str, mode: str = 'regular', top_k: int = 5):
+    def more_like_this(self, source_id: int, mode: str = 'regular', top_k: int = 10) -> List[Dict]:
+        """Precomputed nearest neighbors of an analysis row (see src.scripts.build_knn_graph)
+        
+        Args:
+            source_id: id of the analysis row to find similar rows for
+            mode: Table of the row ('regular', 'fusion', or 'html')
+            top_k: Number of neighbors to return (at most the K the graph was built with)
+            
+        Returns:
+            List of neighbor records with similarity scores
+        """
+        try:
+            response = self.supabase.rpc('more_like_this', {
+                'p_table_name': ANALYSIS_TABLES[mode],
+                'p_source_id': source_id,
+                'top_k': top_k
+            }).execute()
+            return [self._format_result(record, mode) for record in response.data or []]
+        except Exception as e:
+            logger.error(f"Error reading neighbors of {source_id}: {str(e)}")
+            return []
+
+    def search_many(self, queries: List[str], mode: str = 'regular', top_k: int = 5,
+                    probes: Optional[int] = None, ef_search: Optional[int] = None,
+                    embed_batch_size: int = 100, query_batch_size: int = 50) -> List[List[Dict]]:
+        """Search for many queries with batched embedding requests and one RPC per query batch
+        
+        Args:
+            queries: Search query texts
+            mode: Search mode ('regular', 'fusion', or 'html')
+            top_k: Number of top results per query
+            probes: ivfflat lists probed per query (server default when None)
+            ef_search: HNSW candidate list size per query (server default when None)
+            embed_batch_size: Queries per embedding request
+            query_batch_size: Query vectors sent per search_embeddings_batch call
+            
+        Returns:
+            One list of matching records per query, in query order
+        """
+        results = [[] for _ in queries]
+        try:
+            table = ANALYSIS_TABLES[mode]
+            if mode in self.local_indexes:
+                embeddings = self._create_query_embeddings(queries, batch_size=embed_batch_size)
+                for i, embedding in enumerate(embeddings):
+                    records = self.local_indexes[mode].search(embedding, top_k, probes=probes, ef_search=ef_search)
+                    results[i] = [self._format_result(record, mode) for record in records]
+                return results
+
+            version = self._active_version(table)
+            backend = self.versions.backend_for(version) if version else None
+            embeddings = self._create_query_embeddings(queries, backend, embed_batch_size)
+
+            for start in range(0, len(embeddings), query_batch_size):
+                params = {
+                    'query_embeddings': embeddings[start:start + query_batch_size],
+                    'top_k': top_k,
+                    'table_name': table
+                }
+                if version:
+                    params['embedding_version'] = version['version']
+                elif self.dimensions != FULL_EMBEDDING_DIMENSIONS:
+                    params['use_half'] = True
+                if probes is not None:
+                    params['probes'] = probes
+                if ef_search is not None:
+                    params['ef_search'] = ef_search
+
+                response = self.supabase.rpc('search_embeddings_batch', params).execute()
+                for record in response.data or []:
+                    results[start + record['query_index']].append(self._format_result(record, mode))
+
+            return results
+
+        except Exception as e:
+            logger.error(f"Error performing batch similarity search: {str(e)}")
+            return results
+
+    @staticmethod
+    def _format_result(record: Dict, mode: str) -> Dict:
+        result = {
+            'screen_id': record['screen_id'],
+            'site_url': record['site_url'],
+            'similarity': record['similarity']
+        }
+        if mode == 'regular':
+            result['webp_url'] = record.get('webp_url')
+        if record.get('hydrated') is not None:
+            result['fields'] = record['hydrated']
+        return result
+
+def main(query: str, mode: str = 'regular', top_k: int = 5, dimensions: int = EMBEDDING_DIMENSIONS,
+         backend: str = EMBEDDING_BACKEND, probes: Optional[int] = None,
+         ef_search: Optional[int] = None, query_cache_path: Optional[str] = None,
+         local_index_path: Optional[str] = None, sync_local_index: bool = False,
+         queries_file: Optional[str] = None, serve: bool = False, host: str = '127.0.0.1',
+         port: int = 8080, hybrid_table: str = 'regular', filters: Optional[Dict] = None,
+         weights: Optional[Dict[str, float]] = None, fields: Optional[List[str]] = None,
+         oversample: Optional[int] = None, result_cache_threshold: Optional[float] = None,
+         like: Optional[int] = None, group_by_site: bool = False, rerank: bool = False,
+         rerank_weights: Optional[Dict[str, float]] = None, rerank_candidates: int = 50,
+         rerank_budget_ms: float = 20.0):
     """Perform similarity search
     
     Args:
         query: Search query text
-        mode: Search mode ('regular', 'fusion', or 'html')
+        mode: Search mode ('regular', 'fusion', 'html', or 'hybrid')
         top_k: Number of top results to return
+        dimensions: Embedding width; below the full width the halfvec columns are searched
+            with this backend, otherwise queries use each table's active embedding version
+        backend: Query embedding backend ('openai' or 'local') for the halfvec columns,
+            local snapshots and tables without a registered version
+        probes: ivfflat lists probed per query (server default when None)
+        ef_search: HNSW candidate list size per query (server default when None)
+        query_cache_path: SQLite file persisting query embeddings between runs
+        local_index_path: Snapshot directory serving this mode's search in process
+        sync_local_index: Pull rows updated since the snapshot before searching
+        queries_file: File with one query per line, searched in batches instead of `query`
+        serve: Run the HTTP search service instead of a one-shot search
+        host: Interface the service binds to
+        port: Port the service listens on
+        hybrid_table: Table searched by hybrid mode ('regular', 'fusion', or 'html')
+        filters: Column filters applied inside the ANN query
+        weights: Per-mode weights for the federated 'all' mode
+        fields: Columns or dotted JSONB paths returned with each hit
+        oversample: Candidates per result for the two-stage binary-quantized search
+        result_cache_threshold: Reuse results of earlier queries at least this cosine-similar
+        like: Analysis row id whose precomputed neighbors are returned instead of searching `query`
+        group_by_site: Return the best screen of each of the top-k distinct sites
+        rerank: Reorder over-fetched candidates by similarity plus structured field matches
+        rerank_weights: Weights of 'similarity' and the rerank fields (defaults for those left out)
+        rerank_candidates: Candidates fetched for reranking
+        rerank_budget_ms: Time allowed for matching fields before falling back to vector scores
     """
     try:
-        # Initialize Supabase client
-        supabase = create_client(
-            os.getenv('PUBLIC_SUPABASE_URL'),
-            os.getenv('SUPABASE_SERVICE_ROLE_KEY')
-        )
+        # Initialize Supabase client; it connects on first use, so snapshot searches never load it
+        # With DB_BACKEND=postgres the search RPCs run over a direct connection instead
+        supabase = create_database_client()
+        
+        local_indexes = {}
+        if local_index_path:
+            from src.services.local_index import LocalVectorIndex
+            local_indexes[mode] = LocalVectorIndex.load(local_index_path)
+            if sync_local_index:
+                local_indexes[mode].sync(supabase)
+        
+        query_cache = result_cache = reranker = None
+        if query_cache_path:
+            from src.services.query_cache import QueryEmbeddingCache
+            query_cache = QueryEmbeddingCache(path=query_cache_path)
+        if result_cache_threshold:
+            from src.services.result_cache import SemanticResultCache
+            result_cache = SemanticResultCache(supabase, threshold=result_cache_threshold)
+        if rerank:
+            from src.services.reranker import FieldReranker
+            reranker = FieldReranker(rerank_weights, rerank_candidates, rerank_budget_ms)
         
         # Initialize searcher and perform search
-        searcher = SimilaritySearcher(supabase)
-        results = searcher.search(query, mode, top_k)
+        searcher = SimilaritySearcher(
+            supabase,
+            backend=get_embedding_backend(backend, dimensions=dimensions),
+            versions=EmbeddingVersionRegistry(supabase),
+            query_cache=query_cache,
+            local_indexes=local_indexes,
+            result_cache=result_cache,
+            reranker=reranker
+        )
+        # One-shot snapshot searches skip this so they never touch the database
+        if query_cache and (serve or not local_indexes):
+            searcher.prune_query_cache()
+        if serve:
+            from src.services.search_server import SearchServer
+            SearchServer(searcher, host, port).run()
+            return
+
+        if queries_file:
+            with open(queries_file) as f:
+                queries = [line.strip() for line in f if line.strip()]
+            batch_results = searcher.search_many(queries, mode, top_k, probes=probes, ef_search=ef_search)
+            for batch_query, results in zip(queries, batch_results):
+                logger.info(f"\n{batch_query!r}: " + ", ".join(
+                    f"{result['screen_id']} ({result['similarity']:.4f})" for result in results
+                ))
+            return
+
+        if mode == 'all':
+            results = searcher.federated_search(query, top_k, weights, probes=probes, ef_search=ef_search)
+            for result in results:
+                logger.info(f"\nSite URL: {result['site_url']}")
+                logger.info(f"Federated Score: {result['score']:.4f}")
+                for hit_mode, hit in result['modes'].items():
+                    logger.info(f"  {hit_mode}: screen {hit['screen_id']}, similarity {hit['similarity']:.4f}")
+            if not results:
+                logger.info("No similar records found")
+            return
+
+        if like is not None:
+            results = searcher.more_like_this(like, mode, top_k)
+        elif group_by_site:
+            results = searcher.search_sites(query, mode, top_k, probes=probes, ef_search=ef_search, filters=filters)
+        elif mode == 'hybrid':
+            results = searcher.hybrid_search(query, hybrid_table, top_k, probes=probes, ef_search=ef_search)
+        else:
+            results = searcher.search(query, mode, top_k, probes=probes, ef_search=ef_search, filters=filters,
+                                      fields=fields, oversample=oversample)
         
         # Print results
         if results:
@@ -118,11 +613,24 @@ def main(query: str, mode: str = 'regular', top_k: int = 5):
             for result in results:
                 logger.info(f"\nScreen ID: {result['screen_id']}")
                 logger.info(f"Site URL: {result['site_url']}")
-                logger.info(f"Similarity Score: {result['similarity']:.4f}")
-                if mode == 'regular':
+                if 'score' in result:
+                    logger.info(f"Fused Score: {result['score']:.4f} "
+                                f"(vector rank {result['vector_rank']}, lexical rank {result['lexical_rank']})")
+                else:
+                    logger.info(f"Similarity Score: {result['similarity']:.4f}")
+                if 'webp_url' in result:
                     logger.info(f"Image URL: {result['webp_url']}")
+                if 'rerank_score' in result:
+                    logger.info(f"Rerank Score: {result['rerank_score']:.4f}")
+                if 'site_hits' in result:
+                    logger.info(f"Matching screens on site: {result['site_hits']}")
+                for field, value in result.get('fields', {}).items():
+                    logger.info(f"{field}: {value}")
         else:
             logger.info("No similar records found")
+
+        if searcher.query_cache:
+            logger.info(f"Query embedding cache: {searcher.query_cache.stats()}")
             
     except Exception as e:
         logger.error(f"Error in main execution: {str(e)}")
@@ -130,11 +638,105 @@ def main(query: str, mode: str = 'regular', top_k: int = 5):
 
 if __name__ == "__main__":
     parser = argparse.ArgumentParser(description='Search for similar analyses')
-    parser.add_argument('query', type=str, help='Search query text')
-    parser.add_argument('--mode', choices=['regular', 'fusion', 'html'], 
-                      default='regular', help='Search mode')
+    parser.add_argument('query', type=str, nargs='?', help='Search query text')
+    parser.add_argument('--mode', choices=['regular', 'fusion', 'html', 'hybrid', 'all'], 
+                      default='regular',
+                      help='Search mode (hybrid: full-text + vector with rank fusion; all: per-site across tables)')
+    parser.add_argument('--weights', type=str, default=None,
+                      help="Per-mode weights for --mode all, e.g. 'regular=1,fusion=1,html=0.5'")
     parser.add_argument('--top-k', type=int, default=5,
                       help='Number of top results to return')
+    parser.add_argument('--hybrid-table', choices=list(ANALYSIS_TABLES), default='regular',
+                      help='Table searched by --mode hybrid')
+    parser.add_argument('--dimensions', type=int, default=EMBEDDING_DIMENSIONS,
+                      help='Embedding width; values below 1536 search the halfvec columns')
+    parser.add_argument('--backend', choices=['openai', 'local'], default=EMBEDDING_BACKEND,
+                      help='Query embedding backend for --dimensions below 1536, --local-index and tables '
+                           'without a registered embedding version (full-width search follows the active version)')
+    # Following the active version is the default now; the flag is accepted for existing callers
+    parser.add_argument('--versioned', action='store_true', help=argparse.SUPPRESS)
+    parser.add_argument('--probes', type=int, default=None,
+                      help='ivfflat lists to probe (higher is slower with better recall)')
+    parser.add_argument('--ef-search', type=int, default=None,
+                      help='HNSW candidate list size (higher is slower with better recall)')
+    parser.add_argument('--query-cache', type=str, default=os.getenv('QUERY_CACHE_PATH'),
+                      help='SQLite file caching query embeddings between runs')
+    parser.add_argument('--local-index', type=str, default=None,
+                      help='Snapshot directory (from src.scripts.build_local_index) to search in process')
+    parser.add_argument('--sync', action='store_true',
+                      help='With --local-index, pull rows updated since the snapshot first')
+    parser.add_argument('--queries-file', type=str, default=None,
+                      help='File with one query per line, searched in one batched pass')
+    parser.add_argument('--serve', action='store_true',
+                      help='Run a long-lived HTTP service (/search, /healthz) with warm clients')
+    parser.add_argument('--host', type=str, default='127.0.0.1',
+                      help='Interface for --serve')
+    parser.add_argument('--port', type=int, default=8080,
+                      help='Port for --serve')
+    
+    for field in FILTER_FIELDS:
+        parser.add_argument(f"--{field.replace('_', '-')}", dest=field, action='append', default=None,
+                          help=f'Only return rows whose {field} matches (repeat for any of several values)')
+    
+    parser.add_argument('--fields', type=str, default=None,
+                      help="Comma-separated columns or JSONB paths to return, e.g. 'section,web_analysis.content_purpose'")
+    parser.add_argument('--oversample', type=int, default=None,
+                      help='Two-stage search: Hamming pass over binary-quantized vectors, '
+                           'exact rerank of top-k x oversample candidates')
+    parser.add_argument('--result-cache-threshold', type=float, default=None,
+                      help='Reuse results of earlier near-duplicate queries at this cosine similarity '
+                           '(e.g. 0.95; most useful with --serve)')
+    parser.add_argument('--like', type=int, default=None,
+                      help='Return the precomputed neighbors of this analysis row id instead of searching')
+    parser.add_argument('--group-by-site', action='store_true',
+                      help='Collapse results by site_url in SQL; top-k counts distinct sites')
+    parser.add_argument('--rerank', action='store_true',
+                      help='Reorder over-fetched candidates by similarity plus color scheme, industry, '
+                           'component and section matches with the query')
+    parser.add_argument('--rerank-weights', type=str, default=None,
+                      help="Rerank weights, e.g. 'similarity=1,design_color_scheme=0.2,layout_components=0.1'")
+    parser.add_argument('--rerank-candidates', type=int, default=50,
+                      help='Candidates fetched for --rerank')
+    parser.add_argument('--rerank-budget-ms', type=float, default=20.0,
+                      help='Time allowed for field matching before falling back to vector scores')
     
     args = parser.parse_args()
-    main(args.query, args.mode, args.top_k) 
\ No newline at end of file
+    filters = {field: getattr(args, field) for field in FILTER_FIELDS if getattr(args, field)}
+    fields = [field.strip() for field in args.fields.split(',') if field.strip()] if args.fields else None
+    if (filters or fields) and (args.mode in ('hybrid', 'all') or args.queries_file):
+        parser.error('filters and fields apply to single-query vector search only')
+    weights = None
+    if args.weights:
+        try:
+            weights = {mode: 0.0 for mode in ANALYSIS_TABLES}
+            for item in args.weights.split(','):
+                weight_mode, weight = item.split('=')
+                if weight_mode.strip() not in ANALYSIS_TABLES:
+                    raise ValueError(weight_mode)
+                weights[weight_mode.strip()] = float(weight)
+        except ValueError:
+            parser.error("--weights expects mode=weight pairs, e.g. 'regular=1,html=0.5'")
+    rerank_weights = None
+    if args.rerank_weights:
+        from src.services.reranker import DEFAULT_RERANK_WEIGHTS
+        try:
+            rerank_weights = {}
+            for item in args.rerank_weights.split(','):
+                field, weight = item.split('=')
+                if field.strip() not in DEFAULT_RERANK_WEIGHTS:
+                    raise ValueError(field)
+                rerank_weights[field.strip()] = float(weight)
+        except ValueError:
+            parser.error(f"--rerank-weights expects field=weight pairs over {', '.join(DEFAULT_RERANK_WEIGHTS)}")
+    if args.rerank and (args.mode in ('hybrid', 'all') or args.queries_file or args.group_by_site):
+        parser.error('--rerank applies to single-query vector search only')
+    if not args.query and not args.queries_file and not args.serve and args.like is None:
+        parser.error('a query, --like, --queries-file or --serve is required')
+    if (args.like is not None or args.group_by_site) and args.mode in ('hybrid', 'all'):
+        parser.error('--like and --group-by-site need a table mode (regular, fusion or html)')
+    main(args.query, args.mode, args.top_k, args.dimensions, args.backend, args.probes,
+         args.ef_search, args.query_cache, args.local_index, args.sync, args.queries_file,
+         args.serve, args.host, args.port, args.hybrid_table, filters or None,
+         weights, fields, args.oversample, args.result_cache_threshold,
+         args.like, args.group_by_site, args.rerank, rerank_weights, args.rerank_candidates,
+         args.rerank_budget_ms)
\ No newline at end of file
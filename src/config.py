@@ -6,6 +6,12 @@ load_dotenv()
 SUPABASE_URL = os.getenv('PUBLIC_SUPABASE_URL')
 SUPABASE_KEY = os.getenv('SUPABASE_SERVICE_ROLE_KEY')
 GEMINI_API_KEY = os.getenv('GEMINI_API_KEY')
+OPENAI_API_KEY = os.getenv('OPENAI_API_KEY')
+
+# Database access: 'supabase' sends everything through PostgREST; 'postgres' runs
+# RPCs and bulk reads/writes over a direct connection to DATABASE_URL
+DB_BACKEND = os.getenv('DB_BACKEND', 'supabase')
+DATABASE_URL = os.getenv('DATABASE_URL')
 
 GEMINI_CONFIG = {
     "temperature": 1,
@@ -14,4 +20,20 @@ GEMINI_CONFIG = {
     "max_output_tokens": 8192,
 }
 
-STORAGE_BASE_URL = "http://127.0.0.1:54321/storage/v1/object/public/screens" 
\ No newline at end of file
+STORAGE_BASE_URL = "http://127.0.0.1:54321/storage/v1/object/public/screens"
+
+# Embedding configuration
+EMBEDDING_BACKEND = os.getenv('EMBEDDING_BACKEND', 'openai')  # 'openai' or 'local'
+EMBEDDING_MODEL = os.getenv('EMBEDDING_MODEL', 'text-embedding-3-small')
+FULL_EMBEDDING_DIMENSIONS = 1536
+EMBEDDING_DIMENSIONS = int(os.getenv('EMBEDDING_DIMENSIONS', FULL_EMBEDDING_DIMENSIONS))
+
+# Full-width vectors live in `embedding vector(1536)`, reduced ones in `embedding_half halfvec(N)`
+EMBEDDING_COLUMN = 'embedding' if EMBEDDING_DIMENSIONS == FULL_EMBEDDING_DIMENSIONS else 'embedding_half'
+
+# Analysis tables by processing/search mode
+ANALYSIS_TABLES = {
+    'regular': 'screen_analysis',
+    'fusion': 'screen_analysis_fusion',
+    'html': 'screen_html_analysis',
+}
@@ -0,0 +1,255 @@
+import sys
+import csv
+import json
+import time
+import logging
+import argparse
+from typing import Callable, Dict, List, Optional
+
+import numpy as np
+from dotenv import load_dotenv
+
+from src.config import ANALYSIS_TABLES, FULL_EMBEDDING_DIMENSIONS
+from src.services.clients import create_database_client
+from src.services.local_index import BinaryIndex, FlatIndex, HNSWIndex, IVFIndex, hnswlib
+from src.services.vector_store import VectorStore
+from src.services.vector_utils import (
+    blocked_top_k, fetch_embeddings, normalize_rows, recall_at_k, reduce_dimensions
+)
+
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger(__name__)
+
+load_dotenv()
+
+
+def synthetic_vectors(count: int, dimensions: int, clusters: int = 100, seed: int = 0) -> np.ndarray:
+    """Clustered Gaussian vectors, normalized; clusters make ANN recall non-trivial"""
+    rng = np.random.default_rng(seed)
+    centers = rng.normal(size=(clusters, dimensions)).astype(np.float32)
+    vectors = centers[rng.integers(0, clusters, count)]
+    vectors += 0.6 * rng.normal(size=(count, dimensions)).astype(np.float32)
+    return normalize_rows(vectors)
+
+
+def measure(search: Callable[[np.ndarray], List], queries: np.ndarray, truth: np.ndarray) -> Dict:
+    """Run every query once and report recall@k, QPS and latency percentiles"""
+    found, latencies = [], []
+    top_k = truth.shape[1]
+    started = time.perf_counter()
+    for query in queries:
+        query_started = time.perf_counter()
+        hits = list(search(query))
+        latencies.append((time.perf_counter() - query_started) * 1000)
+        found.append((hits + [-1] * top_k)[:top_k])
+    elapsed = time.perf_counter() - started
+    return {
+        f'recall@{top_k}': round(recall_at_k(np.asarray(found), truth), 4),
+        'qps': round(len(queries) / elapsed, 1) if elapsed else None,
+        'p50_ms': round(float(np.percentile(latencies, 50)), 3),
+        'p99_ms': round(float(np.percentile(latencies, 99)), 3),
+    }
+
+
+def sweep_local(corpus: np.ndarray, queries: np.ndarray, truth: np.ndarray, dims: List[int],
+                lists: List[int], probes: List[int], m: List[int], ef_search: List[int],
+                oversample: List[int]) -> List[Dict]:
+    """Sweep the in-process index types and parameters"""
+    top_k = truth.shape[1]
+    rows = []
+
+    def add(index_name: str, d: int, params: Dict, build_seconds: float, search):
+        row = {'engine': 'local', 'index': index_name, 'dimensions': d, **params,
+               'build_s': round(build_seconds, 2), **measure(search, queries_d, truth)}
+        logger.info(json.dumps(row))
+        rows.append(row)
+
+    for d in dims:
+        full_width = d >= corpus.shape[1]
+        corpus_d = corpus if full_width else reduce_dimensions(corpus, d)
+        queries_d = queries if full_width else reduce_dimensions(queries, d)
+
+        flat = FlatIndex()
+        flat.build(corpus_d)
+        add('flat', d, {}, 0.0, lambda q: flat.search(q, top_k))
+
+        for n_lists in lists:
+            started = time.perf_counter()
+            ivf = IVFIndex(n_lists=n_lists)
+            ivf.build(corpus_d)
+            build_seconds = time.perf_counter() - started
+            for p in probes:
+                add('ivf', d, {'lists': n_lists, 'probes': p}, build_seconds,
+                    lambda q, p=p: ivf.search(q, top_k, probes=p))
+
+        if hnswlib is not None:
+            for m_value in m:
+                started = time.perf_counter()
+                hnsw = HNSWIndex(m=m_value)
+                hnsw.build(corpus_d)
+                build_seconds = time.perf_counter() - started
+                for ef in ef_search:
+                    add('hnsw', d, {'m': m_value, 'ef_search': ef}, build_seconds,
+                        lambda q, ef=ef: hnsw.search(q, top_k, ef_search=ef))
+        elif m:
+            logger.warning("hnswlib is not installed; skipping the HNSW sweep")
+
+        if oversample:
+            started = time.perf_counter()
+            binary = BinaryIndex()
+            binary.build(corpus_d)
+            build_seconds = time.perf_counter() - started
+            for factor in oversample:
+                add('binary', d, {'oversample': factor}, build_seconds,
+                    lambda q, factor=factor: binary.search(q, top_k, oversample=factor))
+    return rows
+
+
+def sweep_supabase(supabase, table: str, ids: np.ndarray, queries: np.ndarray, truth: np.ndarray,
+                   probes: List[int], ef_search: List[int], oversample: List[int]) -> List[Dict]:
+    """Sweep the query-time knobs of the database search functions against the table's current index"""
+    top_k = truth.shape[1]
+    truth_ids = ids[truth]
+    rows = []
+
+    def rpc_search(rpc: str, params: Dict):
+        def search(query: np.ndarray) -> List[int]:
+            response = supabase.rpc(rpc, {
+                'query_embedding': query.tolist(), 'top_k': top_k, 'table_name': table, **params
+            }).execute()
+            return [row['id'] for row in response.data or []]
+        return search
+
+    runs = [('search_embeddings', {})]
+    runs += [('search_embeddings', {'probes': p}) for p in probes]
+    runs += [('search_embeddings', {'ef_search': ef}) for ef in ef_search]
+    runs += [('search_embeddings_quantized', {'oversample': factor}) for factor in oversample]
+    for rpc, params in runs:
+        row = {'engine': 'supabase', 'index': rpc, 'dimensions': queries.shape[1], **params,
+               **measure(rpc_search(rpc, params), queries, truth_ids)}
+        logger.info(json.dumps(row))
+        rows.append(row)
+    return rows
+
+
+def write_rows(rows: List[Dict], path: str):
+    """Write results as CSV (.csv) or JSON (anything else)"""
+    if path.endswith('.csv'):
+        columns = list(dict.fromkeys(key for row in rows for key in row))
+        with open(path, 'w', newline='') as f:
+            writer = csv.DictWriter(f, fieldnames=columns)
+            writer.writeheader()
+            writer.writerows(rows)
+    else:
+        with open(path, 'w') as f:
+            json.dump(rows, f, indent=2)
+    logger.info(f"Wrote {len(rows)} results to {path}")
+
+
+def main(engine: str, mode: str, store: Optional[str], synthetic: int, synthetic_dims: int, sample: int,
+         top_k: int, dims: List[int], lists: List[int], probes: List[int], m: List[int],
+         ef_search: List[int], oversample: List[int], output: Optional[str], limit: Optional[int] = None):
+    """Benchmark recall@k, QPS and latency of the search paths
+
+    Args:
+        engine: 'local' sweeps the in-process indexes; 'supabase' the database search functions
+        mode: Analysis table read by the supabase engine, or by the local engine without --store/--synthetic
+        store: Vector store directory (src.scripts.export_vectors) to benchmark locally
+        synthetic: Number of synthetic vectors to generate instead of reading real ones
+        synthetic_dims: Width of the synthetic vectors
+        sample: Number of queries
+        top_k: Neighbors compared per query
+        dims: Widths for the local sweep (reduced like the halfvec columns)
+        lists: IVF list counts for the local sweep
+        probes: IVF probes (local) or ivfflat.probes (supabase)
+        m: HNSW graph degrees for the local sweep
+        ef_search: HNSW candidate list sizes
+        oversample: Oversampling factors of the binary-quantized two-stage search
+        output: CSV or JSON file receiving the results (rows are logged either way)
+        limit: Optional cap on rows fetched from the table
+    """
+    try:
+        supabase = None
+        ids = None
+        if engine == 'supabase' or (not store and not synthetic):
+            supabase = create_database_client()
+            ids, corpus = fetch_embeddings(supabase, ANALYSIS_TABLES[mode], limit=limit)
+            corpus = normalize_rows(corpus)
+        elif store:
+            vector_store = VectorStore.open(store)
+            ids, corpus = np.asarray(vector_store.ids), vector_store.vectors
+        else:
+            corpus = synthetic_vectors(synthetic + sample, synthetic_dims)
+
+        rng = np.random.default_rng(0)
+        query_rows = rng.choice(len(corpus), size=min(sample, len(corpus) // 2), replace=False)
+        queries = np.asarray(corpus[query_rows], dtype=np.float32)
+
+        if engine == 'supabase':
+            # Queries stay in the table, so ground truth (and the searches) include their own row
+            started = time.perf_counter()
+            truth, _ = blocked_top_k(queries, corpus, top_k)
+            logger.info(f"Ground truth for {len(queries)} queries over {len(corpus)} rows "
+                        f"in {time.perf_counter() - started:.1f}s")
+            rows = sweep_supabase(supabase, ANALYSIS_TABLES[mode], ids, queries, truth,
+                                  probes, ef_search, oversample)
+        else:
+            # Held-out queries: the corpus excludes them
+            keep = np.ones(len(corpus), dtype=bool)
+            keep[query_rows] = False
+            corpus = np.asarray(corpus[keep], dtype=np.float32)
+            started = time.perf_counter()
+            truth, _ = blocked_top_k(queries, corpus, top_k)
+            logger.info(f"Ground truth for {len(queries)} queries over {len(corpus)} vectors "
+                        f"in {time.perf_counter() - started:.1f}s")
+            rows = sweep_local(corpus, queries, truth, dims or [corpus.shape[1]], lists, probes,
+                               m, ef_search, oversample)
+
+        # Each row was logged as it was measured; --output keeps a machine-readable copy
+        if output:
+            write_rows(rows, output)
+
+    except Exception as e:
+        logger.error(f"Error running search benchmark: {str(e)}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Benchmark search recall, QPS and latency across index settings')
+    parser.add_argument('--engine', choices=['local', 'supabase'], default='local',
+                      help='In-process indexes, or the database search functions on the live table')
+    parser.add_argument('--mode', choices=list(ANALYSIS_TABLES), default='regular',
+                      help='Analysis table to read vectors from')
+    parser.add_argument('--store', type=str, default=None,
+                      help='Vector store directory to benchmark locally (from src.scripts.export_vectors)')
+    parser.add_argument('--synthetic', type=int, default=0,
+                      help='Generate this many synthetic vectors instead of reading real ones')
+    parser.add_argument('--synthetic-dims', type=int, default=FULL_EMBEDDING_DIMENSIONS,
+                      help='Width of synthetic vectors')
+    parser.add_argument('--sample', type=int, default=200,
+                      help='Number of queries')
+    parser.add_argument('--top-k', type=int, default=10,
+                      help='Neighbors compared per query')
+    parser.add_argument('--dims', type=int, nargs='*', default=[],
+                      help='Reduced widths to sweep locally (default: full width only)')
+    parser.add_argument('--lists', type=int, nargs='*', default=[100],
+                      help='IVF list counts to sweep locally')
+    parser.add_argument('--probes', type=int, nargs='*', default=[1, 4, 16],
+                      help='IVF probes to sweep')
+    parser.add_argument('--m', type=int, nargs='*', default=[16],
+                      help='HNSW degrees to sweep locally (needs hnswlib)')
+    parser.add_argument('--ef-search', type=int, nargs='*', default=[40, 100],
+                      help='HNSW ef_search values to sweep')
+    parser.add_argument('--oversample', type=int, nargs='*', default=[4],
+                      help='Binary-quantized oversampling factors to sweep')
+    parser.add_argument('--output', type=str, default=None,
+                      help='Also write results to this .csv or .json file')
+    parser.add_argument('--limit', type=int, default=None,
+                      help='Maximum number of rows fetched from the table')
+
+    args = parser.parse_args()
+    main(args.engine, args.mode, args.store, args.synthetic, args.synthetic_dims, args.sample, args.top_k,
+         args.dims, args.lists, args.probes, args.m, args.ef_search, args.oversample, args.output, args.limit)
@@ -0,0 +1,216 @@
+import os
+import sys
+import time
+import logging
+import argparse
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+from dotenv import load_dotenv
+
+from src.config import ANALYSIS_TABLES, EMBEDDING_COLUMN
+from src.services.clients import create_database_client
+from src.services.vector_store import VectorStore
+from src.services.vector_utils import blocked_top_k, fetch_embeddings, normalize_rows
+
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger(__name__)
+
+load_dotenv()
+
+NEIGHBORS_TABLE = 'screen_neighbors'
+# Full rebuilds are written here and swapped in with swap_neighbor_lists
+NEIGHBORS_STAGING_TABLE = 'screen_neighbors_staging'
+
+
+def parallel_top_k(queries: np.ndarray, corpus: np.ndarray, top_k: int, memory_mb: int = 512,
+                   workers: Optional[int] = None) -> Tuple[np.ndarray, np.ndarray]:
+    """Exact top-k of every query, split over worker threads within a memory budget
+
+    NumPy releases the GIL in matrix multiplies and partitions, so threads use
+    all cores while sharing one copy of the corpus.
+    """
+    workers = max(1, min(workers or os.cpu_count() or 1, len(queries)))
+    corpus_block = min(len(corpus), 16384)
+    # A score tile costs ~16 bytes per element: float32 scores, their negation and int64 partition indices
+    query_block = max(1, (memory_mb * 1024 * 1024 // workers) // (corpus_block * 16))
+    chunks = np.array_split(np.arange(len(queries)), workers)
+
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        parts = list(executor.map(
+            lambda rows: blocked_top_k(queries[rows], corpus, top_k, corpus_block, query_block), chunks
+        ))
+    return np.concatenate([p[0] for p in parts]), np.concatenate([p[1] for p in parts])
+
+
+def _drop_self(indices: np.ndarray, scores: np.ndarray, own: np.ndarray, top_k: int) -> List[List[tuple]]:
+    """Turn (top_k + 1) rows into top_k neighbor lists without each query's own row"""
+    lists = []
+    for row_indices, row_scores, own_index in zip(indices, scores, own):
+        pairs = [(int(i), float(s)) for i, s in zip(row_indices, row_scores) if i != own_index]
+        lists.append(pairs[:top_k])
+    return lists
+
+
+def _fetch_rank(supabase, table: str, rank: int, page_size: int = 1000) -> Dict[int, float]:
+    """similarity at `rank` for every source that has a neighbor list"""
+    found = {}
+    start = 0
+    while True:
+        response = supabase.table(NEIGHBORS_TABLE)\
+            .select('source_id, similarity')\
+            .eq('table_name', table)\
+            .eq('rank', rank)\
+            .order('source_id')\
+            .range(start, start + page_size - 1)\
+            .execute()
+        found.update({row['source_id']: row['similarity'] for row in response.data or []})
+        if not response.data or len(response.data) < page_size:
+            return found
+        start += page_size
+
+
+def _fetch_lists(supabase, table: str, source_ids: List[int], chunk_size: int = 200) -> Dict[int, List[tuple]]:
+    lists: Dict[int, List[tuple]] = {source_id: [] for source_id in source_ids}
+    for start in range(0, len(source_ids), chunk_size):
+        response = supabase.table(NEIGHBORS_TABLE)\
+            .select('source_id, neighbor_id, similarity')\
+            .eq('table_name', table)\
+            .in_('source_id', source_ids[start:start + chunk_size])\
+            .order('rank')\
+            .execute()
+        for row in response.data or []:
+            lists[row['source_id']].append((row['neighbor_id'], row['similarity']))
+    return lists
+
+
+def _write_lists(supabase, table: str, lists: Dict[int, List[tuple]], batch_size: int = 1000,
+                 target: str = NEIGHBORS_TABLE):
+    rows = [
+        {'table_name': table, 'source_id': source_id, 'rank': rank,
+         'neighbor_id': neighbor_id, 'similarity': similarity}
+        for source_id, neighbors in lists.items()
+        for rank, (neighbor_id, similarity) in enumerate(neighbors, start=1)
+    ]
+    for start in range(0, len(rows), batch_size):
+        supabase.table(target).upsert(rows[start:start + batch_size]).execute()
+    logger.info(f"Wrote {len(rows)} neighbor rows for {len(lists)} sources of {table} to {target}")
+
+
+def _swap_lists(supabase, table: str):
+    """Replace a table's neighbor lists with the staged ones in one transaction"""
+    swapped = supabase.rpc('swap_neighbor_lists', {'p_table_name': table}).execute().data
+    logger.info(f"Swapped in {swapped} staged neighbor rows for {table}")
+
+
+def build_graph(supabase, table: str, ids: np.ndarray, vectors: np.ndarray, top_k: int,
+                full: bool = False, memory_mb: int = 512, workers: Optional[int] = None) -> int:
+    """Compute and store neighbor lists; returns the number of sources written
+
+    Incremental runs compute lists for rows without one and merge new rows into
+    existing lists whose K-th neighbor they beat. Re-embedded rows need `full`,
+    which stages every list and swaps them in at the end, so readers never see
+    a table without neighbor lists.
+    """
+    vectors = normalize_rows(np.asarray(vectors, dtype=np.float32))
+    existing = {} if full else _fetch_rank(supabase, table, top_k)
+    if full:
+        # Clear leftovers of an interrupted rebuild
+        supabase.table(NEIGHBORS_STAGING_TABLE).delete().eq('table_name', table).execute()
+
+    is_new = np.asarray([source_id not in existing for source_id in ids], dtype=bool)
+    new_rows = np.flatnonzero(is_new)
+    old_rows = np.flatnonzero(~is_new)
+    logger.info(f"{table}: {len(new_rows)} rows need neighbor lists, {len(old_rows)} already have one")
+    if len(new_rows) == 0:
+        if full:
+            _swap_lists(supabase, table)
+        return 0
+
+    started = time.perf_counter()
+    updates: Dict[int, List[tuple]] = {}
+
+    # New rows against the whole table
+    indices, scores = parallel_top_k(vectors[new_rows], vectors, top_k + 1, memory_mb, workers)
+    for row, neighbors in zip(new_rows, _drop_self(indices, scores, new_rows, top_k)):
+        updates[int(ids[row])] = [(int(ids[i]), s) for i, s in neighbors]
+
+    # Existing lists take in new rows that beat their K-th neighbor
+    if len(old_rows):
+        indices, scores = parallel_top_k(vectors[old_rows], vectors[new_rows], top_k, memory_mb, workers)
+        improved = [
+            (int(ids[row]), [(int(ids[new_rows[i]]), float(s)) for i, s in zip(row_indices, row_scores)])
+            for row, row_indices, row_scores in zip(old_rows, indices, scores)
+            if row_scores[0] > existing[int(ids[row])]
+        ]
+        current = _fetch_lists(supabase, table, [source_id for source_id, _ in improved])
+        for source_id, candidates in improved:
+            merged = {neighbor_id: similarity for neighbor_id, similarity in current[source_id] + candidates}
+            updates[source_id] = sorted(merged.items(), key=lambda pair: pair[1], reverse=True)[:top_k]
+        logger.info(f"{len(improved)} existing lists gained new neighbors")
+
+    logger.info(f"Computed {len(updates)} neighbor lists in {time.perf_counter() - started:.1f}s")
+    if full:
+        _write_lists(supabase, table, updates, target=NEIGHBORS_STAGING_TABLE)
+        _swap_lists(supabase, table)
+    else:
+        _write_lists(supabase, table, updates)
+    return len(updates)
+
+
+def main(modes: List[str], top_k: int, column: str, full: bool, memory_mb: int,
+         workers: Optional[int], store_root: Optional[str] = None):
+    """Build or update the "more like this" neighbor table
+
+    Args:
+        modes: Tables to process ('regular', 'fusion', 'html')
+        top_k: Neighbors stored per row
+        column: Embedding column to read
+        full: Recompute every list instead of updating incrementally
+        memory_mb: Budget for the score tiles of the matrix multiplies
+        workers: Threads used for the multiplies (all cores when None)
+        store_root: Read vectors from `<store_root>/<mode>` stores instead of the database
+    """
+    try:
+        supabase = create_database_client()
+        for mode in modes:
+            table = ANALYSIS_TABLES[mode]
+            if store_root:
+                store = VectorStore.open(os.path.join(store_root, mode))
+                ids, vectors = np.asarray(store.ids), store.vectors
+            else:
+                ids, vectors = fetch_embeddings(supabase, table, column)
+            if len(ids) <= top_k:
+                logger.warning(f"{table} has only {len(ids)} embedded rows; skipping")
+                continue
+            build_graph(supabase, table, ids, vectors, top_k, full, memory_mb, workers)
+
+    except Exception as e:
+        logger.error(f"Error building neighbor graph: {str(e)}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Precompute top-K neighbors of every row for "more like this"')
+    parser.add_argument('--mode', choices=list(ANALYSIS_TABLES) + ['all'], default='regular',
+                      help='Table to process')
+    parser.add_argument('--top-k', type=int, default=20,
+                      help='Neighbors stored per row')
+    parser.add_argument('--column', type=str, default=EMBEDDING_COLUMN,
+                      help='Embedding column to read')
+    parser.add_argument('--full', action='store_true',
+                      help='Recompute all lists (needed after re-embedding)')
+    parser.add_argument('--memory-mb', type=int, default=512,
+                      help='Memory budget for score tiles')
+    parser.add_argument('--workers', type=int, default=None,
+                      help='Threads for the matrix multiplies (default: all cores)')
+    parser.add_argument('--store', type=str, default=None,
+                      help='Read vectors from <store>/<mode> exports instead of the database')
+
+    args = parser.parse_args()
+    modes = list(ANALYSIS_TABLES) if args.mode == 'all' else [args.mode]
+    main(modes, args.top_k, args.column, args.full, args.memory_mb, args.workers, args.store)
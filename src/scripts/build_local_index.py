@@ -0,0 +1,64 @@
+import sys
+import logging
+import argparse
+
+from dotenv import load_dotenv
+
+from src.config import ANALYSIS_TABLES, EMBEDDING_COLUMN
+from src.services.clients import create_database_client
+from src.services.local_index import LocalVectorIndex
+
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger(__name__)
+
+load_dotenv()
+
+
+def main(mode: str, path: str, column: str, sync: bool, index_type: str, dtype: str = 'float32'):
+    """Export a mode's vectors to a local snapshot, or sync an existing one
+
+    Args:
+        mode: Analysis table to snapshot ('regular', 'fusion', or 'html')
+        path: Snapshot directory
+        column: Embedding column to export
+        sync: Pull only rows updated since the snapshot's watermark
+        index_type: Local index ('auto', 'hnsw', 'ivf', 'binary', or 'flat')
+        dtype: Snapshot precision on disk ('float16' or 'float32')
+    """
+    try:
+        supabase = create_database_client()
+        if sync:
+            local = LocalVectorIndex.load(path, index_type)
+            changed = local.sync(supabase)
+            logger.info(f"Synced {changed} rows; snapshot holds {len(local.ids)} vectors "
+                        f"(watermark {local.meta.get('watermark')})")
+        else:
+            local = LocalVectorIndex.export(supabase, mode, path, column=column,
+                                            index_type=index_type, dtype=dtype)
+            logger.info(f"Snapshot holds {len(local.ids)} vectors (watermark {local.meta.get('watermark')})")
+
+    except Exception as e:
+        logger.error(f"Error building local index: {str(e)}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Export or sync a local vector snapshot for in-process search')
+    parser.add_argument('--mode', choices=list(ANALYSIS_TABLES), default='regular',
+                      help='Analysis table to snapshot')
+    parser.add_argument('--path', type=str, required=True,
+                      help='Snapshot directory')
+    parser.add_argument('--column', type=str, default=EMBEDDING_COLUMN,
+                      help='Embedding column to export')
+    parser.add_argument('--sync', action='store_true',
+                      help='Pull only rows updated since the snapshot watermark')
+    parser.add_argument('--index-type', choices=['auto', 'hnsw', 'ivf', 'binary', 'flat'], default='auto',
+                      help='Local index: hnsw needs hnswlib, auto picks the best available')
+    parser.add_argument('--dtype', choices=['float16', 'float32'], default='float32',
+                      help='Snapshot precision on disk (float16 halves the size)')
+
+    args = parser.parse_args()
+    main(args.mode, args.path, args.column, args.sync, args.index_type, args.dtype)
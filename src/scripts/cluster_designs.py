@@ -0,0 +1,301 @@
+import os
+import sys
+import json
+import time
+import logging
+import argparse
+import tempfile
+from multiprocessing import Pool
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+from dotenv import load_dotenv
+
+from src.config import ANALYSIS_TABLES, EMBEDDING_COLUMN
+from src.services.clients import create_database_client
+from src.services.vector_store import VectorStore, export_table
+from src.services.vector_utils import normalize_rows
+
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger(__name__)
+
+load_dotenv()
+
+# Set in each pool worker by _init_worker
+_worker_vectors = None
+_worker_centroids = None
+
+
+def _init_worker(store_path: str, centroids: np.ndarray):
+    """Map the store once per worker; pages are shared through the OS cache"""
+    global _worker_vectors, _worker_centroids
+    _worker_vectors = VectorStore.open(store_path).vectors
+    _worker_centroids = centroids
+
+
+def _assign_range(bounds: Tuple[int, int]) -> Tuple[int, np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+    """Nearest centroid of rows [start, stop), plus per-cluster vector sums and counts for refinement"""
+    start, stop = bounds
+    block = np.asarray(_worker_vectors[start:stop], dtype=np.float32)
+    scores = block @ _worker_centroids.T
+    labels = np.argmax(scores, axis=1)
+    similarities = scores[np.arange(len(labels)), labels]
+
+    k = len(_worker_centroids)
+    counts = np.bincount(labels, minlength=k)
+    sums = np.zeros_like(_worker_centroids)
+    order = np.argsort(labels, kind='stable')
+    present = np.flatnonzero(counts)
+    sums[present] = np.add.reduceat(block[order], np.concatenate([[0], np.cumsum(counts[present])[:-1]]))
+    return start, labels, similarities, sums, counts
+
+
+def kmeans_plus_plus(sample: np.ndarray, k: int, rng: np.random.Generator) -> np.ndarray:
+    """k-means++ seeding on cosine distance over a sample of normalized rows"""
+    centroids = np.empty((k, sample.shape[1]), dtype=np.float32)
+    centroids[0] = sample[rng.integers(len(sample))]
+    distances = 1.0 - sample @ centroids[0]
+    for i in range(1, k):
+        weights = np.clip(distances, 0.0, None) ** 2
+        total = weights.sum()
+        pick = rng.choice(len(sample), p=weights / total) if total > 0 else rng.integers(len(sample))
+        centroids[i] = sample[pick]
+        distances = np.minimum(distances, 1.0 - sample @ centroids[i])
+    return centroids
+
+
+def minibatch_kmeans(vectors: np.ndarray, k: int, batch_size: int = 4096, iterations: int = 100,
+                     tolerance: float = 1e-4, seed: int = 0) -> np.ndarray:
+    """Spherical mini-batch k-means (Sculley, 2010) over a possibly memory-mapped matrix
+
+    Each step reads one random batch of rows, assigns it to the nearest
+    centroids and moves every centroid toward its batch mean with a per-centroid
+    learning rate of 1 / (rows seen). Only batches are ever in memory.
+    """
+    rng = np.random.default_rng(seed)
+    n = len(vectors)
+    batch_size = min(batch_size, n)
+    sample_rows = np.sort(rng.choice(n, size=min(n, max(batch_size, 20 * k)), replace=False))
+    centroids = kmeans_plus_plus(np.asarray(vectors[sample_rows], dtype=np.float32), k, rng)
+    seen = np.zeros(k, dtype=np.float64)
+
+    for iteration in range(iterations):
+        # Sorted rows read the memory-mapped file front to back
+        rows = np.sort(rng.choice(n, size=batch_size, replace=False))
+        batch = np.asarray(vectors[rows], dtype=np.float32)
+        labels = np.argmax(batch @ centroids.T, axis=1)
+
+        counts = np.bincount(labels, minlength=k)
+        present = np.flatnonzero(counts)
+        order = np.argsort(labels, kind='stable')
+        sums = np.add.reduceat(batch[order], np.concatenate([[0], np.cumsum(counts[present])[:-1]]))
+
+        seen[present] += counts[present]
+        previous = centroids[present].copy()
+        step = (sums - counts[present, None] * previous) / seen[present, None]
+        centroids[present] = normalize_rows(previous + step.astype(np.float32))
+
+        shift = float(np.max(np.linalg.norm(centroids[present] - previous, axis=1)))
+        if shift < tolerance:
+            logger.info(f"Mini-batch k-means converged after {iteration + 1} batches")
+            break
+    return centroids
+
+
+def assign_all(store_path: str, count: int, centroids: np.ndarray, workers: Optional[int] = None,
+               block_rows: int = 65536) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Label every row of the store with a pool of processes
+
+    Returns:
+        (labels, similarities to the assigned centroid, recomputed centroids)
+    """
+    labels = np.empty(count, dtype=np.int64)
+    similarities = np.empty(count, dtype=np.float32)
+    sums = np.zeros_like(centroids)
+    counts = np.zeros(len(centroids), dtype=np.int64)
+
+    ranges = [(start, min(start + block_rows, count)) for start in range(0, count, block_rows)]
+    with Pool(processes=workers or os.cpu_count(), initializer=_init_worker,
+              initargs=(store_path, centroids)) as pool:
+        for start, block_labels, block_similarities, block_sums, block_counts in \
+                pool.imap_unordered(_assign_range, ranges):
+            labels[start:start + len(block_labels)] = block_labels
+            similarities[start:start + len(block_labels)] = block_similarities
+            sums += block_sums
+            counts += block_counts
+
+    # Empty clusters keep their centroid
+    refined = centroids.copy()
+    refined[counts > 0] = normalize_rows(sums[counts > 0])
+    return labels, similarities, refined
+
+
+def summarize(store: VectorStore, labels: np.ndarray, similarities: np.ndarray, min_similarity: float,
+              min_size: int, representatives: int) -> Tuple[np.ndarray, List[Dict]]:
+    """Keep tight clusters and describe them
+
+    Rows less similar than `min_similarity` to their centroid are noise. Clusters
+    with fewer than `min_size` remaining rows are dropped, and the rest are
+    renumbered from 1 by size.
+
+    Returns:
+        (cluster id per row, 0 for noise; one summary per kept cluster)
+    """
+    members = similarities >= min_similarity
+    sizes = np.bincount(labels[members], minlength=int(labels.max()) + 1)
+    kept = [int(c) for c in np.argsort(-sizes, kind='stable') if sizes[c] >= min_size]
+
+    cluster_ids = np.zeros(len(labels), dtype=np.int64)
+    renumber = np.zeros(len(sizes), dtype=np.int64)
+    renumber[kept] = np.arange(1, len(kept) + 1)
+    cluster_ids[members] = renumber[labels[members]]
+
+    ids = np.asarray(store.ids)
+    summaries = []
+    for cluster_id, label in enumerate(kept, start=1):
+        rows = np.flatnonzero(cluster_ids == cluster_id)
+        rows = rows[np.argsort(-similarities[rows], kind='stable')]
+        sites = {store.records['site_url'][row] for row in rows}
+        summaries.append({
+            'cluster_id': cluster_id,
+            'size': int(len(rows)),
+            'sites': len(sites),
+            'mean_similarity': round(float(similarities[rows].mean()), 4),
+            'representatives': [
+                {'id': int(ids[row]), 'similarity': round(float(similarities[row]), 4),
+                 **{field: values[row] for field, values in store.records.items()}}
+                for row in rows[:representatives]
+            ]
+        })
+    return cluster_ids, summaries
+
+
+def write_clusters(supabase, table: str, ids: np.ndarray, cluster_ids: np.ndarray, batch_size: int = 5000) -> int:
+    """Store cluster ids (null for noise) on the analysis rows; unchanged rows are skipped in SQL"""
+    updated = 0
+    for start in range(0, len(ids), batch_size):
+        chunk = cluster_ids[start:start + batch_size]
+        response = supabase.rpc('assign_clusters', {
+            'p_table_name': table,
+            'ids': [int(i) for i in ids[start:start + batch_size]],
+            'cluster_ids': [int(c) if c else None for c in chunk]
+        }).execute()
+        updated += response.data or 0
+    logger.info(f"Updated cluster_id on {updated} rows of {table}")
+    return updated
+
+
+def cluster_store(store: VectorStore, k: Optional[int], batch_size: int, iterations: int, refine: int,
+                  workers: Optional[int]) -> Tuple[np.ndarray, np.ndarray]:
+    """Fit centroids on mini-batches, then label every row (refining centroids on full passes)"""
+    count = len(store)
+    k = k or int(np.clip(count // 20, 2, 2048))
+    k = min(k, count)
+
+    started = time.perf_counter()
+    centroids = minibatch_kmeans(store.vectors, k, batch_size, iterations)
+    logger.info(f"Fitted {k} centroids on mini-batches in {time.perf_counter() - started:.1f}s")
+
+    for _ in range(refine + 1):
+        started = time.perf_counter()
+        labels, similarities, refined = assign_all(store.path, count, centroids, workers)
+        logger.info(f"Assigned {count} rows in {time.perf_counter() - started:.1f}s")
+        centroids = refined
+    return labels, similarities
+
+
+def main(modes: List[str], store_root: Optional[str], column: str, k: Optional[int], batch_size: int,
+         iterations: int, refine: int, min_similarity: float, min_size: int, representatives: int,
+         workers: Optional[int], output: Optional[str], dry_run: bool):
+    """Find clusters of near-identical designs and store them in cluster_id
+
+    Args:
+        modes: Tables to cluster ('regular', 'fusion', 'html')
+        store_root: Read vectors from `<store_root>/<mode>` stores; tables are exported to a
+            temporary store when None
+        column: Embedding column exported when no store is given
+        k: Number of k-means centroids (rows / 20, at most 2048, when None)
+        batch_size: Rows per mini-batch
+        iterations: Maximum number of mini-batches
+        refine: Full passes recomputing centroids from every row before the final assignment
+        min_similarity: Cosine similarity to the centroid needed to count as a cluster member
+        min_size: Smallest cluster kept
+        representatives: Rows closest to each centroid listed per cluster
+        workers: Processes for the assignment passes (all cores when None)
+        output: JSON file receiving cluster summaries (they are logged either way)
+        dry_run: Report clusters without writing cluster ids
+    """
+    try:
+        supabase = create_database_client()
+        report = {}
+        for mode in modes:
+            table = ANALYSIS_TABLES[mode]
+            with tempfile.TemporaryDirectory() as tmp:
+                if store_root:
+                    store = VectorStore.open(os.path.join(store_root, mode))
+                else:
+                    store = export_table(supabase, mode, tmp, column=column)
+                if len(store) < max(min_size, 2):
+                    logger.warning(f"{table} has only {len(store)} embedded rows; skipping")
+                    continue
+
+                labels, similarities = cluster_store(store, k, batch_size, iterations, refine, workers)
+                cluster_ids, summaries = summarize(store, labels, similarities, min_similarity,
+                                                   min_size, representatives)
+                clustered = int(np.count_nonzero(cluster_ids))
+                logger.info(f"{table}: {len(summaries)} clusters cover {clustered} of {len(store)} rows")
+                for summary in summaries:
+                    logger.info(f"    cluster {summary['cluster_id']}: {summary['size']} rows on "
+                                f"{summary['sites']} sites, mean similarity {summary['mean_similarity']}, "
+                                f"representatives {[entry['id'] for entry in summary['representatives']]}")
+
+                if not dry_run:
+                    write_clusters(supabase, table, np.asarray(store.ids), cluster_ids)
+                report[mode] = summaries
+
+        if output:
+            with open(output, 'w') as f:
+                json.dump(report, f, indent=2)
+            logger.info(f"Wrote cluster summaries to {output}")
+
+    except Exception as e:
+        logger.error(f"Error clustering designs: {str(e)}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Cluster near-identical designs (shared templates/themes)')
+    parser.add_argument('--mode', choices=list(ANALYSIS_TABLES) + ['all'], default='regular',
+                      help='Table to cluster')
+    parser.add_argument('--store', type=str, default=None,
+                      help='Read vectors from <store>/<mode> exports instead of exporting the table')
+    parser.add_argument('--column', type=str, default=EMBEDDING_COLUMN,
+                      help='Embedding column to export when --store is not given')
+    parser.add_argument('--clusters', type=int, default=None,
+                      help='Number of k-means centroids (default: rows / 20, at most 2048)')
+    parser.add_argument('--batch-size', type=int, default=4096,
+                      help='Rows per mini-batch')
+    parser.add_argument('--iterations', type=int, default=100,
+                      help='Maximum number of mini-batches')
+    parser.add_argument('--refine', type=int, default=1,
+                      help='Full passes recomputing centroids before the final assignment')
+    parser.add_argument('--min-similarity', type=float, default=0.9,
+                      help='Similarity to the centroid needed to join a cluster')
+    parser.add_argument('--min-size', type=int, default=3,
+                      help='Smallest cluster kept')
+    parser.add_argument('--representatives', type=int, default=5,
+                      help='Rows closest to the centroid listed per cluster')
+    parser.add_argument('--workers', type=int, default=None,
+                      help='Processes for the assignment passes (default: all cores)')
+    parser.add_argument('--output', type=str, default=None,
+                      help='Also write cluster summaries to this JSON file')
+    parser.add_argument('--dry-run', action='store_true',
+                      help='Report clusters without writing cluster_id')
+
+    args = parser.parse_args()
+    modes = list(ANALYSIS_TABLES) if args.mode == 'all' else [args.mode]
+    main(modes, args.store, args.column, args.clusters, args.batch_size, args.iterations, args.refine,
+         args.min_similarity, args.min_size, args.representatives, args.workers, args.output, args.dry_run)
@@ -0,0 +1,54 @@
+import sys
+import logging
+import argparse
+
+from dotenv import load_dotenv
+
+from src.config import ANALYSIS_TABLES, EMBEDDING_COLUMN
+from src.services.clients import create_database_client
+from src.services.vector_store import export_all
+
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger(__name__)
+
+load_dotenv()
+
+
+def main(modes, root: str, column: str, dtype: str):
+    """Export analysis tables to memory-mappable vector stores under `root/<mode>`
+
+    Args:
+        modes: Modes to export ('regular', 'fusion', 'html')
+        root: Directory receiving one store per mode
+        column: Embedding column to export
+        dtype: On-disk precision ('float16' or 'float32')
+    """
+    try:
+        supabase = create_database_client()
+        stores = export_all(supabase, root, modes, column=column, dtype=dtype)
+        for mode, store in stores.items():
+            size_mb = store.vectors.nbytes / (1024 * 1024)
+            logger.info(f"{mode}: {len(store)} vectors x {store.meta['dimensions']} ({size_mb:.1f} MB)")
+
+    except Exception as e:
+        logger.error(f"Error exporting vectors: {str(e)}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Export embeddings to memory-mapped vector stores')
+    parser.add_argument('--mode', choices=list(ANALYSIS_TABLES) + ['all'], default='all',
+                      help='Table to export')
+    parser.add_argument('--path', type=str, required=True,
+                      help='Root directory; each mode is written to <path>/<mode>')
+    parser.add_argument('--column', type=str, default=EMBEDDING_COLUMN,
+                      help='Embedding column to export')
+    parser.add_argument('--dtype', choices=['float16', 'float32'], default='float32',
+                      help='On-disk precision (float16 halves the size; indexes upcast it to float32 when built)')
+
+    args = parser.parse_args()
+    modes = list(ANALYSIS_TABLES) if args.mode == 'all' else [args.mode]
+    main(modes, args.path, args.column, args.dtype)
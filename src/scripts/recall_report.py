@@ -0,0 +1,216 @@
+import sys
+import time
+import logging
+import argparse
+from typing import List
+
+import numpy as np
+from dotenv import load_dotenv
+
+from src.config import ANALYSIS_TABLES, FULL_EMBEDDING_DIMENSIONS
+from src.services.clients import create_database_client
+from src.services.embedding_backends import OpenAIEmbeddingBackend
+from src.services.local_index import BinaryIndex, FlatIndex
+from src.services.vector_utils import (
+    fetch_embeddings, normalize_rows, reduce_dimensions, exact_top_k, recall_at_k
+)
+
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger(__name__)
+
+load_dotenv()
+
+
+def _embed_queries(queries: List[str]) -> np.ndarray:
+    """Embed text queries at full width so every reduced width can be derived from them"""
+    backend = OpenAIEmbeddingBackend(dimensions=FULL_EMBEDDING_DIMENSIONS)
+    return np.asarray(backend.embed(queries), dtype=np.float32)
+
+
+def _top_k_excluding(queries: np.ndarray, corpus: np.ndarray, top_k: int,
+                     query_rows: np.ndarray = None) -> np.ndarray:
+    """Exact top-k that skips the query's own row when queries are sampled from the corpus"""
+    if query_rows is None:
+        return exact_top_k(queries, corpus, top_k)
+    neighbors = exact_top_k(queries, corpus, top_k + 1)
+    return np.asarray([
+        [idx for idx in row if idx != own][:top_k]
+        for row, own in zip(neighbors, query_rows)
+    ])
+
+
+def build_report(full: np.ndarray, queries: np.ndarray, dims: List[int], top_k: int,
+                 query_rows: np.ndarray = None) -> List[dict]:
+    """Compare reduced halfvec search against exact full-width search"""
+    full = normalize_rows(full)
+    queries = normalize_rows(queries)
+    truth = _top_k_excluding(queries, full, top_k, query_rows)
+
+    rows = []
+    for d in dims:
+        corpus = reduce_dimensions(full, d, half_precision=d != FULL_EMBEDDING_DIMENSIONS)
+        reduced_queries = reduce_dimensions(queries, d, half_precision=d != FULL_EMBEDDING_DIMENSIONS)
+        approx = _top_k_excluding(reduced_queries, corpus, top_k, query_rows)
+        # halfvec stores 2 bytes per dimension, vector stores 4; both carry an 8 byte header
+        bytes_per_vector = (2 if d != FULL_EMBEDDING_DIMENSIONS else 4) * d + 8
+        rows.append({
+            'dimensions': d,
+            'storage': 'halfvec' if d != FULL_EMBEDDING_DIMENSIONS else 'vector',
+            f'recall@{top_k}': recall_at_k(approx, truth),
+            'bytes_per_vector': bytes_per_vector,
+            'table_mb': bytes_per_vector * full.shape[0] / 1024 ** 2,
+        })
+    return rows
+
+
+def _timed_search(index, queries: np.ndarray, top_k: int, query_rows: np.ndarray = None,
+                  **kwargs) -> tuple:
+    """Run one search per query, returning (neighbors, per-query latencies in ms)"""
+    neighbors, latencies = [], []
+    for i, query in enumerate(queries):
+        started = time.perf_counter()
+        rows = index.search(query, top_k + (query_rows is not None), **kwargs)
+        latencies.append((time.perf_counter() - started) * 1000)
+        if query_rows is not None:
+            rows = [row for row in rows if row != query_rows[i]][:top_k]
+        neighbors.append(rows)
+    return np.asarray(neighbors), np.asarray(latencies)
+
+
+def build_quantized_report(full: np.ndarray, queries: np.ndarray, oversamples: List[int], top_k: int,
+                           query_rows: np.ndarray = None) -> List[dict]:
+    """Compare binary-quantized search with exact rerank against exact full-width search in memory"""
+    full = normalize_rows(full).astype(np.float32)
+    queries = normalize_rows(queries).astype(np.float32)
+    truth = _top_k_excluding(queries, full, top_k, query_rows)
+
+    flat = FlatIndex()
+    flat.build(full)
+    _, exact_latencies = _timed_search(flat, queries, top_k, query_rows)
+    rows = [{'method': 'exact float32', f'recall@{top_k}': 1.0,
+             'p50_ms': np.percentile(exact_latencies, 50), 'p95_ms': np.percentile(exact_latencies, 95)}]
+
+    binary = BinaryIndex()
+    binary.build(full)
+    for oversample in oversamples:
+        approx, latencies = _timed_search(binary, queries, top_k, query_rows, oversample=oversample)
+        rows.append({
+            'method': f'binary x{oversample} + rerank',
+            f'recall@{top_k}': recall_at_k(approx, truth),
+            'p50_ms': np.percentile(latencies, 50),
+            'p95_ms': np.percentile(latencies, 95),
+        })
+    return rows
+
+
+def build_sql_quantized_report(supabase, table: str, ids: np.ndarray, full: np.ndarray, queries: np.ndarray,
+                               oversamples: List[int], top_k: int, query_rows: np.ndarray = None) -> List[dict]:
+    """Recall and round-trip latency of search_embeddings vs search_embeddings_quantized"""
+    truth = ids[_top_k_excluding(normalize_rows(queries), normalize_rows(full), top_k, query_rows)]
+    fetch_k = top_k + (query_rows is not None)
+
+    def run(rpc: str, extra: dict) -> dict:
+        found, latencies = [], []
+        for i, query in enumerate(queries):
+            params = {'query_embedding': query.tolist(), 'top_k': fetch_k, 'table_name': table, **extra}
+            started = time.perf_counter()
+            response = supabase.rpc(rpc, params).execute()
+            latencies.append((time.perf_counter() - started) * 1000)
+            hits = [row['id'] for row in response.data or []]
+            if query_rows is not None:
+                hits = [hit for hit in hits if hit != ids[query_rows[i]]]
+            found.append((hits + [-1] * top_k)[:top_k])
+        return {f'recall@{top_k}': recall_at_k(np.asarray(found), truth),
+                'p50_ms': np.percentile(latencies, 50), 'p95_ms': np.percentile(latencies, 95)}
+
+    rows = [{'method': 'sql search_embeddings', **run('search_embeddings', {})}]
+    for oversample in oversamples:
+        rows.append({'method': f'sql quantized x{oversample}',
+                     **run('search_embeddings_quantized', {'oversample': oversample})})
+    return rows
+
+
+def _log_method_rows(rows: List[dict], top_k: int):
+    logger.info(f"{'method':>26} {'recall@' + str(top_k):>10} {'p50 ms':>8} {'p95 ms':>8}")
+    for row in rows:
+        logger.info(f"{row['method']:>26} {row[f'recall@{top_k}']:>10.4f} {row['p50_ms']:>8.2f} {row['p95_ms']:>8.2f}")
+
+
+def main(mode: str, dims: List[int], top_k: int, sample: int, queries: List[str], limit: int = None,
+         oversamples: List[int] = None, sql: bool = False):
+    """Print recall of reduced-dimension halfvec vectors against the 1536-d vectors
+
+    Args:
+        mode: Analysis table to read ('regular', 'fusion', or 'html')
+        dims: Reduced widths to evaluate
+        top_k: Neighbors compared per query
+        sample: Number of stored rows used as queries when no text queries are given
+        queries: Optional text queries, embedded once at full width
+        limit: Optional cap on rows fetched from the table
+        oversamples: Oversampling factors of the binary-quantized two-stage search to evaluate
+        sql: Also time search_embeddings vs search_embeddings_quantized on the database
+    """
+    try:
+        supabase = create_database_client()
+        ids, full = fetch_embeddings(supabase, ANALYSIS_TABLES[mode], limit=limit)
+        if full.shape[0] <= top_k:
+            logger.error(f"Need more than {top_k} embedded rows in {ANALYSIS_TABLES[mode]}")
+            sys.exit(1)
+
+        query_rows = None
+        if queries:
+            query_vectors = _embed_queries(queries)
+        else:
+            rng = np.random.default_rng(0)
+            query_rows = rng.choice(full.shape[0], size=min(sample, full.shape[0]), replace=False)
+            query_vectors = full[query_rows]
+
+        rows = build_report(full, query_vectors, dims, top_k, query_rows)
+
+        logger.info(f"\nRecall against exact 1536-d search ({full.shape[0]} rows, {len(query_vectors)} queries):")
+        logger.info(f"{'dims':>6} {'storage':>8} {'recall@' + str(top_k):>10} {'bytes/vec':>10} {'table MB':>9}")
+        for row in rows:
+            logger.info(
+                f"{row['dimensions']:>6} {row['storage']:>8} {row[f'recall@{top_k}']:>10.4f} "
+                f"{row['bytes_per_vector']:>10} {row['table_mb']:>9.1f}"
+            )
+
+        if oversamples:
+            logger.info(f"\nBinary quantization (1 bit/dim, {full.shape[1] // 8} bytes/vec) with exact rerank, in memory:")
+            _log_method_rows(build_quantized_report(full, query_vectors, oversamples, top_k, query_rows), top_k)
+            if sql:
+                logger.info("\nDatabase round trips:")
+                _log_method_rows(build_sql_quantized_report(
+                    supabase, ANALYSIS_TABLES[mode], ids, full, query_vectors, oversamples, top_k, query_rows
+                ), top_k)
+
+    except Exception as e:
+        logger.error(f"Error building recall report: {str(e)}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Compare reduced-dimension recall against full 1536-d vectors')
+    parser.add_argument('--mode', choices=list(ANALYSIS_TABLES), default='regular',
+                      help='Analysis table to evaluate')
+    parser.add_argument('--dims', type=int, nargs='+', default=[256, 512, 768, 1536],
+                      help='Embedding widths to compare')
+    parser.add_argument('--top-k', type=int, default=10,
+                      help='Number of neighbors compared per query')
+    parser.add_argument('--sample', type=int, default=200,
+                      help='Stored rows used as queries when --queries is not given')
+    parser.add_argument('--queries', type=str, nargs='*', default=[],
+                      help='Text queries to embed instead of sampling stored rows')
+    parser.add_argument('--limit', type=int, default=None,
+                      help='Maximum number of rows to fetch')
+
+    parser.add_argument('--oversample', type=int, nargs='*', default=[],
+                      help='Also evaluate binary-quantized search with exact rerank at these oversampling factors')
+    parser.add_argument('--sql', action='store_true',
+                      help='With --oversample, also time the database search functions')
+
+    args = parser.parse_args()
+    main(args.mode, args.dims, args.top_k, args.sample, args.queries, args.limit, args.oversample, args.sql)
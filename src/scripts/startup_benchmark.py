@@ -0,0 +1,137 @@
+import os
+import sys
+import json
+import time
+import logging
+import argparse
+import subprocess
+from typing import Dict, List, Optional
+
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger(__name__)
+
+ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# Entry point -> cold-start target in ms for `python <script> --help`
+CLI_TARGETS_MS = {
+    'search_similar.py': 250,
+    'update_embeddings.py': 250,
+    'screen_labeling.py': 250,
+}
+
+# SDKs that must not load before a CLI has parsed its arguments
+HEAVY_MODULES = ['supabase', 'openai', 'google.generativeai', 'bs4', 'numpy']
+
+
+def _run(args: List[str]) -> tuple:
+    started = time.perf_counter()
+    completed = subprocess.run([sys.executable, *args], cwd=ROOT, capture_output=True, text=True,
+                               env={**os.environ, 'PYTHONPATH': ROOT})
+    return (time.perf_counter() - started) * 1000, completed
+
+
+def parse_importtime(stderr: str) -> List[Dict]:
+    """Parse `-X importtime` lines into {module, self_us, cumulative_us, depth}"""
+    imports = []
+    for line in stderr.splitlines():
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        self_us, cumulative_us, name = line[len('import time:'):].split('|')
+        imports.append({
+            'module': name.strip(),
+            'self_us': int(self_us),
+            'cumulative_us': int(cumulative_us),
+            'depth': (len(name) - len(name.lstrip())) // 2,
+        })
+    return imports
+
+
+def measure_cli(script: str, runs: int = 5, top: int = 10) -> Dict:
+    """Wall-clock of fresh `--help` processes plus the slowest top-level imports of one of them"""
+    timings = []
+    for _ in range(runs):
+        elapsed, completed = _run([script, '--help'])
+        if completed.returncode != 0:
+            raise RuntimeError(f"{script} --help failed: {completed.stderr.strip()[-500:]}")
+        timings.append(elapsed)
+
+    _, completed = _run(['-X', 'importtime', script, '--help'])
+    imports = parse_importtime(completed.stderr)
+    loaded = {entry['module'] for entry in imports}
+    top_level = sorted((entry for entry in imports if entry['depth'] <= 1),
+                       key=lambda entry: entry['cumulative_us'], reverse=True)
+    timings.sort()
+    return {
+        'cli': script,
+        'median_ms': round(timings[len(timings) // 2], 1),
+        'best_ms': round(timings[0], 1),
+        'heavy_imports': [module for module in HEAVY_MODULES if module in loaded],
+        'slowest_imports': [
+            {'module': entry['module'], 'cumulative_ms': round(entry['cumulative_us'] / 1000, 1)}
+            for entry in top_level[:top]
+        ],
+    }
+
+
+def main(scripts: List[str], runs: int, top: int, target_ms: Optional[float], output: Optional[str]):
+    """Measure CLI cold-start time and fail when a target is missed or an SDK loads eagerly
+
+    Args:
+        scripts: Entry points to measure
+        runs: Fresh interpreter processes per entry point
+        top: Slowest top-level imports listed per entry point
+        target_ms: Target overriding CLI_TARGETS_MS for every entry point
+        output: JSON file also receiving the results (they are only logged when None)
+    """
+    try:
+        interpreter_ms = sorted(_run(['-c', 'pass'])[0] for _ in range(runs))[runs // 2]
+        logger.info(f"Bare interpreter start: {interpreter_ms:.1f}ms")
+
+        results, failures = [], []
+        for script in scripts:
+            result = measure_cli(script, runs, top)
+            result['target_ms'] = target_ms or CLI_TARGETS_MS[script]
+            results.append(result)
+
+            logger.info(f"{script}: median {result['median_ms']}ms (target {result['target_ms']}ms), "
+                        f"best {result['best_ms']}ms")
+            for entry in result['slowest_imports']:
+                logger.info(f"    {entry['cumulative_ms']:>8.1f}ms  {entry['module']}")
+            if result['median_ms'] > result['target_ms']:
+                failures.append(f"{script} took {result['median_ms']}ms, target {result['target_ms']}ms")
+            if result['heavy_imports']:
+                failures.append(f"{script} imports {', '.join(result['heavy_imports'])} at startup")
+
+        if output:
+            with open(output, 'w') as f:
+                json.dump({'interpreter_ms': round(interpreter_ms, 1), 'results': results}, f, indent=2)
+            logger.info(f"Wrote startup timings to {output}")
+
+        for failure in failures:
+            logger.error(failure)
+        if failures:
+            sys.exit(1)
+
+    except Exception as e:
+        logger.error(f"Error running startup benchmark: {str(e)}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Benchmark CLI cold-start time and guard startup targets')
+    parser.add_argument('--cli', choices=list(CLI_TARGETS_MS), nargs='*', default=list(CLI_TARGETS_MS),
+                      help='Entry points to measure (default: all)')
+    parser.add_argument('--runs', type=int, default=5,
+                      help='Fresh processes per entry point; the median is compared with the target')
+    parser.add_argument('--top', type=int, default=10,
+                      help='Slowest top-level imports listed per entry point')
+    parser.add_argument('--target-ms', type=float, default=None,
+                      help='Cold-start target for every entry point (default: per-CLI targets)')
+    parser.add_argument('--output', type=str, default=None,
+                      help='Also write results to this JSON file (they are logged either way)')
+
+    args = parser.parse_args()
+    main(args.cli, args.runs, args.top, args.target_ms, args.output)
@@ -0,0 +1,80 @@
+import logging
+import argparse
+
+import numpy as np
+from dotenv import load_dotenv
+
+from src.config import ANALYSIS_TABLES, FULL_EMBEDDING_DIMENSIONS
+from src.services.clients import create_database_client
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+load_dotenv()
+
+
+def _random_query(dimensions: int) -> list:
+    vector = np.random.default_rng(0).normal(size=dimensions)
+    return (vector / np.linalg.norm(vector)).tolist()
+
+
+def check_index_usage(supabase, table: str, dimensions: int = FULL_EMBEDDING_DIMENSIONS,
+                      probes: int = None, ef_search: int = None, disable_seqscan: bool = False) -> bool:
+    """Check that search_embeddings is planned as an ANN index scan on `table`"""
+    try:
+        params = {
+            'query_embedding': _random_query(dimensions),
+            'top_k': 10,
+            'table_name': table,
+            'disable_seqscan': disable_seqscan
+        }
+        if probes is not None:
+            params['probes'] = probes
+        if ef_search is not None:
+            params['ef_search'] = ef_search
+        response = supabase.rpc('explain_search_embeddings', params).execute()
+
+        plan = [row if isinstance(row, str) else next(iter(row.values())) for row in response.data]
+        logger.info(f"Plan for {table}:\n" + "\n".join(plan))
+
+        uses_index = any('Index Scan' in line and '_embedding' in line for line in plan)
+        if uses_index:
+            logger.info(f"{table}: ANN index is used")
+        else:
+            logger.error(f"{table}: search runs as a sequential scan")
+        return uses_index
+
+    except Exception as e:
+        logger.error(f"Error explaining search on {table}: {str(e)}")
+        return False
+
+
+def main(modes, dimensions: int, probes: int, ef_search: int, disable_seqscan: bool):
+    logger.info("=== Checking ANN index usage ===")
+    supabase = create_database_client()
+
+    results = {mode: check_index_usage(supabase, ANALYSIS_TABLES[mode], dimensions, probes, ef_search,
+                                      disable_seqscan)
+               for mode in modes}
+    for mode, passed in results.items():
+        logger.info(f"{mode}: {'PASS' if passed else 'FAIL'}")
+    logger.info("=== Done ===")
+    return all(results.values())
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Check that search_embeddings uses the ANN indexes')
+    parser.add_argument('--mode', choices=list(ANALYSIS_TABLES) + ['all'], default='all',
+                      help='Table to check')
+    parser.add_argument('--dimensions', type=int, default=FULL_EMBEDDING_DIMENSIONS,
+                      help='Width of the active embedding column')
+    parser.add_argument('--probes', type=int, default=None,
+                      help='ivfflat probes to set before planning')
+    parser.add_argument('--ef-search', type=int, default=None,
+                      help='hnsw.ef_search to set before planning')
+    parser.add_argument('--disable-seqscan', action='store_true',
+                      help='Penalize sequential scans so small development tables still show the index path')
+
+    args = parser.parse_args()
+    modes = list(ANALYSIS_TABLES) if args.mode == 'all' else [args.mode]
+    raise SystemExit(0 if main(modes, args.dimensions, args.probes, args.ef_search, args.disable_seqscan) else 1)
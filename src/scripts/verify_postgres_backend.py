@@ -0,0 +1,145 @@
+import sys
+import time
+import logging
+import argparse
+from typing import Optional
+
+import numpy as np
+
+from src.services.postgres_backend import PostgresBackend
+
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger(__name__)
+
+SCRATCH_TABLE = 'postgres_backend_check'
+
+
+def _timed(label: str, started: float, rows: int):
+    elapsed = time.perf_counter() - started
+    logger.info(f"{label}: {rows} rows in {elapsed * 1000:.1f}ms ({rows / max(elapsed, 1e-9):,.0f} rows/s)")
+
+
+def verify(db: PostgresBackend, rows: int, dimensions: int, batch_size: int):
+    """Round-trip rows through COPY inserts, UPDATE ... FROM, server-side cursors and an RPC"""
+    rng = np.random.default_rng(0)
+    with db.pool.connection() as conn:
+        conn.execute(f"drop table if exists {SCRATCH_TABLE}")
+        conn.execute(f"""
+            create table {SCRATCH_TABLE} (
+                id bigserial primary key,
+                screen_id text,
+                analysis jsonb,
+                image_analyses jsonb[],
+                embedding vector({dimensions})
+            )
+        """)
+        conn.execute(f"""
+            create or replace function {SCRATCH_TABLE}_nearest(query_embedding vector, top_k int)
+            returns table (id bigint, similarity float)
+            language sql stable as $$
+                select t.id, 1 - (t.embedding <=> query_embedding)
+                from {SCRATCH_TABLE} t
+                order by t.embedding <=> query_embedding
+                limit top_k
+            $$
+        """)
+        conn.execute(f"""
+            create or replace function {SCRATCH_TABLE}_count() returns bigint
+            language sql stable as $$ select count(*) from {SCRATCH_TABLE} $$
+        """)
+
+    try:
+        records = [
+            {
+                'screen_id': f"screen-{i}",
+                'analysis': {'business_industry': 'test', 'index': i},
+                'image_analyses': [{'layout_components': ['hero', 'footer']}, {'index': i}],
+            }
+            for i in range(rows)
+        ]
+        started = time.perf_counter()
+        for start in range(0, rows, batch_size):
+            db.insert_rows(SCRATCH_TABLE, records[start:start + batch_size])
+        _timed('COPY insert', started, rows)
+
+        vectors = rng.standard_normal((rows, dimensions)).astype(np.float32)
+        vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+
+        started = time.perf_counter()
+        missing, updated = 0, 0
+        for chunk in db.iter_missing(SCRATCH_TABLE, ['id', 'screen_id', 'analysis', 'image_analyses'],
+                                     'embedding', batch_size):
+            missing += len(chunk)
+            if chunk[0]['analysis']['index'] != int(chunk[0]['screen_id'].split('-')[1]):
+                raise AssertionError(f"jsonb mismatch in row {chunk[0]['id']}")
+            if chunk[0]['image_analyses'][0] != records[0]['image_analyses'][0]:
+                raise AssertionError(f"jsonb[] mismatch in row {chunk[0]['id']}")
+            updated += db.update_rows(SCRATCH_TABLE, [
+                {'id': row['id'], 'embedding': vectors[row['id'] - 1]} for row in chunk
+            ])
+        _timed('Cursor read + COPY/UPDATE ... FROM', started, updated)
+        if missing != rows or updated != rows:
+            raise AssertionError(f"Expected {rows} rows, read {missing} and updated {updated}")
+
+        started = time.perf_counter()
+        ids, matrix = db.fetch_embeddings(SCRATCH_TABLE)
+        _timed('Cursor fetch_embeddings', started, len(ids))
+        error = float(np.abs(matrix - vectors[ids - 1]).max())
+        if len(ids) != rows or error > 1e-6:
+            raise AssertionError(f"Vectors did not round-trip: {len(ids)} rows, max error {error}")
+
+        started = time.perf_counter()
+        hits = db.rpc(f"{SCRATCH_TABLE}_nearest", {'query_embedding': vectors[7].tolist(), 'top_k': 3}).execute().data
+        count = db.rpc(f"{SCRATCH_TABLE}_count").execute().data
+        _timed('RPC', started, len(hits))
+        if hits[0]['id'] != 8 or abs(hits[0]['similarity'] - 1) > 1e-5 or count != rows:
+            raise AssertionError(f"Unexpected RPC results: {hits[:1]}, count {count}")
+
+        logger.info("Direct Postgres backend verified")
+
+    finally:
+        with db.pool.connection() as conn:
+            conn.execute(f"drop function if exists {SCRATCH_TABLE}_nearest(vector, int)")
+            conn.execute(f"drop function if exists {SCRATCH_TABLE}_count()")
+            conn.execute(f"drop table if exists {SCRATCH_TABLE}")
+
+
+def main(dsn: Optional[str], rows: int, dimensions: int, batch_size: int):
+    """Check the direct Postgres backend against a scratch table
+
+    Args:
+        dsn: Connection string (default: DATABASE_URL)
+        rows: Rows loaded into the scratch table
+        dimensions: Width of the scratch vector column
+        batch_size: Rows per COPY batch and cursor chunk
+    """
+    db = None
+    try:
+        db = PostgresBackend(dsn)
+        verify(db, rows, dimensions, batch_size)
+
+    except Exception as e:
+        logger.error(f"Error verifying Postgres backend: {str(e)}")
+        sys.exit(1)
+
+    finally:
+        if db:
+            db.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Verify the direct Postgres backend against a local database')
+    parser.add_argument('--dsn', type=str, default=None,
+                      help='Postgres connection string (default: DATABASE_URL)')
+    parser.add_argument('--rows', type=int, default=5000,
+                      help='Rows loaded into the scratch table')
+    parser.add_argument('--dimensions', type=int, default=1536,
+                      help='Width of the scratch vector column')
+    parser.add_argument('--batch-size', type=int, default=1000,
+                      help='Rows per COPY batch and cursor chunk')
+
+    args = parser.parse_args()
+    main(args.dsn, args.rows, args.dimensions, args.batch_size)
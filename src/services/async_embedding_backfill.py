@@ -0,0 +1,171 @@
+import time
+import asyncio
+import logging
+import traceback
+from typing import Dict, List
+
+from src.config import ANALYSIS_TABLES
+from src.services.embedding_processor import EmbeddingProcessor
+
+logger = logging.getLogger(__name__)
+
+
+def estimate_tokens(text: str) -> int:
+    """Rough token count for rate limiting (about 4 characters per token)"""
+    return len(text) // 4 + 1
+
+
+class TokenRateLimiter:
+    """Token bucket shared by all embedding workers to stay under a tokens-per-minute budget"""
+
+    def __init__(self, tokens_per_minute: int):
+        self.capacity = tokens_per_minute
+        self.rate = tokens_per_minute / 60.0
+        self.tokens = float(tokens_per_minute)
+        self.updated_at = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated_at) * self.rate)
+        self.updated_at = now
+
+    async def acquire(self, tokens: int):
+        """Wait until `tokens` can be spent; requests above the capacity wait for a full bucket"""
+        tokens = min(tokens, self.capacity)
+        async with self._lock:
+            self._refill()
+            while self.tokens < tokens:
+                await asyncio.sleep((tokens - self.tokens) / self.rate)
+                self._refill()
+            self.tokens -= tokens
+
+
+class StageStats:
+    """Row counter and throughput for one pipeline stage"""
+
+    def __init__(self, name: str):
+        self.name = name
+        self.rows = 0
+        self.started_at = time.monotonic()
+        self.finished_at = None
+
+    def add(self, rows: int):
+        self.rows += rows
+        self.finished_at = time.monotonic()
+
+    @property
+    def rows_per_second(self) -> float:
+        if not self.finished_at or self.finished_at <= self.started_at:
+            return 0.0
+        return self.rows / (self.finished_at - self.started_at)
+
+    def __str__(self) -> str:
+        return f"{self.name}: {self.rows} rows, {self.rows_per_second:.1f} rows/s"
+
+
+class AsyncEmbeddingBackfill:
+    """Fills missing embeddings with concurrent embedding requests and write-backs
+
+    Rows are read in id order, embedded in batches by `embed_concurrency` workers
+    sharing one tokens-per-minute budget, and written back by `write_concurrency`
+    workers so PostgREST round trips overlap with embedding calls.
+    """
+
+    def __init__(self, processor: EmbeddingProcessor, batch_size: int = 100,
+                 embed_concurrency: int = 4, write_concurrency: int = 8,
+                 tokens_per_minute: int = 1_000_000):
+        self.processor = processor
+        self.supabase = processor.supabase
+        self.batch_size = batch_size
+        self.embed_concurrency = embed_concurrency
+        self.write_concurrency = write_concurrency
+        self.limiter = TokenRateLimiter(tokens_per_minute)
+
+    def _fetch_page(self, mode: str, after_id: int) -> List[Dict]:
+        """Fetch the next page of rows missing embeddings, keyed by id so updates don't shift pages"""
+        response = self.supabase.table(ANALYSIS_TABLES[mode])\
+            .select(*EmbeddingProcessor.SOURCE_COLUMNS[mode])\
+            .is_(self.processor.column, 'null')\
+            .gt('id', after_id)\
+            .order('id')\
+            .limit(self.batch_size)\
+            .execute()
+        return response.data or []
+
+    def _write_embedding(self, mode: str, record_id: int, embedding: List[float]):
+        self.supabase.table(ANALYSIS_TABLES[mode])\
+            .update({self.processor.column: embedding})\
+            .eq('id', record_id)\
+            .execute()
+
+    async def _read(self, mode: str, embed_queue: asyncio.Queue, stats: StageStats):
+        last_id = 0
+        while True:
+            records = await asyncio.to_thread(self._fetch_page, mode, last_id)
+            if not records:
+                break
+            stats.add(len(records))
+            last_id = records[-1]['id']
+            await embed_queue.put(records)
+        for _ in range(self.embed_concurrency):
+            await embed_queue.put(None)
+
+    async def _embed(self, mode: str, embed_queue: asyncio.Queue, write_queue: asyncio.Queue,
+                     stats: StageStats):
+        while (records := await embed_queue.get()) is not None:
+            texts = [self.processor.build_embedding_text(mode, record) for record in records]
+            await self.limiter.acquire(sum(estimate_tokens(text) for text in texts))
+            embeddings = await asyncio.to_thread(self.processor.create_embeddings, texts)
+            embedded = 0
+            for record, embedding in zip(records, embeddings):
+                if embedding is None:
+                    logger.warning(f"Could not generate embedding for {mode} record {record['id']}")
+                    continue
+                await write_queue.put((record['id'], embedding))
+                embedded += 1
+            stats.add(embedded)
+
+    async def _write(self, mode: str, write_queue: asyncio.Queue, stats: StageStats):
+        while (item := await write_queue.get()) is not None:
+            record_id, embedding = item
+            try:
+                await asyncio.to_thread(self._write_embedding, mode, record_id, embedding)
+                stats.add(1)
+            except Exception as e:
+                logger.error(f"Error writing embedding for {mode} record {record_id}: {str(e)}")
+
+    async def backfill(self, mode: str) -> Dict[str, StageStats]:
+        """Fill missing embeddings of one mode's table and return per-stage stats"""
+        stats = {name: StageStats(name) for name in ('read', 'embed', 'write')}
+        embed_queue = asyncio.Queue(maxsize=self.embed_concurrency * 2)
+        write_queue = asyncio.Queue(maxsize=self.batch_size * self.write_concurrency)
+
+        writers = [
+            asyncio.create_task(self._write(mode, write_queue, stats['write']))
+            for _ in range(self.write_concurrency)
+        ]
+        embedders = [
+            asyncio.create_task(self._embed(mode, embed_queue, write_queue, stats['embed']))
+            for _ in range(self.embed_concurrency)
+        ]
+        await self._read(mode, embed_queue, stats['read'])
+        await asyncio.gather(*embedders)
+        for _ in range(self.write_concurrency):
+            await write_queue.put(None)
+        await asyncio.gather(*writers)
+        return stats
+
+    async def run(self, modes: List[str]) -> Dict[str, Dict[str, StageStats]]:
+        """Backfill each mode in turn, logging throughput for every stage"""
+        results = {}
+        for mode in modes:
+            try:
+                logger.info(f"Backfilling {ANALYSIS_TABLES[mode]}.{self.processor.column}")
+                results[mode] = await self.backfill(mode)
+                for stage in results[mode].values():
+                    logger.info(f"[{mode}] {stage}")
+            except Exception as e:
+                logger.error(f"Error backfilling {mode} embeddings: {str(e)}")
+                logger.error(f"Full error: {traceback.format_exc()}")
+        return results
@@ -0,0 +1,80 @@
+import os
+import threading
+from typing import Callable, Optional
+
+from src.config import DB_BACKEND
+
+
+class LazyClient:
+    """Stands in for a client that is only built, and its SDK imported, on first use
+
+    Attribute access is forwarded to the client returned by `factory`, which
+    runs once, on the first attribute access from any thread.
+    """
+
+    def __init__(self, factory: Callable[[], object]):
+        self._factory = factory
+        self._client = None
+        self._lock = threading.Lock()
+
+    @property
+    def created(self) -> bool:
+        return self._client is not None
+
+    def _get(self):
+        if self._client is None:
+            with self._lock:
+                if self._client is None:
+                    self._client = self._factory()
+        return self._client
+
+    def __getattr__(self, name: str):
+        return getattr(self._get(), name)
+
+
+def create_supabase_client(url: Optional[str] = None, key: Optional[str] = None) -> LazyClient:
+    """Supabase client created on first query; importing supabase-py costs ~0.4s at startup"""
+    def factory():
+        from supabase import create_client
+        return create_client(
+            url or os.getenv('PUBLIC_SUPABASE_URL'),
+            key or os.getenv('SUPABASE_SERVICE_ROLE_KEY')
+        )
+    return LazyClient(factory)
+
+
+class DirectRpcClient:
+    """Supabase client whose rpc() calls run over a direct Postgres connection
+
+    Table queries and storage keep going through `supabase`; `db` is the
+    PostgresBackend, also used directly for bulk reads and writes.
+    """
+
+    def __init__(self, supabase, db):
+        self.supabase = supabase
+        self.db = db
+
+    def rpc(self, name: str, params: Optional[dict] = None):
+        return self.db.rpc(name, params)
+
+    def __getattr__(self, name: str):
+        return getattr(self.supabase, name)
+
+
+def create_database_client(backend: Optional[str] = None):
+    """Supabase client for the configured DB_BACKEND ('supabase' or 'postgres'), connected lazily"""
+    backend = backend or DB_BACKEND
+    supabase = create_supabase_client()
+    if backend == 'supabase':
+        return supabase
+    if backend == 'postgres':
+        def factory():
+            from src.services.postgres_backend import PostgresBackend
+            return PostgresBackend()
+        return DirectRpcClient(supabase, LazyClient(factory))
+    raise ValueError(f"Unknown DB_BACKEND: {backend}")
+
+
+def direct_db(client) -> Optional[object]:
+    """PostgresBackend behind a client from create_database_client, or None for PostgREST only"""
+    return client.db if isinstance(client, DirectRpcClient) else None
@@ -0,0 +1,114 @@
+import os
+import re
+import zlib
+import logging
+from abc import ABC, abstractmethod
+from typing import TYPE_CHECKING, List, Optional
+
+from src.config import EMBEDDING_BACKEND, EMBEDDING_MODEL, EMBEDDING_DIMENSIONS, FULL_EMBEDDING_DIMENSIONS
+
+# numpy and openai are imported where they are used, keeping CLI startup fast
+if TYPE_CHECKING:
+    import numpy as np
+
+logger = logging.getLogger(__name__)
+
+
+class EmbeddingBackend(ABC):
+    """Turns texts into fixed-width embedding vectors"""
+
+    def __init__(self, model: str, dimensions: int):
+        self.model = model
+        self.dimensions = dimensions
+
+    @abstractmethod
+    def embed(self, texts: List[str]) -> List[List[float]]:
+        """Embed a batch of texts, returning one vector per text in input order"""
+
+    def embed_one(self, text: str) -> List[float]:
+        return self.embed([text])[0]
+
+
+class OpenAIEmbeddingBackend(EmbeddingBackend):
+    """Embeddings from the OpenAI API"""
+
+    def __init__(self, model: str = EMBEDDING_MODEL, dimensions: int = EMBEDDING_DIMENSIONS):
+        super().__init__(model, dimensions)
+        self._client = None
+
+    @property
+    def client(self):
+        """OpenAI client, created (and the SDK imported) on the first embedding request"""
+        if self._client is None:
+            from openai import OpenAI
+            self._client = OpenAI(api_key=os.getenv('OPENAI_API_KEY'))
+        return self._client
+
+    def embed(self, texts: List[str]) -> List[List[float]]:
+        params = {}
+        if self.dimensions != FULL_EMBEDDING_DIMENSIONS:
+            params['dimensions'] = self.dimensions
+        response = self.client.embeddings.create(
+            model=self.model,
+            input=texts,
+            encoding_format="float",
+            **params
+        )
+        embeddings = [None] * len(texts)
+        for item in response.data:
+            embeddings[item.index] = item.embedding
+        return embeddings
+
+
+class HashingEmbeddingBackend(EmbeddingBackend):
+    """Deterministic local embedder built from feature-hashed words and character n-grams
+
+    Each word and each character n-gram of a word is hashed with CRC32 into one of
+    `dimensions` buckets with a hash-derived sign, counts are log-scaled and the
+    vector is L2-normalized. Texts sharing vocabulary land close together, which is
+    enough to exercise the embedding and search pipeline offline at any scale.
+    """
+
+    TOKEN_PATTERN = re.compile(r'\w+')
+
+    def __init__(self, dimensions: int = EMBEDDING_DIMENSIONS, ngram_range: tuple = (3, 5)):
+        super().__init__('local-hash', dimensions)
+        self.ngram_range = ngram_range
+
+    def _features(self, text: str) -> List[str]:
+        features = []
+        min_n, max_n = self.ngram_range
+        for token in self.TOKEN_PATTERN.findall(text.lower()):
+            features.append(token)
+            padded = f"<{token}>"
+            for n in range(min_n, max_n + 1):
+                features.extend(padded[i:i + n] for i in range(len(padded) - n + 1))
+        return features
+
+    def _embed_text(self, text: str) -> 'np.ndarray':
+        import numpy as np
+
+        hashes = np.fromiter(
+            (zlib.crc32(feature.encode('utf-8')) for feature in self._features(text)),
+            dtype=np.uint32
+        )
+        if hashes.size == 0:
+            return np.zeros(self.dimensions, dtype=np.float32)
+        signs = np.where(hashes & 0x80000000, -1.0, 1.0)
+        vector = np.bincount(hashes % self.dimensions, weights=signs, minlength=self.dimensions)
+        vector = np.sign(vector) * np.log1p(np.abs(vector))
+        norm = np.linalg.norm(vector)
+        return (vector / norm if norm else vector).astype(np.float32)
+
+    def embed(self, texts: List[str]) -> List[List[float]]:
+        return [self._embed_text(text).tolist() for text in texts]
+
+
+def get_embedding_backend(name: str = EMBEDDING_BACKEND, model: Optional[str] = None,
+                          dimensions: int = EMBEDDING_DIMENSIONS) -> EmbeddingBackend:
+    """Create the configured embedding backend ('openai' or 'local')"""
+    if name == 'local':
+        return HashingEmbeddingBackend(dimensions=dimensions)
+    if name == 'openai':
+        return OpenAIEmbeddingBackend(model=model or EMBEDDING_MODEL, dimensions=dimensions)
+    raise ValueError(f"Unknown embedding backend: {name}")
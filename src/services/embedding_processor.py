@@ -1,19 +1,49 @@
-import os
 import logging
 import json
 from typing import Dict, List, Optional, Union
-from openai import OpenAI
 import traceback
 import numpy as np
+from src.config import ANALYSIS_TABLES, EMBEDDING_DIMENSIONS, FULL_EMBEDDING_DIMENSIONS
+from src.services.embedding_backends import EmbeddingBackend, get_embedding_backend
 
 logger = logging.getLogger(__name__)
 
+
+def _json_text(value) -> str:
+    """Canonical JSON for embedding text
+
+    Keys are sorted so an in-memory analysis (--embed-inline) and the same
+    analysis read back from jsonb, which reorders keys, embed identically.
+    """
+    if isinstance(value, (dict, list)):
+        return json.dumps(value, sort_keys=True)
+    return value
+
 class EmbeddingProcessor:
     """Handles creation and updating of embeddings for analyses"""
 
-    def __init__(self, supabase_client):
+    # Columns needed to rebuild the embedding text for each mode's table
+    SOURCE_COLUMNS = {
+        'regular': ['id', 'site_url', 'web_analysis', 'image_analysis'],
+        'fusion': ['id', 'web_analysis', 'fused_analysis'],
+        'html': ['id', 'site_url', 'web_analysis'],
+    }
+
+    def __init__(self, supabase_client, dimensions: int = EMBEDDING_DIMENSIONS,
+                 backend: Optional[EmbeddingBackend] = None, column: Optional[str] = None,
+                 db=None):
         self.supabase = supabase_client
-        self.client = OpenAI(api_key=os.getenv('OPENAI_API_KEY'))
+        # Direct Postgres backend (DB_BACKEND=postgres) for server-side cursor reads and COPY writes
+        self.db = db
+        self.backend = backend or get_embedding_backend(dimensions=dimensions)
+        self.model = self.backend.model
+        self.dimensions = self.backend.dimensions
+        # Versioned backfills write to their own column; otherwise reduced-dimension
+        # vectors are stored in the halfvec column
+        if column:
+            self.column = column
+        else:
+            self.column = 'embedding' if self.dimensions == FULL_EMBEDDING_DIMENSIONS else 'embedding_half'
         self.max_length = 500  # Số token tối đa cho mỗi đoạn
         self.overlap = 50  # Số token overlap giữa các đoạn
 
@@ -57,18 +87,21 @@ class EmbeddingProcessor:
 
 
     def _create_embedding(self, text: str) -> Optional[List[float]]:
-        """Create embedding from text using OpenAI API"""
+        """Create embedding from text using the configured backend"""
         try:
-            response = self.client.embeddings.create(
-                model="text-embedding-3-small",
-                input=text,
-                encoding_format="float"
-            )
-            return response.data[0].embedding
+            return self.backend.embed_one(text)
         except Exception as e:
             logger.error(f"Error creating embedding: {str(e)}")
             return None
 
+    def create_embeddings(self, texts: List[str]) -> List[Optional[List[float]]]:
+        """Embed several texts in one backend request; a failed request yields None for each text"""
+        try:
+            return self.backend.embed(texts)
+        except Exception as e:
+            logger.error(f"Error creating batch of {len(texts)} embeddings: {str(e)}")
+            return [None] * len(texts)
+
 
     def _combine_screen_analysis_text(self, record: Dict) -> str:
         """Combine relevant fields from screen_analysis into a single text"""
@@ -80,15 +113,11 @@ class EmbeddingProcessor:
         
         # Add web analysis as JSON string
         if web_analysis := record.get('web_analysis'):
-            if isinstance(web_analysis, dict):
-                web_analysis = json.dumps(web_analysis)
-            combined_text.append(f"Web Analysis: {web_analysis}")
+            combined_text.append(f"Web Analysis: {_json_text(web_analysis)}")
         
         # Add image analysis as JSON string
         if image_analysis := record.get('image_analysis'):
-            if isinstance(image_analysis, dict):
-                image_analysis = json.dumps(image_analysis)
-            combined_text.append(f"Image Analysis: {image_analysis}")
+            combined_text.append(f"Image Analysis: {_json_text(image_analysis)}")
         
         return ' '.join(combined_text)
 
@@ -98,18 +127,69 @@ class EmbeddingProcessor:
         
         # Add web analysis as JSON string
         if web_analysis := record.get('web_analysis'):
-            if isinstance(web_analysis, dict):
-                web_analysis = json.dumps(web_analysis)
-            combined_text.append(f"Web Analysis: {web_analysis}")
+            combined_text.append(f"Web Analysis: {_json_text(web_analysis)}")
         
         # Add fusion analysis as JSON string
         if fusion_analysis := record.get('fused_analysis'):
-            if isinstance(fusion_analysis, dict):
-                fusion_analysis = json.dumps(fusion_analysis)
-            combined_text.append(f"Fusion Analysis: {fusion_analysis}")
+            combined_text.append(f"Fusion Analysis: {_json_text(fusion_analysis)}")
         
         return ' '.join(combined_text)
 
+    def _combine_html_analysis_text(self, record: Dict) -> str:
+        """Combine relevant fields from HTML analysis into a single text"""
+        text_for_embedding = f"Site URL: {record['site_url']}\n"
+        if record.get('web_analysis'):
+            text_for_embedding += f"Web Analysis: {_json_text(record['web_analysis'])}"
+        return text_for_embedding
+
+    def build_embedding_text(self, mode: str, record: Dict) -> str:
+        """Build the text embedded for a record of the given mode's table"""
+        if mode == 'regular':
+            return self._combine_screen_analysis_text(record)
+        if mode == 'fusion':
+            return self._combine_fusion_analysis_text(record)
+        return self._combine_html_analysis_text(record)
+
+    def bulk_update_embeddings(self, mode: str, batch_size: Union[int, str] = 100) -> int:
+        """Fill every missing embedding of a mode's table over the direct Postgres connection
+
+        Rows stream from a server-side cursor; each batch is embedded in one
+        request and written back with one COPY and UPDATE ... FROM.
+
+        `batch_size` means what it does on the PostgREST path: for regular and
+        fusion an integer caps the rows processed in this run, while HTML always
+        processes every missing row in batches of that size.
+
+        Args:
+            mode: Processing mode ('regular', 'fusion', or 'html')
+            batch_size: Rows per run (regular, fusion) or per batch (html), or 'all'
+
+        Returns:
+            Number of rows updated
+        """
+        table = ANALYSIS_TABLES[mode]
+        limit = None if batch_size == 'all' or mode == 'html' else batch_size
+        batch_size = 100 if batch_size == 'all' else batch_size
+        updated = 0
+        try:
+            for records in self.db.iter_missing(table, self.SOURCE_COLUMNS[mode], self.column,
+                                                batch_size, limit=limit):
+                texts = [self.build_embedding_text(mode, record) for record in records]
+                embeddings = self.create_embeddings(texts)
+                rows = [
+                    {'id': record['id'], self.column: embedding}
+                    for record, embedding in zip(records, embeddings) if embedding is not None
+                ]
+                updated += self.db.update_rows(table, rows)
+                logger.info(f"Updated {len(rows)} of {len(records)} {table} embeddings ({updated} so far)")
+
+            logger.info(f"Completed {table} embedding updates: {updated} rows")
+
+        except Exception as e:
+            logger.error(f"Error bulk updating {table} embeddings: {str(e)}")
+            logger.error(f"Full error: {traceback.format_exc()}")
+        return updated
+
     def check_and_update_embeddings(self, table: str = 'both', batch_size: Union[int, str] = 10):
         """Check and update missing embeddings for specified table(s)
         
@@ -122,7 +202,7 @@ class EmbeddingProcessor:
                 # Check screen_analysis table
                 query = self.supabase.table('screen_analysis')\
                     .select('id')\
-                    .is_('embedding', 'null')
+                    .is_(self.column, 'null')
                 
                 if batch_size != 'all':
                     query = query.limit(batch_size)
@@ -139,7 +219,7 @@ class EmbeddingProcessor:
                 # Check fusion_analysis table
                 query = self.supabase.table('screen_analysis_fusion')\
                     .select('id')\
-                    .is_('embedding', 'null')
+                    .is_(self.column, 'null')
                 
                 if batch_size != 'all':
                     query = query.limit(batch_size)
@@ -162,7 +242,7 @@ class EmbeddingProcessor:
             # Get records without embeddings
             query = self.supabase.table('screen_analysis')\
                 .select('*')\
-                .is_('embedding', 'null')
+                .is_(self.column, 'null')
             
             if batch_size != 'all':
                 query = query.limit(batch_size)
@@ -179,7 +259,7 @@ class EmbeddingProcessor:
                 text = self._combine_screen_analysis_text(record)
                 if embedding := self._create_embedding(text):
                     self.supabase.table('screen_analysis')\
-                        .update({'embedding': embedding})\
+                        .update({self.column: embedding})\
                         .eq('id', record['id'])\
                         .execute()
                     logger.info(f"Updated embedding for screen analysis ID: {record['id']}")
@@ -196,7 +276,7 @@ class EmbeddingProcessor:
             # Get records without embeddings
             query = self.supabase.table('screen_analysis_fusion')\
                 .select('*')\
-                .is_('embedding', 'null')
+                .is_(self.column, 'null')
             
             if batch_size != 'all':
                 query = query.limit(batch_size)
@@ -213,7 +293,7 @@ class EmbeddingProcessor:
                 text = self._combine_fusion_analysis_text(record)
                 if embedding := self._create_embedding(text):
                     self.supabase.table('screen_analysis_fusion')\
-                        .update({'embedding': embedding})\
+                        .update({self.column: embedding})\
                         .eq('id', record['id'])\
                         .execute()
                     logger.info(f"Updated embedding for fusion analysis ID: {record['id']}")
@@ -234,7 +314,7 @@ class EmbeddingProcessor:
             # Get records without embeddings
             response = self.supabase.table('screen_html_analysis')\
                 .select('id', 'site_url', 'web_analysis')\
-                .is_('embedding', 'null')\
+                .is_(self.column, 'null')\
                 .execute()
                 
             records = response.data
@@ -250,17 +330,15 @@ class EmbeddingProcessor:
                 for record in records:
                     try:
                         # Create text for embedding
-                        text_for_embedding = f"Site URL: {record['site_url']}\n"
-                        if record['web_analysis']:
-                            text_for_embedding += f"Web Analysis: {json.dumps(record['web_analysis'])}"
-                            
+                        text_for_embedding = self._combine_html_analysis_text(record)
+
                         # Generate embedding
                         embedding = self._create_embedding(text_for_embedding)
                         
                         if embedding:
                             # Update record with embedding
                             self.supabase.table('screen_html_analysis')\
-                                .update({'embedding': embedding})\
+                                .update({self.column: embedding})\
                                 .eq('id', record['id'])\
                                 .execute()
                             logger.info(f"Updated embedding for HTML record {record['id']}")
@@ -279,17 +357,15 @@ class EmbeddingProcessor:
                     for record in batch:
                         try:
                             # Create text for embedding
-                            text_for_embedding = f"Site URL: {record['site_url']}\n"
-                            if record['web_analysis']:
-                                text_for_embedding += f"Web Analysis: {json.dumps(record['web_analysis'])}"
-                                
+                            text_for_embedding = self._combine_html_analysis_text(record)
+
                             # Generate embedding
                             embedding = self._create_embedding(text_for_embedding)
                             
                             if embedding:
                                 # Update record with embedding
                                 self.supabase.table('screen_html_analysis')\
-                                    .update({'embedding': embedding})\
+                                    .update({self.column: embedding})\
                                     .eq('id', record['id'])\
                                     .execute()
                                 logger.info(f"Updated embedding for HTML record {record['id']}")
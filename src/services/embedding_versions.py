@@ -0,0 +1,82 @@
+import time
+import logging
+from typing import Dict, Optional
+
+from src.services.embedding_backends import EmbeddingBackend, get_embedding_backend
+
+logger = logging.getLogger(__name__)
+
+
+class EmbeddingVersionRegistry:
+    """Reads and switches the embedding versions recorded in `embedding_versions`
+
+    Each version names the model, width and column holding its vectors. Search
+    reads the table's active version; a new version is backfilled into its own
+    column and activated in one transaction once every row has a vector.
+    """
+
+    def __init__(self, supabase_client, cache_ttl: float = 60.0):
+        self.supabase = supabase_client
+        self.cache_ttl = cache_ttl
+        self._active_cache: Dict[str, tuple] = {}
+        self._backends: Dict[tuple, EmbeddingBackend] = {}
+
+    def get(self, table: str, version: str) -> Optional[Dict]:
+        """Return the registry row for a table's version"""
+        response = self.supabase.table('embedding_versions')\
+            .select('*')\
+            .eq('table_name', table)\
+            .eq('version', version)\
+            .execute()
+        return response.data[0] if response.data else None
+
+    def get_active(self, table: str, use_cache: bool = True) -> Optional[Dict]:
+        """Return the active version of a table, cached for `cache_ttl` seconds"""
+        cached = self._active_cache.get(table)
+        if use_cache and cached and time.monotonic() - cached[0] < self.cache_ttl:
+            return cached[1]
+
+        response = self.supabase.table('embedding_versions')\
+            .select('*')\
+            .eq('table_name', table)\
+            .eq('status', 'active')\
+            .execute()
+        active = response.data[0] if response.data else None
+        self._active_cache[table] = (time.monotonic(), active)
+        return active
+
+    def backend_for(self, version: Dict) -> EmbeddingBackend:
+        """Embedding backend producing vectors compatible with a version"""
+        key = (version['model'], version['dimensions'])
+        if key not in self._backends:
+            name = 'local' if version['model'] == 'local-hash' else 'openai'
+            self._backends[key] = get_embedding_backend(
+                name, model=version['model'], dimensions=version['dimensions']
+            )
+        return self._backends[key]
+
+    def activate(self, table: str, version: str, force: bool = False):
+        """Atomically switch the version search reads; refuses incomplete backfills unless forced"""
+        self.supabase.rpc('activate_embedding_version', {
+            'p_table_name': table,
+            'p_version': version,
+            'p_force': force
+        }).execute()
+        self._active_cache.pop(table, None)
+        logger.info(f"Activated embedding version {version} for {table}")
+
+    def garbage_collect(self, table: str, version: str, batch_size: int = 5000) -> int:
+        """Clear a retired version's vectors in batches and return the number of rows cleared"""
+        total = 0
+        while True:
+            response = self.supabase.rpc('gc_embedding_version', {
+                'p_table_name': table,
+                'p_version': version,
+                'p_batch_size': batch_size
+            }).execute()
+            cleared = response.data or 0
+            if not cleared:
+                break
+            total += cleared
+            logger.info(f"Cleared {total} {version} vectors from {table}")
+        return total
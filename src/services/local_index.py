@@ -0,0 +1,334 @@
+import logging
+from typing import Dict, List, Optional, Sequence
+
+import numpy as np
+
+from src.services.vector_utils import parse_vector, normalize_rows
+from src.services.vector_store import RECORD_FIELDS, VectorStore, export_table
+
+logger = logging.getLogger(__name__)
+
+try:
+    import hnswlib
+except ImportError:  # optional, IVF in NumPy is used instead
+    hnswlib = None
+
+
+def _float32(vectors: np.ndarray) -> np.ndarray:
+    """Serving copy of a matrix: scoring a float16 (or memory-mapped float16) matrix upcasts all of it per query"""
+    return vectors if vectors.dtype == np.float32 else np.asarray(vectors, dtype=np.float32)
+
+
+class FlatIndex:
+    """Exact inner-product search; used for small snapshots"""
+
+    def build(self, vectors: np.ndarray):
+        self.vectors = _float32(vectors)
+
+    def search(self, query: np.ndarray, top_k: int, **kwargs) -> np.ndarray:
+        scores = self.vectors @ query
+        top_k = min(top_k, len(scores))
+        rows = np.argpartition(-scores, top_k - 1)[:top_k]
+        return rows[np.argsort(-scores[rows])]
+
+
+class IVFIndex:
+    """Inverted-file index in pure NumPy: spherical k-means lists, exact scoring within probed lists"""
+
+    def __init__(self, n_lists: Optional[int] = None, n_probes: int = 8, iterations: int = 10, seed: int = 0):
+        self.n_lists = n_lists
+        self.n_probes = n_probes
+        self.iterations = iterations
+        self.rng = np.random.default_rng(seed)
+
+    def _assign(self, vectors: np.ndarray, block: int = 65536) -> np.ndarray:
+        return np.concatenate([
+            np.argmax(vectors[i:i + block] @ self.centroids.T, axis=1)
+            for i in range(0, len(vectors), block)
+        ]) if len(vectors) else np.empty(0, dtype=np.int64)
+
+    def train(self, vectors: np.ndarray):
+        n_lists = min(self.n_lists or max(1, int(np.sqrt(len(vectors)))), len(vectors))
+        sample_size = min(len(vectors), 256 * n_lists)
+        sample = vectors[self.rng.choice(len(vectors), size=sample_size, replace=False)]
+        self.centroids = sample[self.rng.choice(len(sample), size=n_lists, replace=False)].copy()
+        for _ in range(self.iterations):
+            labels = self._assign(sample)
+            sums = np.zeros_like(self.centroids)
+            np.add.at(sums, labels, sample)
+            empty = np.bincount(labels, minlength=n_lists) == 0
+            sums[empty] = sample[self.rng.choice(len(sample), size=int(empty.sum()))]
+            self.centroids = normalize_rows(sums)
+
+    def build(self, vectors: np.ndarray, retrain: bool = True):
+        self.vectors = vectors = _float32(vectors)
+        if retrain or not hasattr(self, 'centroids'):
+            self.train(vectors)
+        labels = self._assign(vectors)
+        self.order = np.argsort(labels, kind='stable')
+        self.offsets = np.concatenate([[0], np.cumsum(np.bincount(labels, minlength=len(self.centroids)))])
+
+    def search(self, query: np.ndarray, top_k: int, probes: Optional[int] = None, **kwargs) -> np.ndarray:
+        probes = min(probes or self.n_probes, len(self.centroids))
+        lists = np.argpartition(-(self.centroids @ query), probes - 1)[:probes]
+        candidates = np.concatenate([self.order[self.offsets[l]:self.offsets[l + 1]] for l in lists])
+        if len(candidates) == 0:
+            return candidates
+        scores = self.vectors[candidates] @ query
+        top_k = min(top_k, len(scores))
+        best = np.argpartition(-scores, top_k - 1)[:top_k]
+        return candidates[best[np.argsort(-scores[best])]]
+
+
+class BinaryIndex:
+    """Sign-bit codes scanned by Hamming distance, with an exact rerank of the best candidates
+
+    Codes take 1 bit per dimension (32x smaller than float32), so the first pass
+    touches little memory; `oversample` sets how many candidates per result the
+    full-precision vectors rerank.
+    """
+
+    POPCOUNT = np.array([bin(i).count('1') for i in range(256)], dtype=np.uint8)
+
+    def __init__(self, oversample: int = 4, block: int = 65536):
+        self.oversample = oversample
+        self.block = block
+
+    @staticmethod
+    def quantize(vectors: np.ndarray) -> np.ndarray:
+        return np.packbits(np.asarray(vectors) > 0, axis=-1)
+
+    def _hamming(self, codes: np.ndarray, query_code: np.ndarray) -> np.ndarray:
+        xor = np.bitwise_xor(codes, query_code)
+        if hasattr(np, 'bitwise_count'):
+            return np.bitwise_count(xor).sum(axis=1, dtype=np.int32)
+        return self.POPCOUNT[xor].sum(axis=1, dtype=np.int32)
+
+    def build(self, vectors: np.ndarray):
+        self.vectors = vectors = _float32(vectors)
+        self.codes = np.concatenate([
+            self.quantize(vectors[i:i + self.block]) for i in range(0, len(vectors), self.block)
+        ]) if len(vectors) else np.empty((0, 0), dtype=np.uint8)
+
+    def search(self, query: np.ndarray, top_k: int, oversample: Optional[int] = None, **kwargs) -> np.ndarray:
+        top_k = min(top_k, len(self.codes))
+        candidates = min(top_k * (oversample or self.oversample), len(self.codes))
+        distances = self._hamming(self.codes, self.quantize(query))
+        rows = np.argpartition(distances, candidates - 1)[:candidates]
+        scores = self.vectors[rows] @ query
+        best = np.argpartition(-scores, top_k - 1)[:top_k]
+        return rows[best[np.argsort(-scores[best])]]
+
+
+class HNSWIndex:
+    """HNSW graph from hnswlib (optional dependency)"""
+
+    def __init__(self, m: int = 16, ef_construction: int = 100, ef_search: int = 64):
+        self.m = m
+        self.ef_construction = ef_construction
+        self.ef_search = ef_search
+
+    def build(self, vectors: np.ndarray):
+        self.index = hnswlib.Index(space='ip', dim=vectors.shape[1])
+        self.index.init_index(max_elements=max(1, len(vectors)), M=self.m, ef_construction=self.ef_construction)
+        if len(vectors):
+            self.index.add_items(vectors, np.arange(len(vectors)))
+
+    def search(self, query: np.ndarray, top_k: int, ef_search: Optional[int] = None, **kwargs) -> np.ndarray:
+        top_k = min(top_k, self.index.get_current_count())
+        self.index.set_ef(max(ef_search or self.ef_search, top_k))
+        labels, _ = self.index.knn_query(query, k=top_k)
+        return labels[0].astype(np.int64)
+
+
+class LocalVectorIndex:
+    """Snapshot of one analysis table's vectors served from an in-memory ANN index
+
+    The snapshot directory is a `VectorStore`, memory-mapped on load, holding
+    the row fields returned by search and the `updated_at` watermark. `sync()` pulls only rows updated since the watermark, so the
+    database stays out of the read path.
+    """
+
+    RECORD_FIELDS = RECORD_FIELDS
+
+    def __init__(self, path: str, index_type: str = 'auto'):
+        self.path = path
+        self.index_type = index_type
+        self.ids = np.empty(0, dtype=np.int64)
+        self.vectors = np.empty((0, 0), dtype=np.float32)
+        self.records: Dict[str, Sequence] = {field: [] for field in self.RECORD_FIELDS}
+        self.meta: Dict = {}
+        self.index = None
+
+    # Snapshot I/O
+
+    def save(self):
+        store = VectorStore.write(self.path, [(self.ids, self.vectors)], self.meta, self.records,
+                                  dtype=self.meta.get('dtype', 'float32'))
+        self._use_store(store)
+
+    def _use_store(self, store: VectorStore):
+        self.ids, self.vectors = store.ids, store.vectors
+        self.records, self.meta = store.records, store.meta
+
+    @classmethod
+    def load(cls, path: str, index_type: str = 'auto') -> 'LocalVectorIndex':
+        local = cls(path, index_type)
+        local._use_store(VectorStore.open(path))
+        local.build()
+        logger.info(f"Loaded {len(local.ids)} vectors of {local.meta['table']} from {path}")
+        return local
+
+    # Export and incremental sync
+
+    def _fetch_rows(self, supabase, since: Optional[str], page_size: int) -> List[Dict]:
+        table, column = self.meta['table'], self.meta['column']
+        fields = ['id', 'screen_id', 'site_url', column, 'updated_at']
+        if table == 'screen_analysis':
+            fields.append('webp_url')
+
+        rows = []
+        start = 0
+        while True:
+            query = supabase.table(table).select(*fields)
+            if since:
+                # gte: rows sharing the watermark timestamp are re-read and deduplicated by id
+                query = query.gte('updated_at', since)
+            response = query.order('updated_at').order('id').range(start, start + page_size - 1).execute()
+            rows.extend(response.data or [])
+            if not response.data or len(response.data) < page_size:
+                break
+            start += page_size
+        return rows
+
+    def _drop_deleted(self, supabase, page_size: int) -> int:
+        """Remove rows deleted upstream; returns how many were removed
+
+        After the changed rows are applied the snapshot holds every upstream
+        row with a vector, so equal counts mean nothing was deleted and the id
+        scan is skipped.
+        """
+        table, column = self.meta['table'], self.meta['column']
+        response = supabase.table(table)\
+            .select('id', count='exact')\
+            .not_.is_(column, 'null')\
+            .limit(1)\
+            .execute()
+        if response.count is not None and response.count >= len(self.ids):
+            return 0
+
+        upstream = []
+        last_id = 0
+        while True:
+            response = supabase.table(table)\
+                .select('id')\
+                .not_.is_(column, 'null')\
+                .gt('id', last_id)\
+                .order('id')\
+                .limit(page_size)\
+                .execute()
+            upstream.extend(row['id'] for row in response.data or [])
+            if not response.data or len(response.data) < page_size:
+                break
+            last_id = response.data[-1]['id']
+
+        keep = np.isin(self.ids, upstream)
+        removed = int((~keep).sum())
+        if removed:
+            self.vectors = self.vectors[keep]
+            self.ids = self.ids[keep]
+            for field in self.RECORD_FIELDS:
+                self.records[field] = [value for value, k in zip(self.records[field], keep) if k]
+        return removed
+
+    def _apply_rows(self, rows: List[Dict]):
+        """Upsert fetched rows; rows whose vector was cleared are removed"""
+        column = self.meta['column']
+        changed = {row['id'] for row in rows}
+        keep = ~np.isin(self.ids, list(changed)) if len(self.ids) else np.empty(0, dtype=bool)
+
+        fresh = [row for row in rows if row.get(column) is not None]
+        fresh_vectors = normalize_rows(np.vstack([parse_vector(row[column]) for row in fresh])) if fresh else None
+
+        vectors = [self.vectors[keep]] if len(self.ids) else []
+        if fresh_vectors is not None:
+            vectors.append(fresh_vectors)
+        self.vectors = np.vstack(vectors).astype(np.float32) if vectors else self.vectors
+        self.ids = np.concatenate([self.ids[keep], np.asarray([row['id'] for row in fresh], dtype=np.int64)])
+        for field in self.RECORD_FIELDS:
+            kept = [value for value, k in zip(self.records[field], keep) if k]
+            self.records[field] = kept + [row.get(field) for row in fresh]
+
+        if rows:
+            self.meta['watermark'] = max(row['updated_at'] for row in rows)
+
+    @classmethod
+    def export(cls, supabase, mode: str, path: str, column: str = 'embedding',
+               index_type: str = 'auto', dtype: str = 'float32', page_size: int = 1000) -> 'LocalVectorIndex':
+        """Create a snapshot of a mode's table"""
+        export_table(supabase, mode, path, column=column, dtype=dtype, page_size=page_size)
+        return cls.load(path, index_type)
+
+    def sync(self, supabase, page_size: int = 1000) -> int:
+        """Pull rows updated since the watermark, drop deleted rows, save the snapshot and refresh the index"""
+        rows = self._fetch_rows(supabase, self.meta.get('watermark'), page_size)
+        if rows:
+            self._apply_rows(rows)
+        removed = self._drop_deleted(supabase, page_size)
+        if not rows and not removed:
+            return 0
+        self.save()
+        self.build(retrain=False)
+        logger.info(f"Synced {len(rows)} changed and {removed} deleted rows of {self.meta['table']}")
+        return len(rows) + removed
+
+    # Search
+
+    def build(self, retrain: bool = True):
+        index_type = self.index_type
+        if index_type == 'auto':
+            if hnswlib is not None:
+                index_type = 'hnsw'
+            else:
+                index_type = 'ivf' if len(self.ids) > 50000 else 'flat'
+
+        # float16 snapshots are cold storage; the served matrix is upcast once here, not per query
+        self.vectors = _float32(self.vectors)
+        if len(self.ids) == 0:
+            self.index = None
+        elif index_type == 'hnsw':
+            self.index = HNSWIndex()
+            self.index.build(self.vectors)
+        elif index_type == 'binary':
+            self.index = BinaryIndex()
+            self.index.build(self.vectors)
+        elif index_type == 'ivf':
+            if isinstance(self.index, IVFIndex):
+                self.index.build(self.vectors, retrain=retrain)
+            else:
+                self.index = IVFIndex()
+                self.index.build(self.vectors)
+        else:
+            self.index = FlatIndex()
+            self.index.build(self.vectors)
+
+    def search(self, query_embedding: List[float], top_k: int = 5, probes: Optional[int] = None,
+               ef_search: Optional[int] = None, oversample: Optional[int] = None) -> List[Dict]:
+        """Top-k rows by cosine similarity, shaped like the search_embeddings RPC rows
+
+        `oversample` only applies to the 'binary' index type.
+        """
+        if self.index is None:
+            return []
+        query = np.asarray(query_embedding, dtype=np.float32)
+        query /= np.linalg.norm(query) or 1.0
+        rows = self.index.search(query, top_k, probes=probes, ef_search=ef_search, oversample=oversample)
+        similarities = self.vectors[rows] @ query
+        return [
+            {
+                'id': int(self.ids[row]),
+                **{field: self.records[field][row] for field in self.RECORD_FIELDS},
+                'similarity': float(similarity),
+            }
+            for row, similarity in zip(rows, similarities)
+        ]
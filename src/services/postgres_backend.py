@@ -0,0 +1,322 @@
+import uuid
+import struct
+import logging
+from typing import Dict, Iterator, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from src.config import DATABASE_URL
+from src.services.vector_utils import parse_vector
+
+try:
+    import psycopg
+    from psycopg import sql
+    from psycopg.rows import dict_row
+    from psycopg.types.json import Jsonb
+    from psycopg.adapt import Dumper, Loader
+    from psycopg_pool import ConnectionPool
+except ImportError:  # optional, only needed with DB_BACKEND=postgres
+    psycopg = None
+    Dumper = Loader = object
+
+logger = logging.getLogger(__name__)
+
+VECTOR_TYPES = ('vector', 'halfvec')
+
+# Binary array format of a 1-d real[] without nulls: ndim, has-null flag, element oid,
+# length, lower bound, then (byte length, big-endian float4) per element
+REAL_OID, REAL_ARRAY_OID = 700, 1021
+_ARRAY_HEADER = struct.Struct('>iiiii')
+_REAL_ELEMENT = np.dtype([('size', '>i4'), ('value', '>f4')])
+
+
+class _RealArrayDumper(Dumper):
+    """Writes a numpy vector as binary real[] in one buffer copy instead of one Python float at a time"""
+    oid = REAL_ARRAY_OID
+    format = 1  # binary
+
+    def dump(self, obj) -> bytes:
+        values = np.asarray(obj, dtype=np.float32).ravel()
+        elements = np.empty(len(values), dtype=_REAL_ELEMENT)
+        elements['size'] = 4
+        elements['value'] = values
+        return _ARRAY_HEADER.pack(1, 0, REAL_OID, len(values), 1) + elements.tobytes()
+
+
+class _RealArrayLoader(Loader):
+    """Reads binary real[] straight into a float32 numpy vector"""
+    format = 1  # binary
+
+    def load(self, data) -> np.ndarray:
+        ndim = _ARRAY_HEADER.unpack_from(data)[0]
+        if ndim == 0:
+            return np.empty(0, dtype=np.float32)
+        elements = np.frombuffer(data, dtype=_REAL_ELEMENT, offset=_ARRAY_HEADER.size)
+        return elements['value'].astype(np.float32)
+
+
+class RpcResponse:
+    """Result of an rpc() call, shaped like a supabase-py response"""
+
+    def __init__(self, data):
+        self.data = data
+
+
+class _RpcCall:
+    """Mirrors the supabase-py builder: backend.rpc(name, params).execute().data"""
+
+    def __init__(self, backend: 'PostgresBackend', name: str, params: Dict):
+        self.backend = backend
+        self.name = name
+        self.params = params
+
+    def execute(self) -> RpcResponse:
+        return RpcResponse(self.backend.call(self.name, self.params))
+
+
+class PostgresBackend:
+    """Direct Postgres connection pool for RPCs and bulk I/O, bypassing PostgREST
+
+    Bulk writes stream rows with binary COPY into a temporary staging table and
+    apply them with one set-based INSERT ... SELECT or UPDATE ... FROM. Vector
+    columns are staged as real[] (encoded from numpy buffers) and cast to the
+    column's vector/halfvec type, so no pgvector client adapter is needed. Bulk
+    reads use server-side cursors and arrive in `itersize` chunks instead of
+    one response.
+    """
+
+    def __init__(self, dsn: Optional[str] = None, min_size: int = 1, max_size: int = 8):
+        if psycopg is None:
+            raise ImportError("DB_BACKEND=postgres needs psycopg and psycopg-pool: "
+                              "pip install 'psycopg[binary]' psycopg-pool")
+        dsn = dsn or DATABASE_URL
+        if not dsn:
+            raise ValueError("DATABASE_URL is not set")
+        self.pool = ConnectionPool(dsn, min_size=min_size, max_size=max_size,
+                                   kwargs={'row_factory': dict_row}, open=True)
+        self._columns: Dict[str, Dict[str, Tuple[str, str]]] = {}
+        self._scalar_functions: Dict[str, bool] = {}
+        self._argument_types: Dict[str, Dict[str, str]] = {}
+
+    def close(self):
+        self.pool.close()
+
+    # Catalog lookups
+
+    def _column_types(self, conn, table: str) -> Dict[str, Tuple[str, str]]:
+        """column -> (type name used for binary COPY, full SQL type), cached per table"""
+        if table not in self._columns:
+            rows = conn.execute("""
+                select
+                    a.attname as name,
+                    format_type(a.atttypid, a.atttypmod) as sql_type,
+                    case when t.typcategory = 'A' then e.typname || '[]' else t.typname end as copy_type
+                from pg_attribute a
+                join pg_type t on t.oid = a.atttypid
+                left join pg_type e on e.oid = t.typelem
+                where a.attrelid = %s::regclass and a.attnum > 0 and not a.attisdropped
+            """, (table,)).fetchall()
+            self._columns[table] = {row['name']: (row['copy_type'], row['sql_type']) for row in rows}
+        return self._columns[table]
+
+    def _returns_scalar(self, conn, name: str) -> bool:
+        """PostgREST returns a bare value for functions returning a single scalar"""
+        if name not in self._scalar_functions:
+            row = conn.execute("""
+                select not p.proretset and t.typtype in ('b', 'd', 'e') as scalar
+                from pg_proc p
+                join pg_type t on t.oid = p.prorettype
+                where p.proname = %s
+                limit 1
+            """, (name,)).fetchone()
+            self._scalar_functions[name] = bool(row and row['scalar'])
+        return self._scalar_functions[name]
+
+    def _function_arguments(self, conn, name: str) -> Dict[str, str]:
+        """Input argument name -> type name of a function (over all its overloads), cached"""
+        if name not in self._argument_types:
+            rows = conn.execute("""
+                select a.name, t.typname as type
+                from pg_proc p
+                cross join lateral unnest(coalesce(p.proallargtypes, p.proargtypes::oid[]),
+                                          p.proargnames, p.proargmodes) as a(type_oid, name, mode)
+                join pg_type t on t.oid = a.type_oid
+                where p.proname = %s and coalesce(a.mode, 'i') in ('i', 'b', 'v')
+            """, (name,)).fetchall()
+            types: Dict[str, str] = {}
+            for row in rows:
+                # An overload taking a vector wins, so vectors are never sent as float arrays
+                if row['name'] and (row['name'] not in types or row['type'] in VECTOR_TYPES):
+                    types[row['name']] = row['type']
+            self._argument_types[name] = types
+        return self._argument_types[name]
+
+    # RPC
+
+    @staticmethod
+    def _rpc_param(value, arg_type: Optional[str]):
+        """Adapt a PostgREST-style JSON argument to the function's argument type"""
+        if value is None:
+            return None
+        if isinstance(value, np.ndarray):
+            value = value.tolist()
+        if arg_type in VECTOR_TYPES and isinstance(value, (list, tuple)):
+            # Sent untyped, so the server resolves it to the argument's vector type
+            return '[' + ','.join(repr(float(item)) for item in value) + ']'
+        if arg_type in ('json', 'jsonb') or isinstance(value, dict):
+            return Jsonb(value)
+        if isinstance(value, (list, tuple)) and any(isinstance(item, float) for item in value):
+            # JSON arrays like [0.5, 1] mix ints and floats; psycopg dumps one element type
+            return [float(item) if isinstance(item, int) and not isinstance(item, bool) else item for item in value]
+        return value
+
+    def call(self, name: str, params: Optional[Dict] = None) -> object:
+        """Call a SQL function with named arguments, returning rows (or the value of a scalar function)"""
+        params = params or {}
+        query = sql.SQL('select * from {}({})').format(
+            sql.Identifier(name),
+            sql.SQL(', ').join(
+                sql.SQL('{} => {}').format(sql.Identifier(key), sql.Placeholder(key)) for key in params
+            )
+        )
+        with self.pool.connection() as conn:
+            arguments = self._function_arguments(conn, name)
+            rows = conn.execute(query, {
+                key: self._rpc_param(value, arguments.get(key)) for key, value in params.items()
+            }).fetchall()
+            if self._returns_scalar(conn, name):
+                return rows[0][name] if rows else None
+        return rows
+
+    def rpc(self, name: str, params: Optional[Dict] = None) -> _RpcCall:
+        return _RpcCall(self, name, params or {})
+
+    # Bulk writes
+
+    @staticmethod
+    def _copy_value(copy_type: str, value):
+        if value is None:
+            return None
+        if copy_type in VECTOR_TYPES:
+            return parse_vector(value)
+        if copy_type == 'jsonb':
+            return Jsonb(value)
+        if copy_type == 'jsonb[]':
+            return [Jsonb(item) for item in value]
+        return value
+
+    def _stage(self, conn, table: str, columns: List[str], rows: Sequence[Dict]) -> Tuple[str, Dict]:
+        """COPY `rows` into a temporary table shaped like `columns` of `table`; returns (name, column types)"""
+        types = self._column_types(conn, table)
+        if not types:
+            raise ValueError(f"Unknown table: {table}")
+        unknown = [column for column in columns if column not in types]
+        if unknown:
+            raise ValueError(f"{table} has no column {', '.join(unknown)}")
+
+        stage = f"stage_{uuid.uuid4().hex[:12]}"
+        copy_types = ['real[]' if types[column][0] in VECTOR_TYPES else types[column][0] for column in columns]
+        conn.execute(sql.SQL('create temp table {} ({}) on commit drop').format(
+            sql.Identifier(stage),
+            sql.SQL(', ').join(
+                sql.SQL('{} {}').format(sql.Identifier(column), sql.SQL(copy_type))
+                for column, copy_type in zip(columns, copy_types)
+            )
+        ))
+
+        copy_sql = sql.SQL('copy {} ({}) from stdin (format binary)').format(
+            sql.Identifier(stage), sql.SQL(', ').join(map(sql.Identifier, columns))
+        )
+        with conn.cursor() as cursor:
+            cursor.adapters.register_dumper(None, _RealArrayDumper)
+            with cursor.copy(copy_sql) as copy:
+                copy.set_types(copy_types)
+                for row in rows:
+                    copy.write_row([self._copy_value(types[column][0], row.get(column)) for column in columns])
+        return stage, types
+
+    @staticmethod
+    def _staged_value(column: str, types: Dict) -> 'sql.Composable':
+        """Staged column, cast back to the target type for vector columns"""
+        copy_type, sql_type = types[column]
+        value = sql.SQL('s.{}').format(sql.Identifier(column))
+        if copy_type in VECTOR_TYPES:
+            return sql.SQL('{}::{}').format(value, sql.SQL(sql_type))
+        return value
+
+    def insert_rows(self, table: str, rows: Sequence[Dict]) -> int:
+        """Insert rows with binary COPY; columns missing from a row are inserted as NULL, as with PostgREST"""
+        if not rows:
+            return 0
+        columns = list(dict.fromkeys(key for row in rows for key in row))
+        with self.pool.connection() as conn:
+            stage, types = self._stage(conn, table, columns, rows)
+            conn.execute(sql.SQL('insert into {} ({}) select {} from {} s').format(
+                sql.Identifier(table),
+                sql.SQL(', ').join(map(sql.Identifier, columns)),
+                sql.SQL(', ').join(self._staged_value(column, types) for column in columns),
+                sql.Identifier(stage)
+            ))
+        return len(rows)
+
+    def update_rows(self, table: str, rows: Sequence[Dict], key: str = 'id') -> int:
+        """Update rows matched on `key` with one UPDATE ... FROM over a COPY-loaded staging table"""
+        if not rows:
+            return 0
+        columns = list(dict.fromkeys(column for row in rows for column in row))
+        if key not in columns:
+            raise ValueError(f"Rows need the key column {key}")
+        with self.pool.connection() as conn:
+            stage, types = self._stage(conn, table, columns, rows)
+            cursor = conn.execute(sql.SQL('update {} t set {} from {} s where t.{} = s.{}').format(
+                sql.Identifier(table),
+                sql.SQL(', ').join(
+                    sql.SQL('{} = {}').format(sql.Identifier(column), self._staged_value(column, types))
+                    for column in columns if column != key
+                ),
+                sql.Identifier(stage),
+                sql.Identifier(key),
+                sql.Identifier(key)
+            ))
+            return cursor.rowcount
+
+    # Bulk reads
+
+    def iter_rows(self, query, params: Optional[Dict] = None, itersize: int = 2000,
+                  binary: bool = False) -> Iterator[List[Dict]]:
+        """Yield result rows in chunks from a server-side cursor
+
+        With `binary`, results use the binary protocol and real[] columns load as numpy vectors.
+        """
+        with self.pool.connection() as conn:
+            with conn.cursor(name=f"scan_{uuid.uuid4().hex[:12]}", binary=binary) as cursor:
+                if binary:
+                    cursor.adapters.register_loader(REAL_ARRAY_OID, _RealArrayLoader)
+                cursor.itersize = itersize
+                cursor.execute(query, params)
+                while rows := cursor.fetchmany(itersize):
+                    yield rows
+
+    def iter_missing(self, table: str, columns: List[str], column: str,
+                     itersize: int = 2000, limit: Optional[int] = None) -> Iterator[List[Dict]]:
+        """Rows of `table` whose `column` is null, in id order, at most `limit` of them"""
+        query = sql.SQL('select {} from {} where {} is null order by id').format(
+            sql.SQL(', ').join(map(sql.Identifier, columns)), sql.Identifier(table), sql.Identifier(column)
+        )
+        if limit is not None:
+            query = sql.SQL('{} limit {}').format(query, sql.Literal(limit))
+        return self.iter_rows(query, itersize=itersize)
+
+    def fetch_embeddings(self, table: str, column: str = 'embedding',
+                         itersize: int = 5000) -> Tuple[np.ndarray, np.ndarray]:
+        """(ids, matrix) of every row with a vector, like vector_utils.fetch_embeddings without JSON"""
+        query = sql.SQL('select id, {}::real[] as vector from {} where {} is not null order by id').format(
+            sql.Identifier(column), sql.Identifier(table), sql.Identifier(column)
+        )
+        ids, vectors = [], []
+        for rows in self.iter_rows(query, itersize=itersize, binary=True):
+            ids.extend(row['id'] for row in rows)
+            vectors.append(np.vstack([row['vector'] for row in rows]))
+        if not vectors:
+            return np.empty(0, dtype=np.int64), np.empty((0, 0), dtype=np.float32)
+        return np.asarray(ids, dtype=np.int64), np.vstack(vectors)
@@ -0,0 +1,177 @@
+import time
+import sqlite3
+import hashlib
+import logging
+import threading
+from collections import OrderedDict
+from typing import Dict, Iterable, List, Optional
+
+import numpy as np
+
+from src.services.embedding_backends import EmbeddingBackend
+
+logger = logging.getLogger(__name__)
+
+
+class QueryEmbeddingCache:
+    """Two-tier cache of query embeddings: an in-process LRU backed by an optional SQLite file
+
+    Entries are keyed by normalized query text plus the backend's model and width, so
+    vectors from another embedding model are never returned. Entries older than
+    `ttl_seconds` are treated as misses. `prune()` drops persisted entries of
+    models no active embedding version uses; the searcher calls it on startup
+    and whenever it sees a table switch versions.
+    """
+
+    def __init__(self, max_entries: int = 1024, ttl_seconds: float = 7 * 24 * 3600,
+                 path: Optional[str] = None):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._memory: OrderedDict = OrderedDict()
+        self._lock = threading.Lock()
+        self._db = None
+        if path:
+            self._db = sqlite3.connect(path, check_same_thread=False)
+            self._db.execute("""
+                create table if not exists query_embeddings (
+                    key text primary key,
+                    model text not null,
+                    embedding blob not null,
+                    created_at real not null
+                )
+            """)
+            self._db.commit()
+
+        self.memory_hits = 0
+        self.persistent_hits = 0
+        self.misses = 0
+        self._miss_seconds = 0.0
+
+    @staticmethod
+    def normalize_query(query: str) -> str:
+        """Case- and whitespace-insensitive form of a query"""
+        return ' '.join(query.lower().split())
+
+    @staticmethod
+    def model_key(backend: EmbeddingBackend) -> str:
+        return f"{backend.model}:{backend.dimensions}"
+
+    def _key(self, query: str, model_key: str) -> str:
+        text = f"{model_key}\n{self.normalize_query(query)}"
+        return hashlib.sha256(text.encode('utf-8')).hexdigest()
+
+    def _expired(self, created_at: float) -> bool:
+        return time.time() - created_at > self.ttl_seconds
+
+    def get(self, query: str, backend: EmbeddingBackend) -> Optional[List[float]]:
+        """Cached embedding of a query for this backend, or None"""
+        key = self._key(query, self.model_key(backend))
+        with self._lock:
+            if key in self._memory:
+                created_at, embedding = self._memory[key]
+                if not self._expired(created_at):
+                    self._memory.move_to_end(key)
+                    self.memory_hits += 1
+                    return embedding
+                del self._memory[key]
+
+            if self._db is not None:
+                row = self._db.execute(
+                    "select embedding, created_at from query_embeddings where key = ?", (key,)
+                ).fetchone()
+                if row and not self._expired(row[1]):
+                    embedding = np.frombuffer(row[0], dtype=np.float32).tolist()
+                    self._remember(key, row[1], embedding)
+                    self.persistent_hits += 1
+                    return embedding
+        return None
+
+    def _remember(self, key: str, created_at: float, embedding: List[float]):
+        self._memory[key] = (created_at, embedding)
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_entries:
+            self._memory.popitem(last=False)
+
+    def put(self, query: str, backend: EmbeddingBackend, embedding: List[float]):
+        model_key = self.model_key(backend)
+        key = self._key(query, model_key)
+        created_at = time.time()
+        with self._lock:
+            self._remember(key, created_at, embedding)
+            if self._db is not None:
+                self._db.execute(
+                    "insert or replace into query_embeddings (key, model, embedding, created_at) values (?, ?, ?, ?)",
+                    (key, model_key, np.asarray(embedding, dtype=np.float32).tobytes(), created_at)
+                )
+                self._db.commit()
+
+    def get_or_create(self, query: str, backend: EmbeddingBackend) -> List[float]:
+        """Return the cached embedding or embed the query with `backend` and cache it"""
+        embedding = self.get(query, backend)
+        if embedding is not None:
+            return embedding
+
+        started = time.perf_counter()
+        embedding = backend.embed_one(query)
+        elapsed = time.perf_counter() - started
+        with self._lock:
+            self.misses += 1
+            self._miss_seconds += elapsed
+        self.put(query, backend, embedding)
+        return embedding
+
+    def get_or_create_many(self, queries: List[str], backend: EmbeddingBackend,
+                           batch_size: int = 100) -> List[List[float]]:
+        """Embeddings for many queries; cache misses are embedded in batches of `batch_size`"""
+        embeddings = [self.get(query, backend) for query in queries]
+        # Repeated queries in one call are embedded once
+        missing: Dict[str, List[int]] = OrderedDict()
+        for i, embedding in enumerate(embeddings):
+            if embedding is None:
+                missing.setdefault(self.normalize_query(queries[i]), []).append(i)
+
+        groups = list(missing.values())
+        for start in range(0, len(groups), batch_size):
+            batch = groups[start:start + batch_size]
+            started = time.perf_counter()
+            vectors = backend.embed([queries[positions[0]] for positions in batch])
+            elapsed = time.perf_counter() - started
+            with self._lock:
+                self.misses += len(batch)
+                self._miss_seconds += elapsed
+            for positions, embedding in zip(batch, vectors):
+                self.put(queries[positions[0]], backend, embedding)
+                for i in positions:
+                    embeddings[i] = embedding
+        return embeddings
+
+    def prune(self, model_keys: Iterable[str]) -> int:
+        """Drop persisted entries that are expired or belong to none of `model_keys` ("model:dimensions")"""
+        keep = sorted(set(model_keys))
+        with self._lock:
+            for key in [key for key, (created_at, _) in self._memory.items() if self._expired(created_at)]:
+                del self._memory[key]
+            if self._db is None:
+                return 0
+            cursor = self._db.execute(
+                f"delete from query_embeddings where created_at < ? "
+                f"or model not in ({', '.join('?' * len(keep))})",
+                (time.time() - self.ttl_seconds, *keep)
+            )
+            self._db.commit()
+            return cursor.rowcount
+
+    def stats(self) -> Dict:
+        """Hit rate and the embedding time saved, estimated from the mean miss latency"""
+        hits = self.memory_hits + self.persistent_hits
+        lookups = hits + self.misses
+        mean_miss = self._miss_seconds / self.misses if self.misses else 0.0
+        return {
+            'lookups': lookups,
+            'memory_hits': self.memory_hits,
+            'persistent_hits': self.persistent_hits,
+            'misses': self.misses,
+            'hit_rate': hits / lookups if lookups else 0.0,
+            'mean_miss_latency_ms': mean_miss * 1000,
+            'saved_seconds': hits * mean_miss,
+        }
@@ -0,0 +1,141 @@
+import re
+import time
+import logging
+from typing import Dict, List, Optional
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# Structured field -> hydratable column or JSONB path, per analysis table
+RERANK_FIELDS = {
+    'screen_analysis': {
+        'design_color_scheme': 'design_color_scheme',
+        'business_industry': 'business_industry',
+        'layout_components': 'image_analysis.layout_components',
+        'section': 'section',
+    },
+    'screen_analysis_fusion': {
+        'design_color_scheme': 'design_color_scheme',
+        'business_industry': 'business_industry',
+        'layout_components': 'fused_analysis.layout_components',
+    },
+    'screen_html_analysis': {
+        'business_industry': 'business_industry',
+        # HTML analyses describe page sections rather than visual components
+        'layout_components': 'web_analysis.content_main_sections',
+    },
+}
+
+DEFAULT_RERANK_WEIGHTS = {
+    'similarity': 1.0,
+    'design_color_scheme': 0.1,
+    'business_industry': 0.1,
+    'layout_components': 0.05,
+    'section': 0.1,
+}
+
+
+def _terms(text: str) -> set:
+    """Lower-cased word tokens with a naive plural strip, so 'buttons' matches 'button'"""
+    return {
+        token[:-1] if len(token) > 3 and token.endswith('s') and not token.endswith('ss') else token
+        for token in re.findall(r'[a-z0-9]+', text.lower())
+    }
+
+
+class FieldReranker:
+    """Reorders over-fetched vector hits by similarity plus structured field matches
+
+    The searcher fetches `candidates` hits with the fields of RERANK_FIELDS
+    hydrated. Each field scores the share of its value's words found in the
+    query (the best item for list fields such as layout components). Item
+    terms are flattened into arrays so the candidate-by-field match matrix is
+    built in one NumPy pass, and the final score is the weighted sum of the
+    similarity and the field scores, computed as one matrix product.
+
+    Matching stops at `budget_ms`; candidates not reached by then keep only
+    their vector score, so the stage never adds more than the budget on top of
+    the candidate fetch.
+    """
+
+    def __init__(self, weights: Optional[Dict[str, float]] = None, candidates: int = 50,
+                 budget_ms: float = 20.0):
+        self.weights = {**DEFAULT_RERANK_WEIGHTS, **(weights or {})}
+        self.candidates = candidates
+        self.budget_ms = budget_ms
+        self.over_budget = 0
+
+    def fields_for(self, table: str) -> List[str]:
+        """Paths to hydrate for a table; fields weighted 0 are not fetched"""
+        return [path for field, path in RERANK_FIELDS[table].items() if self.weights.get(field)]
+
+    @staticmethod
+    def query_terms(query: str) -> List[str]:
+        return sorted(_terms(query))
+
+    def rerank(self, query: str, results: List[Dict], table: str, top_k: int,
+               keep_fields: Optional[List[str]] = None) -> List[Dict]:
+        """Top-k of `results` by combined score
+
+        Args:
+            query: Query text the field values are matched against
+            results: Hits with the paths of `fields_for(table)` under 'fields'
+            table: Analysis table the hits come from
+            top_k: Number of hits returned
+            keep_fields: Fields requested by the caller; other hydrated fields are dropped
+        """
+        if not results:
+            return []
+        started = time.perf_counter()
+        query_terms = _terms(query)
+        fields = [(field, path) for field, path in RERANK_FIELDS[table].items() if self.weights.get(field)]
+
+        # Flatten every (candidate, field, item) into parallel arrays, then score all items at once
+        item_rows, item_columns, term_items, term_hits = [], [], [], []
+        for row, result in enumerate(results):
+            if (time.perf_counter() - started) * 1000 > self.budget_ms:
+                self.over_budget += 1
+                logger.warning(f"Rerank budget of {self.budget_ms}ms reached after {row} of "
+                               f"{len(results)} candidates")
+                break
+            hydrated = result.get('fields') or {}
+            for column, (_, path) in enumerate(fields):
+                value = hydrated.get(path)
+                for item in value if isinstance(value, list) else [value]:
+                    if item is None:
+                        continue
+                    item_terms = _terms(str(item))
+                    term_items.extend([len(item_rows)] * len(item_terms))
+                    term_hits.extend(term in query_terms for term in item_terms)
+                    item_rows.append(row)
+                    item_columns.append(column)
+
+        matches = np.zeros((len(results), len(fields)), dtype=np.float32)
+        if item_rows:
+            # Share of each item's terms found in the query; a field scores its best item
+            term_items = np.asarray(term_items, dtype=np.int64)
+            counts = np.bincount(term_items, minlength=len(item_rows))
+            hits = np.bincount(term_items, weights=np.asarray(term_hits, dtype=np.float32),
+                               minlength=len(item_rows))
+            shares = np.divide(hits, counts, out=np.zeros(len(item_rows)), where=counts > 0)
+            np.maximum.at(matches, (np.asarray(item_rows), np.asarray(item_columns)), shares)
+
+        similarities = np.asarray([result['similarity'] for result in results], dtype=np.float32)
+        field_weights = np.asarray([self.weights[field] for field, _ in fields], dtype=np.float32)
+        scores = self.weights['similarity'] * similarities + matches @ field_weights
+        order = np.argsort(-scores, kind='stable')[:top_k]
+
+        reranked = []
+        for row in order:
+            result = dict(results[row])
+            result['rerank_score'] = float(scores[row])
+            if keep_fields:
+                result['fields'] = {path: result.get('fields', {}).get(path) for path in keep_fields}
+            else:
+                result.pop('fields', None)
+            reranked.append(result)
+        return reranked
+
+    def stats(self) -> Dict:
+        return {'candidates': self.candidates, 'budget_ms': self.budget_ms, 'over_budget': self.over_budget}
@@ -0,0 +1,146 @@
+import json
+import time
+import logging
+import threading
+from collections import OrderedDict
+from typing import Dict, List, Optional
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+
+class SemanticResultCache:
+    """Search results reused across near-duplicate queries
+
+    Results are grouped by table and search parameters (top_k, filters, knobs,
+    embedding version). A new query is compared with the cached query vectors of
+    its group; when the best cosine similarity reaches `threshold`, the cached
+    results are returned without searching. Each table's entries are dropped as
+    soon as its `updated_at` watermark advances, checked at most every
+    `watermark_ttl` seconds.
+
+    `max_entries` caps the entries of all groups together: beyond it the oldest
+    entry of the least recently used group goes, and groups left empty or
+    holding only expired entries are removed, so a long-running service with
+    varied filters stays bounded.
+    """
+
+    def __init__(self, supabase_client, threshold: float = 0.95, max_entries: int = 1024,
+                 ttl_seconds: float = 3600.0, watermark_ttl: float = 30.0):
+        self.supabase = supabase_client
+        self.threshold = threshold
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.watermark_ttl = watermark_ttl
+        # Least recently used group first
+        self._groups: 'OrderedDict[tuple, Dict]' = OrderedDict()
+        self._entries = 0
+        self._watermarks: Dict[str, tuple] = {}
+        self._lock = threading.Lock()
+
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+
+    @staticmethod
+    def group_key(table: str, top_k: int, **params) -> tuple:
+        """Results are only shared between queries with identical search parameters"""
+        return table, top_k, json.dumps(params, sort_keys=True, default=str)
+
+    def _fetch_watermark(self, table: str) -> Optional[str]:
+        response = self.supabase.table(table)\
+            .select('updated_at')\
+            .order('updated_at', desc=True)\
+            .limit(1)\
+            .execute()
+        return response.data[0]['updated_at'] if response.data else None
+
+    def _check_watermark(self, table: str):
+        """Drop a table's entries when its watermark has advanced"""
+        checked = self._watermarks.get(table)
+        if checked and time.monotonic() - checked[0] < self.watermark_ttl:
+            return
+        try:
+            watermark = self._fetch_watermark(table)
+        except Exception as e:
+            logger.warning(f"Could not read the watermark of {table}: {str(e)}")
+            return
+
+        with self._lock:
+            if checked and checked[1] != watermark:
+                stale = [key for key in self._groups if key[0] == table]
+                for key in stale:
+                    self._entries -= len(self._groups.pop(key)['results'])
+                self.invalidations += 1
+                logger.info(f"{table} changed since {checked[1]}; dropped {len(stale)} cached result groups")
+            self._watermarks[table] = (time.monotonic(), watermark)
+
+    def _drop_oldest(self, key: tuple, count: int):
+        """Remove a group's `count` oldest entries, and the group once it is empty"""
+        group = self._groups[key]
+        group['vectors'] = group['vectors'][count:]
+        del group['results'][:count]
+        del group['created_at'][:count]
+        self._entries -= count
+        if not group['results']:
+            del self._groups[key]
+
+    def _expire(self, key: tuple):
+        """Drop a group's entries older than `ttl_seconds`; entries are kept oldest first"""
+        group = self._groups.get(key)
+        if not group:
+            return
+        cutoff = time.time() - self.ttl_seconds
+        expired = 0
+        while expired < len(group['created_at']) and group['created_at'][expired] < cutoff:
+            expired += 1
+        if expired:
+            self._drop_oldest(key, expired)
+
+    def get(self, key: tuple, query_embedding: List[float]) -> Optional[List[Dict]]:
+        """Cached results of the closest earlier query in the group, if close enough"""
+        self._check_watermark(key[0])
+        with self._lock:
+            self._expire(key)
+            group = self._groups.get(key)
+            if group:
+                query = np.asarray(query_embedding, dtype=np.float32)
+                query /= np.linalg.norm(query) or 1.0
+                similarities = group['vectors'] @ query
+                best = int(np.argmax(similarities))
+                if similarities[best] >= self.threshold:
+                    self._groups.move_to_end(key)
+                    self.hits += 1
+                    return [dict(result) for result in group['results'][best]]
+            self.misses += 1
+        return None
+
+    def put(self, key: tuple, query_embedding: List[float], results: List[Dict]):
+        query = np.asarray(query_embedding, dtype=np.float32)
+        query /= np.linalg.norm(query) or 1.0
+        with self._lock:
+            self._expire(key)
+            group = self._groups.setdefault(key, {
+                'vectors': np.empty((0, len(query)), dtype=np.float32), 'results': [], 'created_at': []
+            })
+            self._groups.move_to_end(key)
+            group['vectors'] = np.vstack([group['vectors'], query])
+            group['results'].append([dict(result) for result in results])
+            group['created_at'].append(time.time())
+            self._entries += 1
+
+            # Evict from the least recently used groups beyond the size cap
+            while self._entries > self.max_entries:
+                self._drop_oldest(next(iter(self._groups)), 1)
+
+    def stats(self) -> Dict:
+        lookups = self.hits + self.misses
+        return {
+            'lookups': lookups,
+            'hits': self.hits,
+            'hit_rate': self.hits / lookups if lookups else 0.0,
+            'invalidations': self.invalidations,
+            'entries': self._entries,
+            'groups': len(self._groups),
+        }
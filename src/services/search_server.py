@@ -0,0 +1,214 @@
+import json
+import time
+import asyncio
+import logging
+import traceback
+from collections import deque
+from typing import Dict, Optional, Tuple
+from urllib.parse import urlsplit, parse_qs
+
+import numpy as np
+
+from src.config import ANALYSIS_TABLES
+
+logger = logging.getLogger(__name__)
+
+REASONS = {200: 'OK', 400: 'Bad Request', 404: 'Not Found', 405: 'Method Not Allowed',
+           413: 'Payload Too Large', 500: 'Internal Server Error'}
+
+
+class LatencyTracker:
+    """Rolling window of request latencies with percentile summaries"""
+
+    def __init__(self, window: int = 10000):
+        self.samples = deque(maxlen=window)
+        self.count = 0
+
+    def record(self, seconds: float):
+        self.samples.append(seconds * 1000)
+        self.count += 1
+
+    def summary(self) -> Dict:
+        if not self.samples:
+            return {'count': self.count, 'p50_ms': None, 'p95_ms': None, 'p99_ms': None}
+        p50, p95, p99 = np.percentile(np.fromiter(self.samples, dtype=np.float64), [50, 95, 99])
+        return {'count': self.count, 'p50_ms': round(p50, 2), 'p95_ms': round(p95, 2), 'p99_ms': round(p99, 2)}
+
+
+class SearchServer:
+    """HTTP/JSON front end keeping one SimilaritySearcher and its clients warm
+
+    Endpoints:
+        GET  /search?q=...&mode=regular|fusion|html|hybrid|all&top_k=5[&probes=N&ef_search=N&oversample=N&filters={...}&fields=a,b.c]
+        POST /search  {"query": "..."} or {"queries": [...]} plus the same options
+        GET  /healthz  status, uptime and p50/p95/p99 search latency
+
+    Connections are handled on an asyncio loop with HTTP/1.1 keep-alive; searches
+    run in worker threads (the Supabase and OpenAI clients are synchronous),
+    bounded by `max_concurrency`.
+    """
+
+    MAX_BODY_BYTES = 1024 * 1024
+
+    def __init__(self, searcher, host: str = '127.0.0.1', port: int = 8080, max_concurrency: int = 32):
+        self.searcher = searcher
+        self.host = host
+        self.port = port
+        self.max_concurrency = max_concurrency
+        self.latency = LatencyTracker()
+        self.started_at = time.monotonic()
+        self._semaphore: Optional[asyncio.Semaphore] = None
+
+    # Request handling
+
+    def _search_options(self, params: Dict) -> Dict:
+        mode = params.get('mode', 'regular')
+        if mode not in [*ANALYSIS_TABLES, 'hybrid', 'all']:
+            raise ValueError(f"mode must be one of {', '.join(ANALYSIS_TABLES)}, hybrid, all")
+        options = {'mode': mode, 'top_k': int(params.get('top_k', 5))}
+        for knob in ('probes', 'ef_search', 'oversample'):
+            if params.get(knob) is not None:
+                options[knob] = int(params[knob])
+        if params.get('filters'):
+            filters = params['filters']
+            # GET passes filters as a JSON-encoded query parameter
+            options['filters'] = json.loads(filters) if isinstance(filters, str) else filters
+        if params.get('fields'):
+            fields = params['fields']
+            # GET passes fields as a comma-separated list
+            options['fields'] = fields.split(',') if isinstance(fields, str) else list(fields)
+        return options
+
+    async def _search(self, params: Dict) -> Dict:
+        options = self._search_options(params)
+        queries = params.get('queries')
+        query = params.get('query') or params.get('q')
+        if not query and not queries:
+            raise ValueError("query (or queries) is required")
+        if 'oversample' in options and (queries or options['mode'] in ('hybrid', 'all')):
+            raise ValueError("oversample applies to single-query vector search only")
+        if queries and options['mode'] in ('hybrid', 'all'):
+            raise ValueError(f"{options['mode']} mode takes a single query")
+        if ('filters' in options or 'fields' in options) and (queries or options['mode'] in ('hybrid', 'all')):
+            raise ValueError("filters and fields apply to single-query vector search only")
+
+        started = time.perf_counter()
+        async with self._semaphore:
+            if queries:
+                results = await asyncio.to_thread(self.searcher.search_many, list(queries), **options)
+            else:
+                results = await asyncio.to_thread(self.searcher.search, query, **options)
+        elapsed = time.perf_counter() - started
+        self.latency.record(elapsed)
+        return {'results': results, 'took_ms': round(elapsed * 1000, 2)}
+
+    def _health(self) -> Dict:
+        health = {
+            'status': 'ok',
+            'uptime_seconds': round(time.monotonic() - self.started_at, 1),
+            'latency': self.latency.summary()
+        }
+        if self.searcher.query_cache:
+            health['query_cache'] = self.searcher.query_cache.stats()
+        if self.searcher.result_cache:
+            health['result_cache'] = self.searcher.result_cache.stats()
+        if self.searcher.reranker:
+            health['reranker'] = self.searcher.reranker.stats()
+        return health
+
+    async def _route(self, method: str, target: str, body: bytes) -> Tuple[int, Dict]:
+        url = urlsplit(target)
+        if url.path == '/healthz':
+            return 200, self._health()
+        if url.path != '/search':
+            return 404, {'error': f"No route for {url.path}"}
+
+        if method == 'GET':
+            params = {key: values[-1] for key, values in parse_qs(url.query).items()}
+        elif method == 'POST':
+            params = json.loads(body or b'{}')
+        else:
+            return 405, {'error': f"{method} not allowed"}
+        return 200, await self._search(params)
+
+    # HTTP plumbing
+
+    async def _read_request(self, reader: asyncio.StreamReader) -> Optional[Tuple[str, str, Dict, bytes]]:
+        request_line = await reader.readline()
+        if not request_line.strip():
+            return None
+        method, target, _ = request_line.decode('latin-1').split(' ', 2)
+
+        headers = {}
+        while True:
+            line = await reader.readline()
+            if line in (b'\r\n', b'\n', b''):
+                break
+            name, _, value = line.decode('latin-1').partition(':')
+            headers[name.strip().lower()] = value.strip()
+
+        length = int(headers.get('content-length', 0))
+        if length > self.MAX_BODY_BYTES:
+            raise OverflowError(length)
+        body = await reader.readexactly(length) if length else b''
+        return method.upper(), target, headers, body
+
+    async def _handle_connection(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        try:
+            while True:
+                try:
+                    request = await self._read_request(reader)
+                except OverflowError:
+                    await self._respond(writer, 413, {'error': 'request body too large'}, keep_alive=False)
+                    break
+                except (ValueError, asyncio.IncompleteReadError):
+                    await self._respond(writer, 400, {'error': 'malformed request'}, keep_alive=False)
+                    break
+                if request is None:
+                    break
+
+                method, target, headers, body = request
+                keep_alive = headers.get('connection', '').lower() != 'close'
+                try:
+                    status, payload = await self._route(method, target, body)
+                except (ValueError, TypeError) as e:
+                    status, payload = 400, {'error': str(e)}
+                except Exception as e:
+                    logger.error(f"Error handling {method} {target}: {str(e)}")
+                    logger.error(f"Full error: {traceback.format_exc()}")
+                    status, payload = 500, {'error': 'internal error'}
+
+                await self._respond(writer, status, payload, keep_alive)
+                if not keep_alive:
+                    break
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
+
+    async def _respond(self, writer: asyncio.StreamWriter, status: int, payload: Dict, keep_alive: bool = True):
+        body = json.dumps(payload).encode('utf-8')
+        head = (
+            f"HTTP/1.1 {status} {REASONS.get(status, '')}\r\n"
+            f"Content-Type: application/json\r\n"
+            f"Content-Length: {len(body)}\r\n"
+            f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n"
+        )
+        writer.write(head.encode('latin-1') + body)
+        await writer.drain()
+
+    async def serve_forever(self):
+        self._semaphore = asyncio.Semaphore(self.max_concurrency)
+        server = await asyncio.start_server(self._handle_connection, self.host, self.port)
+        logger.info(f"Search service listening on http://{self.host}:{self.port}")
+        try:
+            async with server:
+                await server.serve_forever()
+        finally:
+            logger.info(f"Search latency: {self.latency.summary()}")
+
+    def run(self):
+        try:
+            asyncio.run(self.serve_forever())
+        except KeyboardInterrupt:
+            logger.info("Search service stopped")
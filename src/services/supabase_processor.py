@@ -8,8 +8,10 @@ from src.services.gemini_analyzer import GeminiAnalyzer
 from src.services.web_analyzer import WebAnalyzer
 import json
 from src.models.analysis_result import SiteAnalysis
+from src.config import ANALYSIS_TABLES
 from src.prompts.analysis_prompts import FUSION_ANALYSIS_PROMPT
 from src.services.fusion_analyzer import FusionAnalyzer
+from src.services.embedding_processor import EmbeddingProcessor
 import traceback
 
 logger = logging.getLogger(__name__)
@@ -18,7 +20,9 @@ class SupabaseImageProcessor:
     """Handles Supabase storage operations"""
     def __init__(self, supabase_client, web_analyzer: WebAnalyzer, 
                  image_analyzer: GeminiAnalyzer, enable_fusion: bool = False,
-                 section_enabled: bool = False):
+                 section_enabled: bool = False,
+                 embedding_processor: Optional[EmbeddingProcessor] = None,
+                 inline_batch_size: int = 16, db=None):
         self.supabase = supabase_client
         self.web_analyzer = web_analyzer
         self.image_analyzer = image_analyzer
@@ -27,6 +31,63 @@ class SupabaseImageProcessor:
         self.fusion_analyzer = FusionAnalyzer(image_analyzer) if enable_fusion else None
         self.web_analysis_cache = {}
         self.storage_base_url = "http://127.0.0.1:54321/storage/v1/object/public/screens"
+        # When set, rows are embedded from the in-memory analysis and inserted with their vector
+        self.embedding_processor = embedding_processor
+        self.inline_batch_size = inline_batch_size
+        self.pending_rows: Dict[str, List[Dict]] = {}
+        # Direct Postgres backend (DB_BACKEND=postgres); queued rows are inserted with binary COPY
+        self.db = db
+
+    def _insert_analysis_row(self, table: str, mode: str, data: Dict, label: str):
+        """Insert an analysis row, or queue it for a batched insert when embedding inline or using COPY"""
+        if not self.embedding_processor and not self.db:
+            self.supabase.table(table).insert(data).execute()
+            logger.info(f"Saved {label}")
+            return
+
+        self.pending_rows.setdefault(mode, []).append(data)
+        logger.info(f"Queued {label} ({len(self.pending_rows[mode])} pending)")
+        if len(self.pending_rows[mode]) >= self.inline_batch_size:
+            self.flush_pending_rows(mode)
+
+    def _insert_rows(self, table: str, rows: List[Dict]):
+        if self.db:
+            self.db.insert_rows(table, rows)
+        else:
+            self.supabase.table(table).insert(rows).execute()
+
+    def flush_pending_rows(self, mode: Optional[str] = None):
+        """Embed queued rows in one request per mode (when embedding inline) and insert them in one batch"""
+        modes = [mode] if mode else list(self.pending_rows)
+        for current_mode in modes:
+            rows = self.pending_rows.pop(current_mode, [])
+            if not rows:
+                continue
+
+            embeddings = []
+            if self.embedding_processor:
+                texts = [self.embedding_processor.build_embedding_text(current_mode, row) for row in rows]
+                embeddings = self.embedding_processor.create_embeddings(texts)
+                for row, embedding in zip(rows, embeddings):
+                    # Rows whose embedding failed are inserted without one and picked up by the backfill
+                    row[self.embedding_processor.column] = embedding
+
+            table = ANALYSIS_TABLES[current_mode]
+            embedded = sum(1 for embedding in embeddings if embedding is not None)
+            try:
+                self._insert_rows(table, rows)
+                logger.info(f"Saved {len(rows)} rows into {table} ({embedded} with inline embeddings)")
+            except Exception as e:
+                # One bad row fails the whole batch; retry row by row so the others are kept
+                logger.error(f"Error inserting {len(rows)} rows into {table}, retrying one by one: {str(e)}")
+                saved = 0
+                for row in rows:
+                    try:
+                        self._insert_rows(table, [row])
+                        saved += 1
+                    except Exception as row_error:
+                        logger.error(f"Error saving {table} row for {row.get('site_url')}: {str(row_error)}")
+                logger.info(f"Saved {saved} of {len(rows)} rows into {table}")
 
     def _save_analysis(self, result: ImageAnalysis):
         """Saves image analysis results to database"""
@@ -176,7 +237,9 @@ class SupabaseImageProcessor:
             return False
 
     def _is_fusion_analyzed(self, site_url: str) -> bool:
-        """Check if a site already has fusion analysis"""
+        """Check if a site already has fusion analysis, saved or still queued for insert"""
+        if any(row['site_url'] == site_url for row in self.pending_rows.get('fusion', [])):
+            return True
         try:
             response = self.supabase.table('screen_analysis_fusion')\
                 .select('id')\
@@ -385,12 +448,17 @@ class SupabaseImageProcessor:
                         skipped_count += 1
                         continue
 
+            if self.pending_rows:
+                self.flush_pending_rows()
+
             logger.info(f"Processing completed: {processed_count} images analyzed, {skipped_count} skipped")
             return results
 
         except Exception as e:
             logger.error(f"Error processing sites: {str(e)}")
             logger.error(f"Full error: {traceback.format_exc()}")
+            if self.pending_rows:
+                self.flush_pending_rows()
             return [] 
 
     def _save_regular_analysis(self, analysis: SiteAnalysis):
@@ -423,8 +491,8 @@ class SupabaseImageProcessor:
                     'section': section  # Add section to data
                 }
                 
-                self.supabase.table('screen_analysis').insert(data).execute()
-                logger.info(f"Saved analysis for {analysis.site_url} - {img_analysis.filename}")
+                self._insert_analysis_row('screen_analysis', 'regular', data,
+                                          f"analysis for {analysis.site_url} - {img_analysis.filename}")
 
         except Exception as e:
             logger.error(f"Error saving regular analysis: {str(e)}")
@@ -454,8 +522,8 @@ class SupabaseImageProcessor:
                 'embedding': None
             }
             
-            self.supabase.table('screen_analysis_fusion').insert(data).execute()
-            logger.info(f"Saved fusion analysis for {analysis.site_url}")
+            self._insert_analysis_row('screen_analysis_fusion', 'fusion', data,
+                                      f"fusion analysis for {analysis.site_url}")
             
         except Exception as e:
             logger.error(f"Error saving fusion analysis: {str(e)}")
@@ -532,16 +600,15 @@ class SupabaseImageProcessor:
                                 'web_analysis': web_analysis
                             }
                             
-                            self.supabase.table('screen_html_analysis').insert({
+                            self._insert_analysis_row('screen_html_analysis', 'html', {
                                 'screen_id': screen_id,
                                 'site_url': site_url,
                                 'web_analysis': web_analysis,
-                                'embedding': None  # For future use
-                            }).execute()
+                                'embedding': None  # Filled inline or by update_embeddings.py
+                            }, f"HTML analysis for {site_url}")
                             
                             results.append(result)
                             processed_count += 1
-                            logger.info(f"Successfully saved analysis for {site_url}")
                             
                         except Exception as save_error:
                             logger.error(f"Error saving analysis for {site_url}: {str(save_error)}")
@@ -558,12 +625,17 @@ class SupabaseImageProcessor:
                     skipped_count += 1
                     continue
                     
+            if self.pending_rows:
+                self.flush_pending_rows()
+
             logger.info(f"Processing completed: {processed_count} sites analyzed, {skipped_count} skipped")
             return results
             
         except Exception as e:
             logger.error(f"Error processing HTML only: {str(e)}")
             logger.error(f"Full error: {traceback.format_exc()}")
+            if self.pending_rows:
+                self.flush_pending_rows()
             return [] 
 
     def _get_screen_section(self, screen_id: int) -> Optional[str]:
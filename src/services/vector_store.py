@@ -0,0 +1,226 @@
+import os
+import json
+import time
+import logging
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from src.config import ANALYSIS_TABLES
+from src.services.vector_utils import parse_vector, normalize_rows
+
+logger = logging.getLogger(__name__)
+
+META_FILE = 'meta.json'
+RECORD_FIELDS = ['screen_id', 'site_url', 'webp_url']
+
+
+class RecordColumn:
+    """One row field of a store, decoded a row at a time from memory-mapped files
+
+    Values are JSON-encoded back to back in `<field>-<stamp>.bin`, with
+    `count + 1` int64 offsets into it in `<field>-offsets-<stamp>.bin`, so
+    only the rows a caller indexes are turned into Python objects.
+    """
+
+    def __init__(self, offsets: np.ndarray, blob: np.ndarray):
+        self.offsets = offsets
+        self.blob = blob
+
+    def __len__(self) -> int:
+        return max(len(self.offsets) - 1, 0)
+
+    def __getitem__(self, row: int):
+        if row < 0:
+            row += len(self)
+        return json.loads(self.blob[self.offsets[row]:self.offsets[row + 1]].tobytes())
+
+    def __iter__(self):
+        for row in range(len(self)):
+            yield self[row]
+
+
+def _write_records(path: str, stamp: str, records: Dict[str, Sequence], count: int) -> Dict[str, str]:
+    """Write each record field as a blob/offsets file pair and return their names"""
+    files = {}
+    for field in RECORD_FIELDS:
+        files[field], files[f'{field}_offsets'] = f'{field}-{stamp}.bin', f'{field}-offsets-{stamp}.bin'
+        values = records.get(field)
+        values = [None] * count if values is None else values
+        if len(values) != count:
+            raise ValueError(f"{field} has {len(values)} values for {count} vectors")
+        offsets = np.zeros(count + 1, dtype=np.int64)
+        with open(os.path.join(path, files[field]), 'wb') as f:
+            for row, value in enumerate(values):
+                offsets[row + 1] = offsets[row] + f.write(json.dumps(value).encode())
+        offsets.tofile(os.path.join(path, files[f'{field}_offsets']))
+    return files
+
+
+class VectorStore:
+    """Binary snapshot of a table's vectors, opened with np.memmap
+
+    A store directory holds a raw row-major matrix (`vectors-<stamp>.bin`,
+    float16 or float32, L2-normalized), the matching int64 id array
+    (`ids-<stamp>.bin`), one `RecordColumn` file pair per row field returned
+    by search, and `meta.json`, which only records the dtype, shape, file
+    names and the `updated_at` watermark. Opening parses that small sidecar
+    and maps the files read-only without copying, so worker processes share
+    one page-cached copy; record files are mapped on first use. Writes go to
+    freshly stamped files and `meta.json` is replaced last, so readers never
+    see a half-written store;
+    the previous generation's files are kept until the next write, so a reader
+    that read the old `meta.json` can still map them.
+
+    float32 is the default: indexes score float32 directly, while float16
+    stores (half the size) are upcast once when an index is built on them.
+    """
+
+    def __init__(self, path: str, ids: np.ndarray, vectors: np.ndarray, meta: Dict):
+        self.path = path
+        self.ids = ids
+        self.vectors = vectors
+        # Stores written before the records moved out of the sidecar carry them inline
+        self._records: Optional[Dict] = meta.pop('records', None)
+        self.meta = meta
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    @property
+    def records(self) -> Dict[str, RecordColumn]:
+        """Row fields in id order, keyed by field name; mapped on first access"""
+        if self._records is None:
+            files, count = self.meta['files'], len(self.ids)
+            self._records = {}
+            for field in RECORD_FIELDS:
+                if count and field in files:
+                    offsets = np.memmap(os.path.join(self.path, files[f'{field}_offsets']), dtype=np.int64,
+                                        mode='r', shape=(count + 1,))
+                    blob = np.memmap(os.path.join(self.path, files[field]), dtype=np.uint8, mode='r')
+                    self._records[field] = RecordColumn(offsets, blob)
+                else:
+                    self._records[field] = [None] * count
+        return self._records
+
+    @classmethod
+    def open(cls, path: str) -> 'VectorStore':
+        """Map a store read-only; only the metadata sidecar is parsed"""
+        with open(os.path.join(path, META_FILE)) as f:
+            meta = json.load(f)
+        count, dimensions = meta['count'], meta['dimensions'] or 0
+        if count:
+            vectors = np.memmap(os.path.join(path, meta['files']['vectors']), dtype=meta['dtype'],
+                                mode='r', shape=(count, dimensions))
+            ids = np.memmap(os.path.join(path, meta['files']['ids']), dtype=np.int64, mode='r', shape=(count,))
+        else:
+            vectors = np.empty((0, dimensions), dtype=meta['dtype'])
+            ids = np.empty(0, dtype=np.int64)
+        return cls(path, ids, vectors, meta)
+
+    @classmethod
+    def write(cls, path: str, chunks: Iterable[Tuple[np.ndarray, np.ndarray]], meta: Dict,
+              records: Dict[str, Sequence], dtype: str = 'float32') -> 'VectorStore':
+        """Stream (ids, vectors) chunks into a new store and open it
+
+        Args:
+            path: Store directory (created if missing)
+            chunks: Iterable of (ids, matrix) pairs; rows are normalized on write
+            meta: Extra metadata kept in the sidecar (table, column, watermark, ...)
+            records: Row fields in id order, keyed by field name (read after the chunks)
+            dtype: On-disk precision ('float16' halves the size of 'float32')
+        """
+        os.makedirs(path, exist_ok=True)
+        stamp = f"{time.time_ns()}"
+        files = {'vectors': f'vectors-{stamp}.bin', 'ids': f'ids-{stamp}.bin'}
+
+        count, dimensions = 0, None
+        with open(os.path.join(path, files['vectors']), 'wb') as vector_file, \
+                open(os.path.join(path, files['ids']), 'wb') as id_file:
+            for ids, vectors in chunks:
+                if len(ids) == 0:
+                    continue
+                dimensions = dimensions or vectors.shape[1]
+                vector_file.write(np.ascontiguousarray(
+                    normalize_rows(np.asarray(vectors, dtype=np.float32)), dtype=dtype
+                ).tobytes())
+                id_file.write(np.asarray(ids, dtype=np.int64).tobytes())
+                count += len(ids)
+        files.update(_write_records(path, stamp, records, count))
+
+        meta_path = os.path.join(path, META_FILE)
+        previous = {}
+        if os.path.exists(meta_path):
+            with open(meta_path) as f:
+                previous = json.load(f).get('files', {})
+
+        sidecar = {**meta, 'dtype': dtype, 'count': count, 'dimensions': dimensions, 'files': files}
+        tmp_meta = os.path.join(path, f'{META_FILE}.{stamp}')
+        with open(tmp_meta, 'w') as f:
+            json.dump(sidecar, f)
+        os.replace(tmp_meta, meta_path)
+
+        # Keep the generation readers may have just looked up; older ones go.
+        # Unlinked files stay readable by processes that already map them
+        keep = {*files.values(), *previous.values()}
+        for name in os.listdir(path):
+            if name.endswith('.bin') and name not in keep:
+                os.remove(os.path.join(path, name))
+        return cls.open(path)
+
+
+def _fetch_pages(supabase, table: str, column: str, page_size: int):
+    """Yield pages of rows with vectors, keyset-paginated on id"""
+    fields = ['id', *RECORD_FIELDS[:2], column, 'updated_at']
+    if table == 'screen_analysis':
+        fields.append('webp_url')
+
+    last_id = 0
+    while True:
+        response = supabase.table(table)\
+            .select(*fields)\
+            .not_.is_(column, 'null')\
+            .gt('id', last_id)\
+            .order('id')\
+            .limit(page_size)\
+            .execute()
+        if not response.data:
+            break
+        yield response.data
+        if len(response.data) < page_size:
+            break
+        last_id = response.data[-1]['id']
+
+
+def export_table(supabase, mode: str, path: str, column: str = 'embedding',
+                 dtype: str = 'float32', page_size: int = 1000) -> VectorStore:
+    """Write one analysis table's vectors to a store without holding the matrix in memory"""
+    table = ANALYSIS_TABLES[mode]
+    records = {field: [] for field in RECORD_FIELDS}
+    meta = {'table': table, 'mode': mode, 'column': column, 'watermark': None}
+
+    def chunks():
+        for rows in _fetch_pages(supabase, table, column, page_size):
+            for field in RECORD_FIELDS:
+                records[field].extend(row.get(field) for row in rows)
+            updated = [row['updated_at'] for row in rows if row.get('updated_at')]
+            if updated:
+                meta['watermark'] = max(filter(None, [meta['watermark'], *updated]))
+            yield (np.asarray([row['id'] for row in rows], dtype=np.int64),
+                   np.vstack([parse_vector(row[column]) for row in rows]))
+
+    started = time.perf_counter()
+    # write() reads records and builds the sidecar after consuming the chunks, so both are complete
+    store = VectorStore.write(path, chunks(), meta, records, dtype=dtype)
+    logger.info(f"Exported {len(store)} vectors of {table}.{column} to {path} "
+                f"as {dtype} in {time.perf_counter() - started:.1f}s")
+    return store
+
+
+def export_all(supabase, root: str, modes: Optional[List[str]] = None, column: str = 'embedding',
+               dtype: str = 'float32') -> Dict[str, VectorStore]:
+    """Export each mode's table to `root/<mode>`"""
+    return {
+        mode: export_table(supabase, mode, os.path.join(root, mode), column=column, dtype=dtype)
+        for mode in (modes or list(ANALYSIS_TABLES))
+    }
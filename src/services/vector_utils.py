@@ -0,0 +1,116 @@
+import json
+import logging
+from typing import List, Tuple, Union
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+
+def parse_vector(value: Union[str, List[float]]) -> np.ndarray:
+    """Parse a pgvector value returned by PostgREST ('[0.1,0.2,...]' or a list)"""
+    if isinstance(value, str):
+        value = json.loads(value)
+    return np.asarray(value, dtype=np.float32)
+
+
+def normalize_rows(matrix: np.ndarray) -> np.ndarray:
+    """L2-normalize each row so that inner product equals cosine similarity"""
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return matrix / norms
+
+
+def reduce_dimensions(matrix: np.ndarray, dimensions: int, half_precision: bool = True) -> np.ndarray:
+    """Shorten text-embedding-3 vectors the same way the `dimensions` API parameter does
+
+    The API truncates the full vector and re-normalizes it, so stored 1536-d
+    vectors can be reduced locally without another embedding call.
+    """
+    reduced = normalize_rows(np.asarray(matrix[:, :dimensions], dtype=np.float32))
+    if half_precision:
+        # Round-trip through float16 to mirror halfvec storage
+        reduced = reduced.astype(np.float16).astype(np.float32)
+    return reduced
+
+
+def fetch_embeddings(supabase, table: str, column: str = 'embedding',
+                     page_size: int = 1000, limit: int = None) -> Tuple[np.ndarray, np.ndarray]:
+    """Page through a table and return (ids, embedding matrix) for rows with vectors"""
+    ids = []
+    vectors = []
+    start = 0
+    while limit is None or start < limit:
+        end = start + page_size - 1
+        if limit is not None:
+            end = min(end, limit - 1)
+        response = supabase.table(table)\
+            .select(f'id, {column}')\
+            .not_.is_(column, 'null')\
+            .order('id')\
+            .range(start, end)\
+            .execute()
+        if not response.data:
+            break
+        for record in response.data:
+            ids.append(record['id'])
+            vectors.append(parse_vector(record[column]))
+        if len(response.data) < end - start + 1:
+            break
+        start = end + 1
+
+    logger.info(f"Fetched {len(ids)} vectors from {table}.{column}")
+    if not vectors:
+        return np.empty(0, dtype=np.int64), np.empty((0, 0), dtype=np.float32)
+    return np.asarray(ids, dtype=np.int64), np.vstack(vectors)
+
+
+def exact_top_k(queries: np.ndarray, corpus: np.ndarray, top_k: int) -> np.ndarray:
+    """Indices of the top-k corpus rows by inner product for each query row"""
+    scores = queries @ corpus.T
+    top_k = min(top_k, corpus.shape[0])
+    candidates = np.argpartition(-scores, top_k - 1, axis=1)[:, :top_k]
+    order = np.argsort(-np.take_along_axis(scores, candidates, axis=1), axis=1)
+    return np.take_along_axis(candidates, order, axis=1)
+
+
+def recall_at_k(approx: np.ndarray, truth: np.ndarray) -> float:
+    """Mean fraction of the true top-k found in the approximate top-k"""
+    hits = sum(len(set(a) & set(t)) for a, t in zip(approx, truth))
+    return hits / truth.size if truth.size else 0.0
+
+
+def blocked_top_k(queries: np.ndarray, corpus: np.ndarray, top_k: int,
+                  corpus_block: int = 50000, query_block: int = 1024) -> Tuple[np.ndarray, np.ndarray]:
+    """Exact top-k by inner product with bounded memory
+
+    Scores one (query_block x corpus_block) tile at a time and keeps a running
+    top-k per query, so memory stays O(query_block * corpus_block) however large
+    the corpus is. `corpus` may be a memory-mapped array.
+
+    Returns:
+        (indices, scores), each of shape (len(queries), top_k), best first
+    """
+    top_k = min(top_k, len(corpus))
+    all_indices = np.empty((len(queries), top_k), dtype=np.int64)
+    all_scores = np.empty((len(queries), top_k), dtype=np.float32)
+
+    for q_start in range(0, len(queries), query_block):
+        q = np.asarray(queries[q_start:q_start + query_block], dtype=np.float32)
+        best_indices = np.empty((len(q), 0), dtype=np.int64)
+        best_scores = np.empty((len(q), 0), dtype=np.float32)
+        for c_start in range(0, len(corpus), corpus_block):
+            scores = q @ np.asarray(corpus[c_start:c_start + corpus_block], dtype=np.float32).T
+            k = min(top_k, scores.shape[1])
+            candidates = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+            best_scores = np.concatenate([best_scores, np.take_along_axis(scores, candidates, axis=1)], axis=1)
+            best_indices = np.concatenate([best_indices, candidates + c_start], axis=1)
+            if best_scores.shape[1] > top_k:
+                keep = np.argpartition(-best_scores, top_k - 1, axis=1)[:, :top_k]
+                best_scores = np.take_along_axis(best_scores, keep, axis=1)
+                best_indices = np.take_along_axis(best_indices, keep, axis=1)
+
+        order = np.argsort(-best_scores, axis=1)
+        all_indices[q_start:q_start + len(q)] = np.take_along_axis(best_indices, order, axis=1)
+        all_scores[q_start:q_start + len(q)] = np.take_along_axis(best_scores, order, axis=1)
+    return all_indices, all_scores
@@ -1,11 +1,16 @@
-import os
 import sys
 import logging
 import argparse
-from typing import Union
+from typing import TYPE_CHECKING, Optional, Union
 from dotenv import load_dotenv
-from supabase import create_client
-from src.services.embedding_processor import EmbeddingProcessor
+from src.services.clients import create_database_client, direct_db
+from src.services.embedding_backends import get_embedding_backend
+from src.services.embedding_versions import EmbeddingVersionRegistry
+from src.config import EMBEDDING_BACKEND, EMBEDDING_DIMENSIONS, ANALYSIS_TABLES
+
+# The processors import numpy; main() loads them only for a backfill
+if TYPE_CHECKING:
+    from src.services.embedding_processor import EmbeddingProcessor
 
 # Configure logging
 logging.basicConfig(
@@ -26,29 +31,97 @@ def parse_batch_size(value: str) -> Union[int, str]:
     except ValueError:
         raise argparse.ArgumentTypeError("Batch size must be 'all' or an integer")
 
-def main(batch_size: Union[int, str] = 10, mode: str = 'regular'):
+def run_sync(processor: 'EmbeddingProcessor', mode: str, batch_size: Union[int, str]):
+    """Update one mode's embeddings with sequential requests"""
+    if processor.db:
+        processor.bulk_update_embeddings(mode, batch_size)
+    elif mode == 'regular':
+        processor.update_screen_analysis_embeddings(batch_size)
+    elif mode == 'fusion':
+        processor.update_fusion_analysis_embeddings(batch_size)
+    else:  # html
+        processor.process_html_embeddings(batch_size)
+
+def main(batch_size: Union[int, str] = 10, mode: str = 'regular', dimensions: int = EMBEDDING_DIMENSIONS,
+         use_async: bool = False, embed_concurrency: int = 4, write_concurrency: int = 8,
+         tokens_per_minute: int = 1_000_000, backend: str = EMBEDDING_BACKEND,
+         version: Optional[str] = None, activate_version: Optional[str] = None,
+         gc_version: Optional[str] = None, force: bool = False):
     """Update embeddings for analyses
     
     Args:
         batch_size: Number of records to process in each batch or 'all'
-        mode: Processing mode ('regular', 'fusion', or 'html')
+        mode: Processing mode ('regular', 'fusion', 'html', or 'all')
+        dimensions: Embedding width; values below 1536 fill the halfvec columns
+        use_async: Backfill with concurrent embedding requests and write-backs
+        embed_concurrency: Embedding batches in flight (async only)
+        write_concurrency: Row updates in flight (async only)
+        tokens_per_minute: Embedding token budget shared by all workers (async only)
+        backend: Embedding backend ('openai' or 'local')
+        version: Backfill this registered embedding version's column instead of the default one
+        activate_version: Make this version the one search reads, then exit
+        gc_version: Clear the vectors of this retired version, then exit
+        force: Activate even if some rows have no vector for the version yet
     """
     try:
-        # Initialize Supabase client
-        supabase = create_client(
-            os.getenv('PUBLIC_SUPABASE_URL'),
-            os.getenv('SUPABASE_SERVICE_ROLE_KEY')
-        )
+        # Initialize Supabase client (RPCs and bulk I/O go direct with DB_BACKEND=postgres)
+        supabase = create_database_client()
+        db = direct_db(supabase)
+        
+        modes = list(ANALYSIS_TABLES) if mode == 'all' else [mode]
+        
+        if activate_version or gc_version:
+            registry = EmbeddingVersionRegistry(supabase)
+            for current_mode in modes:
+                table = ANALYSIS_TABLES[current_mode]
+                if activate_version:
+                    registry.activate(table, activate_version, force=force)
+                if gc_version:
+                    cleared = registry.garbage_collect(table, gc_version)
+                    logger.info(f"Cleared {cleared} {gc_version} vectors from {table}")
+            return
+        
+        from src.services.embedding_processor import EmbeddingProcessor
+        
+        # Initialize processors: one per table for a versioned backfill, shared otherwise
+        if version:
+            registry = EmbeddingVersionRegistry(supabase)
+            processors = {}
+            for current_mode in modes:
+                record = registry.get(ANALYSIS_TABLES[current_mode], version)
+                if not record:
+                    logger.error(f"Embedding version {version} is not registered for {ANALYSIS_TABLES[current_mode]}")
+                    sys.exit(1)
+                processors[current_mode] = EmbeddingProcessor(
+                    supabase,
+                    backend=registry.backend_for(record),
+                    column=record['column_name'],
+                    db=db
+                )
+        else:
+            processor = EmbeddingProcessor(
+                supabase,
+                backend=get_embedding_backend(backend, dimensions=dimensions),
+                db=db
+            )
+            processors = {current_mode: processor for current_mode in modes}
         
-        # Initialize processor and update embeddings
-        processor = EmbeddingProcessor(supabase)
+        if use_async:
+            import asyncio
+            from src.services.async_embedding_backfill import AsyncEmbeddingBackfill
         
-        if mode == 'regular':
-            processor.update_screen_analysis_embeddings(batch_size)
-        elif mode == 'fusion':
-            processor.update_fusion_analysis_embeddings(batch_size)
-        else:  # html
-            processor.process_html_embeddings(batch_size)
+        for current_mode in modes:
+            if use_async:
+                backfill = AsyncEmbeddingBackfill(
+                    processors[current_mode],
+                    batch_size=100 if batch_size == 'all' else batch_size,
+                    embed_concurrency=embed_concurrency,
+                    write_concurrency=write_concurrency,
+                    tokens_per_minute=tokens_per_minute
+                )
+                asyncio.run(backfill.run([current_mode]))
+            else:
+                run_sync(processors[current_mode], current_mode, batch_size)
         
     except Exception as e:
         logger.error(f"Error in main execution: {str(e)}")
@@ -58,8 +131,30 @@ if __name__ == "__main__":
     parser = argparse.ArgumentParser(description='Update embeddings for analyses')
     parser.add_argument('--batch-size', type=parse_batch_size, default=10,
                       help="Number of records to process in each batch or 'all'")
-    parser.add_argument('--mode', choices=['regular', 'fusion', 'html'],
+    parser.add_argument('--mode', choices=['regular', 'fusion', 'html', 'all'],
                       default='regular', help='Processing mode')
+    parser.add_argument('--dimensions', type=int, default=EMBEDDING_DIMENSIONS,
+                      help='Embedding width; values below 1536 fill the halfvec columns')
+    parser.add_argument('--async', dest='use_async', action='store_true',
+                      help='Backfill with concurrent embedding requests and write-backs')
+    parser.add_argument('--embed-concurrency', type=int, default=4,
+                      help='Embedding batches in flight (with --async)')
+    parser.add_argument('--write-concurrency', type=int, default=8,
+                      help='Row updates in flight (with --async)')
+    parser.add_argument('--tokens-per-minute', type=int, default=1_000_000,
+                      help='Embedding token budget shared by all workers (with --async)')
+    parser.add_argument('--backend', choices=['openai', 'local'], default=EMBEDDING_BACKEND,
+                      help='Embedding backend (local is a deterministic offline embedder)')
+    parser.add_argument('--version', type=str, default=None,
+                      help='Backfill the column of this registered embedding version')
+    parser.add_argument('--activate-version', type=str, default=None,
+                      help='Atomically switch search to this embedding version and exit')
+    parser.add_argument('--gc-version', type=str, default=None,
+                      help='Clear the vectors of this retired embedding version and exit')
+    parser.add_argument('--force', action='store_true',
+                      help='With --activate-version, switch even if some rows lack vectors')
     
     args = parser.parse_args()
-    main(args.batch_size, args.mode) 
\ No newline at end of file
+    main(args.batch_size, args.mode, args.dimensions, args.use_async,
+         args.embed_concurrency, args.write_concurrency, args.tokens_per_minute, args.backend,
+         args.version, args.activate_version, args.gc_version, args.force) 
\ No newline at end of file